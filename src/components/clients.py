@@ -1,10 +1,14 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
                                QTableWidgetItem, QPushButton, QLineEdit, QLabel, 
                                QMessageBox, QDialog, QFormLayout, QDialogButtonBox,
-                               QTextEdit, QComboBox, QHeaderView, QDoubleSpinBox, QSpinBox, QGroupBox)
+                               QTextEdit, QComboBox, QHeaderView, QDoubleSpinBox, QSpinBox, QGroupBox,
+                               QTableView, QAbstractItemView)
 from PySide6.QtCore import Qt, Signal
 from src.database_module import DatabaseManager
-from src.components.ui_helpers import as_text, as_money, table_batch_update
+from src.components.ui_helpers import as_money
+from src.components.table_models import RIGHT, ActionButtonDelegate, Column, RecordTableModel, RowAction
+from src.core.events import CLIENT_CHANGED, PAYMENT_RECORDED, SALE_CREATED, publish
+from src.core.client_search import ClientSearch
 
 class AddClientDialog(QDialog):
     def __init__(self, db_manager: DatabaseManager, parent=None, client_data=None):
@@ -178,20 +182,27 @@ class AddClientDialog(QDialog):
             self.previous_balance_input.setValue(0.0)
 
         try:
+            # Cylinders carried over by a period close are openings too; they are shown but not editable.
             rows = self.db_manager.execute_query(
                 '''
-                SELECT gas_type, capacity, quantity
+                SELECT gas_type, capacity, quantity, FALSE AS archived, id AS sort_id
                 FROM client_initial_outstanding
                 WHERE client_id = ?
-                ORDER BY id
+                UNION ALL
+                SELECT gas_type, capacity, SUM(quantity), TRUE, MIN(id)
+                FROM client_cylinder_openings
+                WHERE client_id = ?
+                GROUP BY gas_type, capacity
+                ORDER BY archived, sort_id
                 ''',
-                (self.client_data['id'],)
+                (self.client_data['id'], self.client_data['id'])
             )
             self.initial_entries = [
                 {
                     'gas_type': r.get('gas_type'),
                     'capacity': r.get('capacity'),
-                    'quantity': int(r.get('quantity') or 0)
+                    'quantity': int(r.get('quantity') or 0),
+                    'archived': bool(r.get('archived'))
                 }
                 for r in rows
                 if int(r.get('quantity') or 0) > 0
@@ -209,7 +220,7 @@ class AddClientDialog(QDialog):
             'address': self.address_input.toPlainText().strip(),
             'company': self.company_input.text().strip(),
             'previous_balance': float(self.previous_balance_input.value()),
-            'initial_outstanding': list(self.initial_entries)
+            'initial_outstanding': [e for e in self.initial_entries if not e.get('archived')]
         }
     
     def validate(self):
@@ -237,6 +248,10 @@ class AddClientDialog(QDialog):
             self.initials_table.setItem(i, 0, QTableWidgetItem(e['gas_type']))
             self.initials_table.setItem(i, 1, QTableWidgetItem(e['capacity']))
             self.initials_table.setItem(i, 2, QTableWidgetItem(str(e['quantity'])))
+            if e.get('archived'):
+                self.initials_table.setItem(i, 3, QTableWidgetItem("Closed period"))
+                self.initials_table.setRowHeight(i, 34)
+                continue
             btn = QPushButton("Remove")
             btn.setMinimumWidth(90)
             btn.setStyleSheet(
@@ -258,7 +273,15 @@ class ClientsWidget(QWidget):
         self.db_manager = db_manager
         self.current_user = current_user
         self.init_ui()
+        # Pages live inside the main window's stack and may never get a close event of their own.
+        search = self.client_search
+        self.destroyed.connect(lambda *_: search.shutdown())
         self.load_clients()
+
+    def closeEvent(self, event):
+        """Stop the client search worker with the page."""
+        self.client_search.shutdown()
+        super().closeEvent(event)
     
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -275,14 +298,14 @@ class ClientsWidget(QWidget):
                 background: #ffffff;
             }
             QLineEdit:focus { border: 1px solid #2563eb; }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #dbe4f0;
                 border-radius: 8px;
                 background: #ffffff;
                 gridline-color: #e5e7eb;
             }
-            QTableWidget::item { padding: 6px; }
-            QTableWidget::item:selected { background-color: #e6f0ff; color: #0f172a; }
+            QTableView::item { padding: 6px; }
+            QTableView::item:selected { background-color: #e6f0ff; color: #0f172a; }
             QHeaderView::section {
                 background-color: #2563eb;
                 color: white;
@@ -302,6 +325,11 @@ class ClientsWidget(QWidget):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search by name, phone, or company...")
+        self.client_search = ClientSearch(self.db_manager, limit=200, parent=self)
+        self.client_search.results_ready.connect(self.show_search_results)
+        self.client_search.search_failed.connect(
+            lambda error: QMessageBox.critical(self, "Database Error", f"Failed to filter clients: {error}")
+        )
         self.search_input.textChanged.connect(self.filter_clients)
         controls_layout.addWidget(self.search_input)
         
@@ -340,20 +368,39 @@ class ClientsWidget(QWidget):
         layout.addLayout(controls_layout)
         
         # Clients table
-        self.clients_table = QTableWidget()
-        self.clients_table.setColumnCount(8)
-        self.clients_table.setHorizontalHeaderLabels([
-            "ID", "Name", "Phone", "Company", "Total Purchases", "Total Paid", "Balance", "Actions"
-        ])
+        self.clients_model = RecordTableModel([
+            Column("ID", 'id'),
+            Column("Name", 'name'),
+            Column("Phone", 'phone'),
+            Column("Company", 'company'),
+            Column("Total Purchases", text=lambda c: as_money(c.get('total_purchases')), align=RIGHT),
+            Column("Total Paid", text=lambda c: as_money(c.get('total_paid')), align=RIGHT),
+            Column("Balance", text=lambda c: as_money(c.get('balance')), align=RIGHT,
+                   foreground=lambda c: Qt.red if float(c.get('balance') or 0) > 0 else None),
+            Column("Actions"),
+        ], parent=self)
+        actions = [
+            RowAction('view', "View", "#17a2b8"),
+            RowAction('edit', "Edit", "#28a745"),
+        ]
+        if self.current_user['role'] == 'Admin':
+            actions.append(RowAction('delete', "Delete", "#dc3545"))
+        self.clients_actions = ActionButtonDelegate(actions, self)
+        self.clients_actions.clicked.connect(self.on_client_action)
+
+        self.clients_table = QTableView()
+        self.clients_table.setModel(self.clients_model)
+        self.clients_table.setItemDelegateForColumn(7, self.clients_actions)
         
         # Configure table
         self.clients_table.setAlternatingRowColors(True)
-        self.clients_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.clients_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.clients_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.clients_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.clients_table.setFocusPolicy(Qt.NoFocus)
         self.clients_table.verticalHeader().setVisible(False)
         self.clients_table.setShowGrid(True)
         self.clients_table.setWordWrap(False)
+        self.clients_table.verticalHeader().setDefaultSectionSize(40)
         self.clients_table.horizontalHeader().setStretchLastSection(False)
         self.clients_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         self.clients_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
@@ -384,52 +431,23 @@ class ClientsWidget(QWidget):
         if role == 'Driver':
             self.add_client_btn.setEnabled(False)
 
-    def _refresh_application_after_client_change(self):
-        """Refresh all dependent pages so client balance/cylinder changes are visible immediately."""
-        try:
-            from PySide6.QtWidgets import QApplication
-
-            main_window = None
-            for widget in QApplication.topLevelWidgets():
-                if hasattr(widget, 'widgets') and hasattr(widget, 'refresh_current_page'):
-                    main_window = widget
-                    break
-
-            if not main_window:
-                return
-
-            # Dashboard aggregates and every dependent page should update immediately.
-            main_window.refresh_dashboard()
-            for page_name in [
-                "clients",
-                "cylinder_track",
-                "cylinder_availability",
-                "weekly_payments",
-                "receipts",
-                "daily_transactions",
-            ]:
-                try:
-                    main_window.refresh_current_page(page_name)
-                except Exception:
-                    continue
+    def _refresh_application_after_client_change(self, client_id=None):
+        """Tell dependent pages that client balance/cylinder data changed."""
+        self.client_search.invalidate()
+        publish(CLIENT_CHANGED, client_id, source="clients")
 
-            # Reports page does not expose refresh_current_page hook; force regenerate if loaded.
-            reports_widget = main_window.widgets.get("reports") if hasattr(main_window, 'widgets') else None
-            if reports_widget and hasattr(reports_widget, 'generate_report'):
-                try:
-                    reports_widget.generate_report()
-                except Exception:
-                    pass
-
-            # Keep sales client panel consistent if currently selected.
-            sales_widget = main_window.widgets.get("sales") if hasattr(main_window, 'widgets') else None
-            if sales_widget and hasattr(sales_widget, 'on_client_selected'):
-                try:
-                    sales_widget.on_client_selected()
-                except Exception:
-                    pass
-        except Exception:
-            pass
+    def handle_domain_event(self, event) -> bool:
+        """Update one client's totals in place after a sale or payment"""
+        if event.name not in (SALE_CREATED, PAYMENT_RECORDED) or not event.client_id:
+            return False
+        client = self.db_manager.get_client_by_id(event.client_id)
+        if not client:
+            return False
+        row = self.clients_model.find_row('id', event.client_id)
+        if row < 0:
+            return False
+        self.clients_model.update_row(row, {**self.clients_model.row(row), **client})
+        return True
     
     def load_clients(self):
         """Load all clients from database"""
@@ -441,90 +459,31 @@ class ClientsWidget(QWidget):
     
     def populate_table(self, clients):
         """Populate table with client data"""
-        with table_batch_update(self.clients_table):
-            self.clients_table.setRowCount(len(clients))
-
-            for row, client in enumerate(clients):
-                self.clients_table.setItem(row, 0, QTableWidgetItem(as_text(client.get('id'))))
-                self.clients_table.setItem(row, 1, QTableWidgetItem(as_text(client.get('name'))))
-                self.clients_table.setItem(row, 2, QTableWidgetItem(as_text(client.get('phone'))))
-                self.clients_table.setItem(row, 3, QTableWidgetItem(as_text(client.get('company') or '')))
-
-                purchases_item = QTableWidgetItem(as_money(client.get('total_purchases')))
-                purchases_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.clients_table.setItem(row, 4, purchases_item)
-
-                paid_item = QTableWidgetItem(as_money(client.get('total_paid')))
-                paid_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.clients_table.setItem(row, 5, paid_item)
-
-                balance_value = float(client.get('balance') or 0)
-                balance_item = QTableWidgetItem(as_money(balance_value))
-                balance_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if balance_value > 0:
-                    balance_item.setForeground(Qt.red)
-                self.clients_table.setItem(row, 6, balance_item)
-            
-                actions_widget = QWidget()
-                actions_widget.setMinimumHeight(32)
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setSpacing(4)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setAlignment(Qt.AlignCenter)
-
-                view_btn = QPushButton("View")
-                view_btn.setMinimumWidth(58)
-                view_btn.setMaximumWidth(66)
-                view_btn.setFixedHeight(24)
-                view_btn.setFocusPolicy(Qt.NoFocus)
-                view_btn.setStyleSheet("""
-                    QPushButton { background-color: #17a2b8; color: white; border: 1px solid #138496; border-radius: 5px; padding: 3px 8px; font-size: 11px; font-weight: 600; }
-                    QPushButton:hover { background-color: #138496; }
-                    QPushButton:pressed { background-color: #117a8b; }
-                """)
-                view_btn.clicked.connect(lambda checked, c=client: self.view_client(c))
-                actions_layout.addWidget(view_btn)
-            
-                edit_btn = QPushButton("Edit")
-                edit_btn.setMinimumWidth(58)
-                edit_btn.setMaximumWidth(66)
-                edit_btn.setFixedHeight(24)
-                edit_btn.setFocusPolicy(Qt.NoFocus)
-                edit_btn.setStyleSheet("""
-                    QPushButton { background-color: #28a745; color: white; border: 1px solid #1e7e34; border-radius: 5px; padding: 3px 8px; font-size: 11px; font-weight: 600; }
-                    QPushButton:hover { background-color: #218838; }
-                    QPushButton:pressed { background-color: #1e7e34; }
-                """)
-                edit_btn.clicked.connect(lambda checked, c=client: self.edit_client(c))
-                actions_layout.addWidget(edit_btn)
-            
-                if self.current_user['role'] == 'Admin':
-                    delete_btn = QPushButton("Delete")
-                    delete_btn.setMinimumWidth(58)
-                    delete_btn.setMaximumWidth(66)
-                    delete_btn.setFixedHeight(24)
-                    delete_btn.setFocusPolicy(Qt.NoFocus)
-                    delete_btn.setStyleSheet("""
-                        QPushButton { background-color: #dc3545; color: white; border: 1px solid #bd2130; border-radius: 5px; padding: 3px 8px; font-size: 11px; font-weight: 600; }
-                        QPushButton:hover { background-color: #c82333; }
-                        QPushButton:pressed { background-color: #bd2130; }
-                    """)
-                    delete_btn.clicked.connect(lambda checked, c=client: self.delete_client(c))
-                    actions_layout.addWidget(delete_btn)
-
-                actions_layout.addStretch()
+        self.clients_model.set_rows(clients)
 
-                self.clients_table.setCellWidget(row, 7, actions_widget)
-                self.clients_table.setRowHeight(row, 40)
+    def on_client_action(self, action: str, client: dict):
+        if action == 'view':
+            self.view_client(client)
+        elif action == 'edit':
+            self.edit_client(client)
+        elif action == 'delete':
+            self.delete_client(client)
     
     def filter_clients(self):
         """Filter clients based on search input"""
-        search_text = self.search_input.text().strip()
-        try:
-            clients = self.db_manager.get_clients(search_text)
-            self.populate_table(clients)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to filter clients: {str(e)}")
+        self.client_search.set_term(self.search_input.text())
+
+    def show_search_results(self, term: str, clients: list):
+        """Show the ranked matches for the search, or every client when it is cleared"""
+        if not term:
+            self.load_clients()
+            return
+        # Matches past the search limit are read as the table is scrolled; the model asks for
+        # more only once every loaded row is shown, so its row count is the offset.
+        self.clients_model.set_rows(
+            clients,
+            pager=lambda last, limit: self.db_manager.search_clients(term, limit, offset=self.clients_model.rowCount()),
+        )
     
     def add_client(self):
         """Add new client"""
@@ -554,7 +513,7 @@ class ClientsWidget(QWidget):
                 
                 QMessageBox.information(self, "Success", "Client added successfully!")
                 self.load_clients()
-                self._refresh_application_after_client_change()
+                self._refresh_application_after_client_change(client_id)
 
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to add client: {str(e)}")
@@ -583,7 +542,7 @@ class ClientsWidget(QWidget):
                     
                     QMessageBox.information(self, "Success", "Client updated successfully!")
                     self.load_clients()
-                    self._refresh_application_after_client_change()
+                    self._refresh_application_after_client_change(client['id'])
                 else:
                     QMessageBox.warning(self, "Error", "Failed to update client.")
                     
@@ -729,8 +688,7 @@ Outstanding Balance: Rs. {client['balance']:,.2f}<br>
                     return
                 
                 # Delete client
-                query = 'DELETE FROM clients WHERE id = ?'
-                self.db_manager.execute_update(query, (client['id'],))
+                self.db_manager.delete_client(client['id'])
                 
                 self.db_manager.log_activity(
                     "DELETE_CLIENT",
@@ -740,7 +698,7 @@ Outstanding Balance: Rs. {client['balance']:,.2f}<br>
                 
                 QMessageBox.information(self, "Success", "Client deleted successfully!")
                 self.load_clients()
-                self._refresh_application_after_client_change()
+                self._refresh_application_after_client_change(client['id'])
                 
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to delete client: {str(e)}")
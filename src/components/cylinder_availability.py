@@ -1,10 +1,12 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
-    QMessageBox, QInputDialog, QFrame
+    QPushButton, QTableView, QAbstractItemView, QHeaderView,
+    QMessageBox, QInputDialog, QFrame, QCheckBox, QDateEdit
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QDate
 from src.database_module import DatabaseManager
+from src.components.table_models import ActionButtonDelegate, Column, RecordTableModel, RowAction
+from src.core.events import STOCK_CHANGED, publish
 
 
 class CylinderAvailabilityWidget(QWidget):
@@ -34,14 +36,14 @@ class CylinderAvailabilityWidget(QWidget):
                 border: 1px solid #dbe4f0;
                 border-radius: 10px;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #dbe4f0;
                 border-radius: 8px;
                 background: #ffffff;
                 gridline-color: #e5e7eb;
             }
-            QTableWidget::item { padding: 6px; }
-            QTableWidget::item:selected { background-color: #e6f0ff; color: #0f172a; }
+            QTableView::item { padding: 6px; }
+            QTableView::item:selected { background-color: #e6f0ff; color: #0f172a; }
             QHeaderView::section {
                 background-color: #2563eb;
                 color: white;
@@ -72,6 +74,17 @@ class CylinderAvailabilityWidget(QWidget):
         self.search_input.textChanged.connect(self.filter_rows)
         controls.addWidget(self.search_input)
 
+        self.as_of_check = QCheckBox("As of")
+        self.as_of_check.toggled.connect(self.on_as_of_toggled)
+        controls.addWidget(self.as_of_check)
+
+        self.as_of_date = QDateEdit()
+        self.as_of_date.setDate(QDate.currentDate())
+        self.as_of_date.setCalendarPopup(True)
+        self.as_of_date.setEnabled(False)
+        self.as_of_date.dateChanged.connect(self.filter_rows)
+        controls.addWidget(self.as_of_date)
+
         self.refresh_btn = QPushButton("Refresh")
         self.refresh_btn.setStyleSheet("""
             QPushButton {
@@ -96,6 +109,18 @@ class CylinderAvailabilityWidget(QWidget):
         self.clear_btn.clicked.connect(self.clear_search)
         controls.addWidget(self.clear_btn)
 
+        self.ledger_btn = QPushButton("Check Ledger")
+        self.ledger_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                color: #1d4ed8;
+                border: 1px solid #93c5fd;
+            }
+            QPushButton:hover { background-color: #eff6ff; }
+        """)
+        self.ledger_btn.clicked.connect(self.check_inventory_drift)
+        controls.addWidget(self.ledger_btn)
+
         root.addLayout(controls)
 
         summary_card = QFrame()
@@ -126,14 +151,27 @@ class CylinderAvailabilityWidget(QWidget):
         equation_layout.addStretch()
         root.addWidget(equation_card)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Product", "Opening", "Returned", "Sold", "Available", "Updated", "Add Opening"
-        ])
+        self.model = RecordTableModel([
+            Column("Product", text=self.product_name),
+            Column("Opening", text=lambda d: str(int(d.get('opening_count') or 0))),
+            Column("Returned", text=lambda d: str(int(d.get('returned_count') or 0))),
+            Column("Sold", text=lambda d: str(int(d.get('sold_count') or 0))),
+            Column("Available", text=lambda d: str(int(d.get('available_count') or 0)), foreground=self.available_color),
+            Column("Updated", 'updated_at'),
+            Column("Add Opening"),
+        ], parent=self)
+        self.opening_action = ActionButtonDelegate([
+            RowAction('add_opening', "Add Opening", "#1d4ed8", width=96,
+                      enabled=lambda d: self.can_edit_opening and self.as_of_day() is None),
+        ], self)
+        self.opening_action.clicked.connect(lambda _action, d: self.set_opening_for_row(d))
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setItemDelegateForColumn(6, self.opening_action)
         self.table.setAlternatingRowColors(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
         self.table.verticalHeader().setDefaultSectionSize(38)
         self.table.setFocusPolicy(Qt.NoFocus)
@@ -155,10 +193,23 @@ class CylinderAvailabilityWidget(QWidget):
     def set_role_permissions(self):
         role = self.current_user.get('role')
         self.can_edit_opening = role in ['Admin', 'Accountant']
+        self.ledger_btn.setVisible(role == 'Admin')
+
+    def as_of_day(self):
+        """Selected historical date, or None for current stock"""
+        if not self.as_of_check.isChecked():
+            return None
+        return self.as_of_date.date().toString('yyyy-MM-dd')
+
+    def fetch_rows(self, search: str = ""):
+        as_of = self.as_of_day()
+        if as_of:
+            return self.db_manager.get_cylinder_availability_as_of(as_of, search)
+        return self.db_manager.get_cylinder_availability_rows(search)
 
     def load_data(self):
         try:
-            self.current_rows = self.db_manager.get_cylinder_availability_rows()
+            self.current_rows = self.fetch_rows(self.search_input.text().strip())
             self.populate_table(self.current_rows)
             self.update_totals()
         except Exception as e:
@@ -167,20 +218,34 @@ class CylinderAvailabilityWidget(QWidget):
     def filter_rows(self):
         search = self.search_input.text().strip()
         try:
-            rows = self.db_manager.get_cylinder_availability_rows(search)
+            rows = self.fetch_rows(search)
             self.current_rows = rows
             self.populate_table(rows)
             self.update_totals()
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to filter cylinder availability: {str(e)}")
 
+    def on_as_of_toggled(self, checked: bool):
+        self.as_of_date.setEnabled(checked)
+        self.load_data()
+
     def clear_search(self):
         self.search_input.clear()
         self.load_data()
 
     def update_totals(self):
         try:
-            totals = self.db_manager.get_cylinder_availability_totals()
+            as_of = self.as_of_day()
+            if as_of:
+                rows = self.current_rows if not self.search_input.text().strip() else self.db_manager.get_cylinder_availability_as_of(as_of)
+                totals = {
+                    'opening_total': sum(int(r.get('opening_count') or 0) for r in rows),
+                    'returned_total': sum(int(r.get('returned_count') or 0) for r in rows),
+                    'sold_total': sum(int(r.get('sold_count') or 0) for r in rows),
+                    'available_total': sum(int(r.get('available_count') or 0) for r in rows),
+                }
+            else:
+                totals = self.db_manager.get_cylinder_availability_totals()
             opening = int(totals.get('opening_total') or 0)
             returned = int(totals.get('returned_total') or 0)
             sold = int(totals.get('sold_total') or 0)
@@ -197,81 +262,67 @@ class CylinderAvailabilityWidget(QWidget):
             self.available_label.setText("Available: 0")
             self.equation_label.setText("Formula: 0 + 0 - 0 = 0")
 
+    @staticmethod
+    def product_name(data: dict) -> str:
+        product_name = f"{data.get('gas_type') or ''}"
+        if data.get('sub_type'):
+            product_name += f" {data.get('sub_type')}"
+        if data.get('capacity'):
+            product_name += f" - {data.get('capacity')}"
+        return product_name.strip()
+
+    @staticmethod
+    def available_color(data: dict):
+        available = int(data.get('available_count') or 0)
+        if available < 0:
+            return Qt.red
+        if available == 0:
+            return Qt.darkYellow
+        return Qt.darkGreen
+
     def populate_table(self, rows):
-        self.table.setRowCount(len(rows))
-        for row, data in enumerate(rows):
-            product_name = f"{data.get('gas_type') or ''}"
-            if data.get('sub_type'):
-                product_name += f" {data.get('sub_type')}"
-            if data.get('capacity'):
-                product_name += f" - {data.get('capacity')}"
-
-            self.table.setItem(row, 0, QTableWidgetItem(product_name.strip()))
-            self.table.setItem(row, 1, QTableWidgetItem(str(int(data.get('opening_count') or 0))))
-            self.table.setItem(row, 2, QTableWidgetItem(str(int(data.get('returned_count') or 0))))
-            self.table.setItem(row, 3, QTableWidgetItem(str(int(data.get('sold_count') or 0))))
-
-            available = int(data.get('available_count') or 0)
-            avail_item = QTableWidgetItem(str(available))
-            if available < 0:
-                avail_item.setForeground(Qt.red)
-            elif available == 0:
-                avail_item.setForeground(Qt.darkYellow)
-            else:
-                avail_item.setForeground(Qt.darkGreen)
-            self.table.setItem(row, 4, avail_item)
-
-            self.table.setItem(row, 5, QTableWidgetItem(str(data.get('updated_at') or '')))
-
-            set_btn = QPushButton("Add Opening")
-            set_btn.setEnabled(self.can_edit_opening)
-            set_btn.setFocusPolicy(Qt.NoFocus)
-            set_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #1d4ed8;
-                    color: white;
-                    border: 1px solid #1e40af;
-                    border-radius: 5px;
-                    padding: 3px 8px;
-                    min-height: 24px;
-                    max-height: 24px;
-                    font-size: 11px;
-                    font-weight: 600;
-                }
-                QPushButton:hover { background-color: #1e40af; }
-                QPushButton:disabled { background-color: #a5b4fc; border-color: #a5b4fc; color: #eef2ff; }
-            """)
-            set_btn.clicked.connect(lambda _checked=False, d=data: self.set_opening_for_row(d))
-            self.table.setCellWidget(row, 6, set_btn)
+        self.model.set_rows(rows)
 
-    def _refresh_application(self):
+    def check_inventory_drift(self):
+        """Compare counters with the stock movement ledger and offer to reconcile"""
         try:
-            from PySide6.QtWidgets import QApplication
-            main_window = None
-            for widget in QApplication.topLevelWidgets():
-                if hasattr(widget, 'refresh_current_page') and hasattr(widget, 'widgets'):
-                    main_window = widget
-                    break
-            if not main_window:
-                return
-
-            main_window.refresh_dashboard()
-            for page_name in [
-                "cylinder_availability",
-                "cylinder_track",
-                "weekly_payments",
-                "daily_transactions",
-                "receipts",
-                "reports",
-                "sales",
-                "clients",
-            ]:
-                try:
-                    main_window.refresh_current_page(page_name)
-                except Exception:
-                    continue
-        except Exception:
-            pass
+            drift = self.db_manager.get_cylinder_inventory_drift()
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to check stock ledger: {str(e)}")
+            return
+        if not drift:
+            QMessageBox.information(self, "Stock Ledger", "Cylinder counts match the stock movement ledger.")
+            return
+
+        lines = []
+        for d in drift[:10]:
+            name = f"{d.get('gas_type') or ''}"
+            if d.get('sub_type'):
+                name += f" {d.get('sub_type')}"
+            name += f" - {d.get('capacity') or ''}"
+            lines.append(f"{name}: available {int(d.get('available_count') or 0)}, ledger {int(d.get('ledger_available_count') or 0)}")
+        if len(drift) > 10:
+            lines.append(f"... and {len(drift) - 10} more")
+        reply = QMessageBox.question(
+            self,
+            "Stock Ledger",
+            f"{len(drift)} product(s) differ from the stock movement ledger:\n\n" + "\n".join(lines)
+            + "\n\nReset these counts to the ledger?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            fixed = self.db_manager.reconcile_cylinder_inventory(self.current_user.get('id'))
+            self.load_data()
+            self._refresh_application()
+            QMessageBox.information(self, "Stock Ledger", f"Reconciled {fixed} product(s).")
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to reconcile inventory: {str(e)}")
+
+    def _refresh_application(self, gas_product_id=None):
+        publish(STOCK_CHANGED, source="cylinder_availability", gas_product_id=gas_product_id)
 
     def set_opening_for_row(self, row_data: dict):
         if not self.can_edit_opening:
@@ -316,6 +367,6 @@ class CylinderAvailabilityWidget(QWidget):
             )
             QMessageBox.information(self, "Success", f"Opening cylinders added: {int(value)}")
             self.load_data()
-            self._refresh_application()
+            self._refresh_application(int(row_data['gas_product_id']))
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to set opening stock: {str(e)}")
@@ -6,7 +6,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 from src.database_module import DatabaseManager
-from src.components.ui_helpers import refresh_application_views
+from src.core.events import REFILL_RECORDED, RETURN_RECORDED, publish
+from src.core.directory import attach_directory, client_directory_model, supplier_directory_model
 
 
 class ReturnDialog(QDialog):
@@ -75,7 +76,7 @@ class ReturnDialog(QDialog):
                 cap,
                 qty
             )
-            refresh_application_views("cylinder_availability", "cylinder_track", "weekly_payments", "reports")
+            publish(RETURN_RECORDED, self.client['id'], source="cylinder_track", gas_type=self.product_row['gas_type'], quantity=qty)
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to save return: {str(e)}")
@@ -121,9 +122,9 @@ class LPGRefillDialog(QDialog):
         form.addRow("Refill Qty:", self.qty_spin)
 
         self.supplier_combo = QComboBox()
-        self.supplier_combo.addItem("Company Stock / No Supplier", None)
-        for supplier in self.db_manager.get_suppliers():
-            self.supplier_combo.addItem(supplier['name'], supplier)
+        suppliers = supplier_directory_model(self.db_manager)
+        suppliers.refresh()
+        attach_directory(self.supplier_combo, suppliers, "Company Stock / No Supplier")
         form.addRow("Source Supplier:", self.supplier_combo)
 
         self.unit_price_spin = QDoubleSpinBox()
@@ -163,7 +164,7 @@ class LPGRefillDialog(QDialog):
                 notes=self.notes_input.toPlainText().strip(),
                 created_by=current_user.get('id') if isinstance(current_user, dict) else None,
             )
-            refresh_application_views("cylinder_track", "supplier_payments", "weekly_payments", "daily_transactions", "reports")
+            publish(REFILL_RECORDED, self.client['id'], source="cylinder_track", gas_product_id=product_id)
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to save LPG refill: {str(e)}")
@@ -224,6 +225,8 @@ class CylinderTrackWidget(QWidget):
         header.addWidget(QLabel("Client:"))
         self.client_combo = QComboBox()
         self.client_combo.setMinimumWidth(300)
+        self.client_directory = client_directory_model(self.db_manager)
+        attach_directory(self.client_combo, self.client_directory, "-- All Clients --")
         self.client_combo.currentIndexChanged.connect(self.on_client_changed)
         header.addWidget(self.client_combo, 1)
         layout.addWidget(header_card)
@@ -278,15 +281,7 @@ class CylinderTrackWidget(QWidget):
 
     def load_clients(self):
         try:
-            clients = self.db_manager.get_clients()
-            self.client_combo.clear()
-            self.client_combo.addItem("-- All Clients --", None)
-            for c in clients:
-                label = f"{c['name']}"
-                if c.get('company'):
-                    label += f" - {c['company']}"
-                self.client_combo.addItem(label, c)
-            self.client_combo.setCurrentIndex(0)
+            self.client_directory.refresh()
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to load clients: {str(e)}")
 
@@ -1,3 +1,6 @@
+from html import escape
+from string import Template
+
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit, QPushButton,
     QTableWidget, QTableWidgetItem, QMessageBox, QFrame, QHeaderView,
@@ -8,6 +11,94 @@ from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from PySide6.QtGui import QTextDocument, QFont, QPageSize, QPageLayout
 from src.database_module import DatabaseManager
 
+DAILY_REPORT_TEMPLATE = Template("""<html><head><style>
+body{font-family:Arial,sans-serif;color:#0f172a;margin:0}
+.sheet{max-width:760px;margin:0 auto;padding:14px 18px;border:1.5px solid #1f2937;border-radius:10px}
+.head{text-align:center;border-bottom:2px solid #1f4f82;padding-bottom:8px;margin-bottom:10px}
+.title{font-size:18px;font-weight:800;color:#1f4f82}
+.sub{font-size:12px;color:#334155;margin-top:2px}
+h3{font-size:12px;color:#1f4f82;margin:12px 0 4px 0}
+table{width:100%;border-collapse:collapse;font-size:9.6px}
+th,td{border:1px solid #334155;padding:4px 5px;text-align:center;vertical-align:middle}
+th{background:#eaf0f8;font-weight:700}
+tr:nth-child(even) td{background:#f8fafc}
+.tot{margin-top:8px;font-size:11px;text-align:center}
+</style></head><body><div class='sheet'>
+<div class='head'>
+<div class='title'>DAILY TRANSACTION SUMMARY</div>
+<div class='sub'>Date: $day</div>
+</div>
+<table>
+<tr><th>Time</th><th>Client</th><th>Products</th><th>Qty</th><th>Total</th><th>Paid</th><th>Balance</th><th>Cashier</th></tr>
+$sales_rows
+</table>
+<div class='tot'><b>Transactions:</b> $transaction_count &nbsp;&nbsp; <b>Total Sales:</b> Rs. $total_sales &nbsp;&nbsp; <b>Total Paid:</b> Rs. $total_paid &nbsp;&nbsp; <b>Total Balance:</b> Rs. $total_balance</div>
+<h3>LPG Refills</h3>
+<table>
+<tr><th>Time</th><th>Client</th><th>Supplier</th><th>Capacity</th><th>Qty</th><th>Amount</th><th>Notes</th></tr>
+$refill_rows
+</table>
+<div class='tot'><b>Refills:</b> $refill_count &nbsp;&nbsp; <b>Cylinders:</b> $refill_quantity &nbsp;&nbsp; <b>Refill Amount:</b> Rs. $refill_amount</div>
+</div></body></html>""")
+
+SALE_ROW_TEMPLATE = Template(
+    "<tr><td>$time</td><td>$client</td><td>$products<br/><span style='font-size:8px;color:#475569'>$sources</span></td>"
+    "<td>$quantities</td><td>Rs. $total</td><td>Rs. $paid</td><td>Rs. $balance</td><td>$cashier</td></tr>"
+)
+
+REFILL_ROW_TEMPLATE = Template(
+    "<tr><td>$time</td><td>$client</td><td>$supplier</td><td>$capacity</td><td>$quantity</td>"
+    "<td>Rs. $amount</td><td>$notes</td></tr>"
+)
+
+
+def _money(value) -> str:
+    return f"{float(value or 0):,.2f}"
+
+
+def render_daily_report(summary: dict) -> str:
+    """Printable HTML for a DatabaseManager.get_daily_summary() result."""
+    sales_rows = [
+        SALE_ROW_TEMPLATE.substitute(
+            time=str(r['created_at'])[11:16],
+            client=escape(r['client_name'] or ''),
+            products=escape(r.get('product_summary') or ''),
+            sources=escape(r.get('source_summary') or 'Company Stock'),
+            quantities=escape(r.get('quantities_summary') or str(r.get('quantity') or '')),
+            total=_money(r['total_amount']),
+            paid=_money(r['amount_paid']),
+            balance=_money(r['balance']),
+            cashier=escape(r['cashier_name'] or ''),
+        )
+        for r in summary['sales']
+    ] or ["<tr><td colspan='8'>No transactions found for selected date.</td></tr>"]
+    refill_rows = [
+        REFILL_ROW_TEMPLATE.substitute(
+            time=str(r['created_at'])[11:16],
+            client=escape(r['client_name'] or ''),
+            supplier=escape(r['supplier_name'] or ''),
+            capacity=escape(r['capacity'] or ''),
+            quantity=int(r['quantity']),
+            amount=_money(r['total_amount']),
+            notes=escape(r.get('notes') or ''),
+        )
+        for r in summary['refills']
+    ] or ["<tr><td colspan='7'>No LPG refills for selected date.</td></tr>"]
+    totals = summary['totals']
+    return DAILY_REPORT_TEMPLATE.substitute(
+        day=escape(summary['day']),
+        sales_rows="\n".join(sales_rows),
+        refill_rows="\n".join(refill_rows),
+        transaction_count=int(totals['transaction_count']),
+        total_sales=_money(totals['total_sales']),
+        total_paid=_money(totals['total_paid']),
+        total_balance=_money(totals['total_balance']),
+        refill_count=int(totals['refill_count']),
+        refill_quantity=int(totals['refill_quantity']),
+        refill_amount=_money(totals['refill_amount']),
+    )
+
+
 class DailyTransactionsWidget(QWidget):
     def __init__(self, db_manager: DatabaseManager, current_user: dict):
         super().__init__()
@@ -185,122 +276,74 @@ class DailyTransactionsWidget(QWidget):
 
     def load_transactions(self):
         d_str = self.date_edit.date().toString('yyyy-MM-dd')
-        self.load_sales_for_date(d_str)
-        self.load_lpg_refills_for_date(d_str)
-
-    def load_sales_for_date(self, day_str):
         try:
-            rows = self.db_manager.get_sales_for_date_with_summaries(day_str)
-            self.sales_table.setRowCount(len(rows))
-            total_sales = 0.0
-            for i, r in enumerate(rows):
-                self.sales_table.setItem(i, 0, QTableWidgetItem(r['created_at'][:16]))
-                client = r['client_name']
-                self.sales_table.setItem(i, 1, QTableWidgetItem(client))
-                self.sales_table.setItem(i, 2, QTableWidgetItem(r.get('product_summary') or ''))
-                self.sales_table.setItem(i, 3, QTableWidgetItem(r.get('source_summary') or 'Company Stock'))
-                self.sales_table.setItem(i, 4, QTableWidgetItem(r.get('quantities_summary') or str(r.get('quantity') or '')))
-                total_item = QTableWidgetItem(f"Rs. {r['total_amount']:,.2f}")
-                total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.sales_table.setItem(i, 5, total_item)
-                paid_item = QTableWidgetItem(f"Rs. {r['amount_paid']:,.2f}")
-                paid_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.sales_table.setItem(i, 6, paid_item)
-                bal_item = QTableWidgetItem(f"Rs. {r['balance']:,.2f}")
-                bal_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if r['balance'] > 0:
-                    bal_item.setForeground(Qt.red)
-                elif r['balance'] < 0:
-                    bal_item.setForeground(Qt.darkYellow)
-                else:
-                    bal_item.setForeground(Qt.darkGreen)
-                self.sales_table.setItem(i, 7, bal_item)
-                self.sales_table.setItem(i, 8, QTableWidgetItem(r['cashier_name']))
-                total_sales += float(r.get('total_amount') or 0)
-                self.sales_table.setRowHeight(i, 36)
-
-            self.count_label.setText(f"Transactions: {len(rows)}")
-            self.total_label.setText(f"Total Sales: Rs. {total_sales:,.2f}")
+            summary = self.db_manager.get_daily_summary(d_str)
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to load daily transactions: {str(e)}")
+            return
+        self.show_sales(summary['sales'], summary['totals'])
+        self.show_lpg_refills(summary['refills'])
 
-    def load_lpg_refills_for_date(self, day_str):
-        try:
-            rows = self.db_manager.get_lpg_refills_for_date(day_str)
-            self.refill_table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.refill_table.setItem(i, 0, QTableWidgetItem(row['created_at'][11:16]))
-                self.refill_table.setItem(i, 1, QTableWidgetItem(row['client_name']))
-                self.refill_table.setItem(i, 2, QTableWidgetItem(row['supplier_name']))
-                self.refill_table.setItem(i, 3, QTableWidgetItem(row['capacity']))
-                qty_item = QTableWidgetItem(str(int(row['quantity'])))
-                qty_item.setTextAlignment(Qt.AlignCenter)
-                self.refill_table.setItem(i, 4, qty_item)
-                amount_item = QTableWidgetItem(f"Rs. {float(row['total_amount']):,.2f}")
-                amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.refill_table.setItem(i, 5, amount_item)
-                self.refill_table.setItem(i, 6, QTableWidgetItem(row.get('notes') or ''))
-            self.refill_label.setText(f"LPG Refills: {len(rows)}")
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to load LPG refills: {str(e)}")
+    def show_sales(self, rows, totals):
+        self.sales_table.setRowCount(len(rows))
+        for i, r in enumerate(rows):
+            self.sales_table.setItem(i, 0, QTableWidgetItem(r['created_at'][:16]))
+            client = r['client_name']
+            self.sales_table.setItem(i, 1, QTableWidgetItem(client))
+            self.sales_table.setItem(i, 2, QTableWidgetItem(r.get('product_summary') or ''))
+            self.sales_table.setItem(i, 3, QTableWidgetItem(r.get('source_summary') or 'Company Stock'))
+            self.sales_table.setItem(i, 4, QTableWidgetItem(r.get('quantities_summary') or str(r.get('quantity') or '')))
+            total_item = QTableWidgetItem(f"Rs. {r['total_amount']:,.2f}")
+            total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.sales_table.setItem(i, 5, total_item)
+            paid_item = QTableWidgetItem(f"Rs. {r['amount_paid']:,.2f}")
+            paid_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.sales_table.setItem(i, 6, paid_item)
+            bal_item = QTableWidgetItem(f"Rs. {r['balance']:,.2f}")
+            bal_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            if r['balance'] > 0:
+                bal_item.setForeground(Qt.red)
+            elif r['balance'] < 0:
+                bal_item.setForeground(Qt.darkYellow)
+            else:
+                bal_item.setForeground(Qt.darkGreen)
+            self.sales_table.setItem(i, 7, bal_item)
+            self.sales_table.setItem(i, 8, QTableWidgetItem(r['cashier_name']))
+            self.sales_table.setRowHeight(i, 36)
+
+        self.count_label.setText(f"Transactions: {int(totals['transaction_count'])}")
+        self.total_label.setText(f"Total Sales: Rs. {float(totals['total_sales']):,.2f}")
+
+    def show_lpg_refills(self, rows):
+        self.refill_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            self.refill_table.setItem(i, 0, QTableWidgetItem(row['created_at'][11:16]))
+            self.refill_table.setItem(i, 1, QTableWidgetItem(row['client_name']))
+            self.refill_table.setItem(i, 2, QTableWidgetItem(row['supplier_name']))
+            self.refill_table.setItem(i, 3, QTableWidgetItem(row['capacity']))
+            qty_item = QTableWidgetItem(str(int(row['quantity'])))
+            qty_item.setTextAlignment(Qt.AlignCenter)
+            self.refill_table.setItem(i, 4, qty_item)
+            amount_item = QTableWidgetItem(f"Rs. {float(row['total_amount']):,.2f}")
+            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.refill_table.setItem(i, 5, amount_item)
+            self.refill_table.setItem(i, 6, QTableWidgetItem(row.get('notes') or ''))
+        self.refill_label.setText(f"LPG Refills: {len(rows)}")
 
     def print_daily_report(self):
         try:
+            d = self.date_edit.date().toString('yyyy-MM-dd')
             printer = QPrinter(QPrinter.HighResolution)
             printer.setPageSize(QPageSize(QPageSize.A4))
             printer.setPageOrientation(QPageLayout.Portrait)
             printer.setResolution(300)
             dialog = QPrintDialog(printer, self)
             if dialog.exec():
-                d = self.date_edit.date().toString('yyyy-MM-dd')
-                total_sales = 0.0
-                total_paid = 0.0
-                total_balance = 0.0
-                html = [
-                    "<html><head><style>",
-                    "body{font-family:Arial,sans-serif;color:#0f172a;margin:0}",
-                    ".sheet{max-width:760px;margin:0 auto;padding:14px 18px;border:1.5px solid #1f2937;border-radius:10px}",
-                    ".head{text-align:center;border-bottom:2px solid #1f4f82;padding-bottom:8px;margin-bottom:10px}",
-                    ".title{font-size:18px;font-weight:800;color:#1f4f82}",
-                    ".sub{font-size:12px;color:#334155;margin-top:2px}",
-                    "table{width:100%;border-collapse:collapse;font-size:9.6px}",
-                    "th,td{border:1px solid #334155;padding:4px 5px;text-align:center;vertical-align:middle}",
-                    "th{background:#eaf0f8;font-weight:700}",
-                    "tr:nth-child(even) td{background:#f8fafc}",
-                    ".tot{margin-top:8px;font-size:11px;text-align:center}",
-                    "</style></head><body><div class='sheet'>",
-                    "<div class='head'>",
-                    "<div class='title'>DAILY TRANSACTION SUMMARY</div>",
-                    f"<div class='sub'>Date: {d}</div>",
-                    "</div>",
-                    "<table>",
-                    "<tr><th>Time</th><th>Client</th><th>Products</th><th>Qty</th><th>Total</th><th>Paid</th><th>Balance</th><th>Cashier</th></tr>"
-                ]
-                for i in range(self.sales_table.rowCount()):
-                    row = []
-                    for j in range(self.sales_table.columnCount()):
-                        item = self.sales_table.item(i, j)
-                        row.append(item.text() if item else "")
-                    display_time = row[0][11:16] if len(row[0]) >= 16 else row[0]
-                    html.append(f"<tr><td>{display_time}</td><td>{row[1]}</td><td>{row[2]}<br/><span style='font-size:8px;color:#475569'>{row[3]}</span></td><td>{row[4]}</td><td>{row[5]}</td><td>{row[6]}</td><td>{row[7]}</td><td>{row[8]}</td></tr>")
-
-                    try:
-                        total_sales += float((row[5] or "0").replace("Rs.", "").replace(",", "").strip())
-                        total_paid += float((row[6] or "0").replace("Rs.", "").replace(",", "").strip())
-                        total_balance += float((row[7] or "0").replace("Rs.", "").replace(",", "").strip())
-                    except Exception:
-                        pass
-
-                if self.sales_table.rowCount() == 0:
-                    html.append("<tr><td colspan='8'>No transactions found for selected date.</td></tr>")
-
-                html.append("</table>")
-                html.append(f"<div class='tot'><b>Transactions:</b> {self.sales_table.rowCount()} &nbsp;&nbsp; <b>Total Sales:</b> Rs. {total_sales:,.2f} &nbsp;&nbsp; <b>Total Paid:</b> Rs. {total_paid:,.2f} &nbsp;&nbsp; <b>Total Balance:</b> Rs. {total_balance:,.2f}</div>")
-                html.append("</div></body></html>")
-
+                # Read again: sales may have been recorded since the page was loaded.
+                summary = self.db_manager.get_daily_summary(d)
                 doc = QTextDocument()
                 doc.setDefaultFont(QFont("Arial", 10))
-                doc.setHtml("".join(html))
+                doc.setHtml(render_daily_report(summary))
                 doc.setPageSize(printer.pageRect(QPrinter.Point).size())
                 doc.print_(printer)
         except Exception as e:
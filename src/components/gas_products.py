@@ -4,6 +4,7 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                                QComboBox, QDoubleSpinBox, QTextEdit, QHeaderView)
 from PySide6.QtCore import Qt
 from src.database_module import DatabaseManager
+from src.core.events import PRODUCT_CHANGED, publish
 
 class AddGasProductDialog(QDialog):
     def __init__(self, db_manager: DatabaseManager, parent=None, product_data=None):
@@ -432,6 +433,7 @@ class GasProductsWidget(QWidget):
                 
                 QMessageBox.information(self, "Success", "Gas product added successfully!")
                 self.load_products()
+                publish(PRODUCT_CHANGED, source="gas_products")
                 
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to add product: {str(e)}")
@@ -443,21 +445,14 @@ class GasProductsWidget(QWidget):
             try:
                 product_data = dialog.get_product_data()
                 
-                # For now, we'll delete and re-add since we don't have an update method
-                # In a real application, you'd want to add an update method to DatabaseManager
-                query = '''
-                    UPDATE gas_products 
-                    SET gas_type = ?, sub_type = ?, capacity = ?, unit_price = ?, description = ?
-                    WHERE id = ?
-                '''
-                self.db_manager.execute_update(query, (
+                self.db_manager.update_gas_product(
+                    product['id'],
                     product_data['gas_type'],
                     product_data['sub_type'],
                     product_data['capacity'],
                     product_data['unit_price'],
-                    product_data['description'],
-                    product['id']
-                ))
+                    product_data['description']
+                )
                 
                 self.db_manager.log_activity(
                     "EDIT_GAS_PRODUCT",
@@ -467,6 +462,7 @@ class GasProductsWidget(QWidget):
                 
                 QMessageBox.information(self, "Success", "Gas product updated successfully!")
                 self.load_products()
+                publish(PRODUCT_CHANGED, source="gas_products")
                 
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to update product: {str(e)}")
@@ -503,8 +499,7 @@ class GasProductsWidget(QWidget):
                     return
                 
                 # Delete product
-                query = 'DELETE FROM gas_products WHERE id = ?'
-                self.db_manager.execute_update(query, (product['id'],))
+                self.db_manager.delete_gas_product(product['id'])
                 
                 self.db_manager.log_activity(
                     "DELETE_GAS_PRODUCT",
@@ -514,6 +509,7 @@ class GasProductsWidget(QWidget):
                 
                 QMessageBox.information(self, "Success", "Gas product deleted successfully!")
                 self.load_products()
+                publish(PRODUCT_CHANGED, source="gas_products")
                 
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to delete product: {str(e)}")
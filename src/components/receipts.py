@@ -1,8 +1,7 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-                               QTableWidgetItem, QPushButton, QLineEdit, QLabel, 
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, 
                                QMessageBox, QDialog, QFormLayout, QDialogButtonBox,
                                QTextEdit, QHeaderView, QGroupBox, QGridLayout,
-                               QFrame, QScrollArea, QAbstractItemView)
+                               QFrame, QScrollArea, QAbstractItemView, QTableView)
 from PySide6.QtCore import Qt, QDateTime
 from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from PySide6.QtGui import QTextDocument
@@ -10,7 +9,8 @@ from PySide6.QtCore import QSizeF
 from PySide6.QtGui import QPageSize, QPageLayout
 from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from src.database_module import DatabaseManager
-from src.components.ui_helpers import as_datetime_text, as_money, as_text, table_batch_update
+from src.components.ui_helpers import as_datetime_text, as_money, as_text
+from src.components.table_models import RIGHT, ActionButtonDelegate, Column, RecordTableModel, RowAction
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -485,6 +485,8 @@ body { font-family: Arial, sans-serif; color: #111; background: #fff; margin: 0;
         doc.build(story)
 
 class ReceiptsWidget(QWidget):
+    PAGE_SIZE = 100
+
     def __init__(self, db_manager: DatabaseManager, current_user: dict):
         super().__init__()
         self.db_manager = db_manager
@@ -504,7 +506,7 @@ class ReceiptsWidget(QWidget):
                 padding: 6px 8px;
                 min-height: 30px;
             }
-            QTableWidget {
+            QTableView {
                 background: #ffffff;
                 border: 1px solid #d7dde3;
                 border-radius: 8px;
@@ -555,13 +557,39 @@ class ReceiptsWidget(QWidget):
         table_layout = QVBoxLayout(table_card)
         table_layout.setContentsMargins(10, 10, 10, 10)
 
-        self.receipts_table = QTableWidget()
-        self.receipts_table.setColumnCount(10)
-        self.receipts_table.setHorizontalHeaderLabels([
-            "Receipt #", "Date", "Client", "Products", "Sources", "Quantities", "Total", "Paid", "Balance", "Actions"
-        ])
+        self.receipts_model = RecordTableModel([
+            Column("Receipt #", 'receipt_number'),
+            Column("Date", text=lambda r: as_datetime_text(r.get('created_at'), 16)),
+            Column("Client", text=self._client_text),
+            Column("Products", text=lambda r: as_text(r.get('product_summary') or '')),
+            Column("Sources", text=lambda r: as_text(r.get('source_summary') or 'Company Stock')),
+            Column("Quantities", text=lambda r: as_text(r.get('quantities_summary') or r.get('quantity') or '')),
+            Column("Total", text=lambda r: as_money(r.get('total_amount')), align=RIGHT),
+            Column("Paid", text=lambda r: as_money(r.get('amount_paid')), align=RIGHT),
+            Column("Balance", text=lambda r: as_money(r.get('balance')), align=RIGHT, foreground=self._balance_color),
+            Column("Actions"),
+        ], batch_size=self.PAGE_SIZE, parent=self)
+        self.receipts_model.fetch_failed.connect(
+            lambda error: QMessageBox.critical(self, "Database Error", f"Failed to load more receipts: {error}")
+        )
+        self.receipts_actions = ActionButtonDelegate([
+            RowAction('view', "View", "#17a2b8", width=62),
+            RowAction('print', "Print", "#f39c12", width=62),
+            RowAction('export', "Export", "#2c3e50", width=66),
+        ], self)
+        self.receipts_actions.clicked.connect(self.on_receipt_action)
+
+        self.receipts_table = QTableView()
+        self.receipts_table.setModel(self.receipts_model)
+        self.receipts_table.setItemDelegateForColumn(9, self.receipts_actions)
         self._setup_receipts_table()
         table_layout.addWidget(self.receipts_table)
+
+        self.no_receipts_label = QLabel("No receipts found")
+        self.no_receipts_label.setAlignment(Qt.AlignCenter)
+        self.no_receipts_label.setStyleSheet("color: gray; padding: 8px;")
+        self.no_receipts_label.setVisible(False)
+        table_layout.addWidget(self.no_receipts_label)
         layout.addWidget(table_card, 1)
 
         self.set_role_permissions()
@@ -610,7 +638,7 @@ class ReceiptsWidget(QWidget):
         self.receipts_table.setAlternatingRowColors(True)
         self.receipts_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.receipts_table.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.receipts_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.receipts_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.receipts_table.setWordWrap(True)
         self.receipts_table.verticalHeader().setVisible(False)
         self.receipts_table.verticalHeader().setDefaultSectionSize(44)
@@ -631,15 +659,25 @@ class ReceiptsWidget(QWidget):
 
         self.receipts_table.setColumnWidth(9, 250)
 
+    @staticmethod
+    def _client_text(receipt: dict) -> str:
+        client_text = as_text(receipt.get('client_name'))
+        if receipt.get('client_company'):
+            client_text += f" ({receipt['client_company']})"
+        return client_text
+
+    @staticmethod
+    def _balance_color(receipt: dict):
+        balance_value = float(receipt.get('balance') or 0)
+        if balance_value > 0:
+            return Qt.red
+        if balance_value < 0:
+            return Qt.darkYellow
+        return Qt.darkGreen
+
     def _show_no_receipts_message(self):
-        with table_batch_update(self.receipts_table):
-            self.receipts_table.clearSpans()
-            self.receipts_table.setRowCount(1)
-            self.receipts_table.setItem(0, 0, QTableWidgetItem("No receipts found"))
-            self.receipts_table.setSpan(0, 0, 1, 10)
-            item = self.receipts_table.item(0, 0)
-            item.setTextAlignment(Qt.AlignCenter)
-            item.setForeground(Qt.gray)
+        self.receipts_model.set_rows([])
+        self.no_receipts_label.setVisible(True)
     
     def set_role_permissions(self):
         """Set permissions based on user role"""
@@ -654,7 +692,7 @@ class ReceiptsWidget(QWidget):
     def load_receipts(self):
         """Load all receipts from database"""
         try:
-            receipts = self.db_manager.get_receipts_with_summaries(limit=100)
+            receipts = self.db_manager.get_receipts_with_summaries(limit=self.PAGE_SIZE)
             
             if not receipts:
                 self._show_no_receipts_message()
@@ -725,80 +763,31 @@ class ReceiptsWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate missing receipts: {str(e)}")
     
-    def populate_table(self, receipts):
-        """Populate table with receipt data"""
-        with table_batch_update(self.receipts_table):
-            self.receipts_table.clearSpans()
-            self.receipts_table.setRowCount(len(receipts))
-
-            for row, receipt in enumerate(receipts):
-                self.receipts_table.setItem(row, 0, QTableWidgetItem(as_text(receipt.get('receipt_number'))))
-                self.receipts_table.setItem(row, 1, QTableWidgetItem(as_datetime_text(receipt.get('created_at'), 16)))
-
-                client_text = as_text(receipt.get('client_name'))
-                if receipt.get('client_company'):
-                    client_text += f" ({receipt['client_company']})"
-                self.receipts_table.setItem(row, 2, QTableWidgetItem(client_text))
-
-                product_text = as_text(receipt.get('product_summary') or '')
-                self.receipts_table.setItem(row, 3, QTableWidgetItem(product_text))
-                self.receipts_table.setItem(row, 4, QTableWidgetItem(as_text(receipt.get('source_summary') or 'Company Stock')))
-
-                quantities_text = as_text(receipt.get('quantities_summary') or receipt.get('quantity') or '')
-                self.receipts_table.setItem(row, 5, QTableWidgetItem(quantities_text))
-
-                total_item = QTableWidgetItem(as_money(receipt.get('total_amount')))
-                total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.receipts_table.setItem(row, 6, total_item)
-
-                paid_item = QTableWidgetItem(as_money(receipt.get('amount_paid')))
-                paid_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.receipts_table.setItem(row, 7, paid_item)
-
-                balance_value = float(receipt.get('balance') or 0)
-                balance_item = QTableWidgetItem(as_money(balance_value))
-                balance_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if balance_value > 0:
-                    balance_item.setForeground(Qt.red)
-                elif balance_value < 0:
-                    balance_item.setForeground(Qt.darkYellow)
-                else:
-                    balance_item.setForeground(Qt.darkGreen)
-                self.receipts_table.setItem(row, 8, balance_item)
-            
-                actions_widget = QWidget()
-                actions_widget.setMinimumHeight(34)
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setSpacing(4)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setAlignment(Qt.AlignCenter)
-            
-                view_btn = self._create_small_button("View", "info")
-                view_btn.setMinimumWidth(62)
-                view_btn.clicked.connect(lambda checked, r=receipt: self.view_receipt(r))
-                actions_layout.addWidget(view_btn)
-
-                print_btn = self._create_small_button("Print", "warning")
-                print_btn.setMinimumWidth(62)
-                print_btn.clicked.connect(lambda checked, r=receipt: self.print_receipt(r))
-                actions_layout.addWidget(print_btn)
-
-                export_btn = self._create_small_button("Export", "dark")
-                export_btn.setMinimumWidth(66)
-                export_btn.clicked.connect(lambda checked, r=receipt: self.export_receipt_pdf(r))
-                actions_layout.addWidget(export_btn)
-
-                self.receipts_table.setCellWidget(row, 9, actions_widget)
-                self.receipts_table.setRowHeight(row, 44)
+    def populate_table(self, receipts, search=None):
+        """Populate table with receipt data; older receipts load as the table is scrolled"""
+        self.no_receipts_label.setVisible(False)
+        self.receipts_model.set_rows(
+            receipts,
+            pager=lambda last, limit: self.db_manager.get_receipts_with_summaries(limit=limit, search=search, after=last),
+        )
+
+    def on_receipt_action(self, action: str, receipt: dict):
+        if action == 'view':
+            self.view_receipt(receipt)
+        elif action == 'print':
+            self.print_receipt(receipt)
+        elif action == 'export':
+            self.export_receipt_pdf(receipt)
     
     def filter_receipts(self):
         """Filter receipts based on search input"""
         search_text = self.search_input.text().strip().lower()
         
         try:
-            receipts = self.db_manager.get_receipts_with_summaries(limit=100, search=search_text if search_text else None)
+            search = search_text if search_text else None
+            receipts = self.db_manager.get_receipts_with_summaries(limit=self.PAGE_SIZE, search=search)
             if receipts:
-                self.populate_table(receipts)
+                self.populate_table(receipts, search)
             else:
                 self._show_no_receipts_message()
             
@@ -1,18 +1,29 @@
+import time
+
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                                QLabel, QDateEdit, QComboBox, QGroupBox, QTextEdit,
-                               QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-                               QFileDialog)
+                               QTableView, QAbstractItemView, QHeaderView, QMessageBox,
+                               QFileDialog, QProgressDialog, QApplication)
 from PySide6.QtCore import Qt, QDate
 from src.database_module import DatabaseManager
-from datetime import datetime, timedelta
-import csv
-import json
+from src.components.table_models import RIGHT, Column, RecordTableModel
+from src.reporting import (MONTH_END_PACK, REPORTS, ReportCache, export_report, fetch_page, get_report,
+                           render_html, run_pack, run_report, write_pack, write_pdf)
+from src.reporting.spec import DATETIME
 
 class ReportsWidget(QWidget):
+    # Rows per page of a pageable report; later pages are read as the grid scrolls.
+    PAGE_SIZE = 200
+
     def __init__(self, db_manager: DatabaseManager, current_user: dict):
         super().__init__()
         self.db_manager = db_manager
         self.current_user = current_user
+        self.result = None
+        # (column key, descending) picked from the grid header; None uses the report's default.
+        self.sort = None
+        # Regenerating after every sale or page switch is free while the data version is unchanged.
+        self.report_cache = ReportCache()
         self.init_ui()
     
     def init_ui(self):
@@ -50,13 +61,13 @@ class ReportsWidget(QWidget):
                 font-family: Consolas;
                 font-size: 12px;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #dbe4f0;
                 border-radius: 8px;
                 background: #ffffff;
                 gridline-color: #e5e7eb;
             }
-            QTableWidget::item:selected { background-color: #e6f0ff; color: #0f172a; }
+            QTableView::item:selected { background-color: #e6f0ff; color: #0f172a; }
             QHeaderView::section {
                 background-color: #2563eb;
                 color: white;
@@ -76,18 +87,7 @@ class ReportsWidget(QWidget):
 
         report_layout.addWidget(QLabel("Report Type:"))
         self.report_type_combo = QComboBox()
-        self.report_type_combo.addItems([
-            "Sales Report",
-            "Supplier Sales Summary",
-            "Supplier Fill Payment Summary",
-            "Outstanding Balances",
-            "Employee Report",
-            "Gas Type Summary",
-            "Client Summary",
-            "Pending Cylinder Summary by Client",
-            "LPG Refill Report",
-            "LPG Khata Summary"
-        ])
+        self.report_type_combo.addItems(list(REPORTS))
         self.report_type_combo.currentTextChanged.connect(self.on_report_type_changed)
         report_layout.addWidget(self.report_type_combo)
 
@@ -119,6 +119,22 @@ class ReportsWidget(QWidget):
         self.generate_btn.clicked.connect(self.generate_report)
         report_layout.addWidget(self.generate_btn)
 
+        self.month_end_btn = QPushButton("Month-End Pack")
+        self.month_end_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #7c3aed;
+                color: white;
+                border: 1px solid #6d28d9;
+                border-radius: 6px;
+                padding: 6px 12px;
+                min-height: 30px;
+                font-weight: 600;
+            }
+            QPushButton:hover { background-color: #6d28d9; }
+        """)
+        self.month_end_btn.clicked.connect(self.generate_month_end_pack)
+        report_layout.addWidget(self.month_end_btn)
+
         report_layout.addStretch()
         report_group.setLayout(report_layout)
         layout.addWidget(report_group)
@@ -132,13 +148,23 @@ class ReportsWidget(QWidget):
         self.summary_text.setMaximumHeight(160)
         content_layout.addWidget(self.summary_text)
 
-        self.report_table = QTableWidget()
+        self.row_count_label = QLabel("")
+        self.row_count_label.setStyleSheet("color: #64748b;")
+        content_layout.addWidget(self.row_count_label)
+
+        self.report_model = RecordTableModel([], batch_size=self.PAGE_SIZE, parent=self)
+        self.report_model.fetch_failed.connect(
+            lambda error: QMessageBox.critical(self, "Database Error", f"Failed to load more rows: {error}")
+        )
+        self.report_table = QTableView()
+        self.report_table.setModel(self.report_model)
         self.report_table.setAlternatingRowColors(True)
-        self.report_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.report_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.report_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.report_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.report_table.verticalHeader().setVisible(False)
         self.report_table.verticalHeader().setDefaultSectionSize(34)
         self.report_table.setFocusPolicy(Qt.NoFocus)
+        self.report_table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         content_layout.addWidget(self.report_table)
 
         content_group.setLayout(content_layout)
@@ -179,6 +205,38 @@ class ReportsWidget(QWidget):
         self.export_json_btn.clicked.connect(self.export_json)
         export_layout.addWidget(self.export_json_btn)
 
+        self.export_xlsx_btn = QPushButton("Export as Excel")
+        self.export_xlsx_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #16a34a;
+                color: white;
+                border: 1px solid #15803d;
+                border-radius: 6px;
+                padding: 5px 10px;
+                min-height: 28px;
+                font-weight: 600;
+            }
+            QPushButton:hover { background-color: #15803d; }
+        """)
+        self.export_xlsx_btn.clicked.connect(self.export_xlsx)
+        export_layout.addWidget(self.export_xlsx_btn)
+
+        self.export_pdf_btn = QPushButton("Export as PDF")
+        self.export_pdf_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6366f1;
+                color: white;
+                border: 1px solid #4f46e5;
+                border-radius: 6px;
+                padding: 5px 10px;
+                min-height: 28px;
+                font-weight: 600;
+            }
+            QPushButton:hover { background-color: #4f46e5; }
+        """)
+        self.export_pdf_btn.clicked.connect(self.export_pdf)
+        export_layout.addWidget(self.export_pdf_btn)
+
         self.print_btn = QPushButton("Print Report")
         self.print_btn.setStyleSheet("""
             QPushButton {
@@ -204,7 +262,7 @@ class ReportsWidget(QWidget):
 
     def _apply_table_resize(self, action_col=None):
         header = self.report_table.horizontalHeader()
-        for index in range(self.report_table.columnCount()):
+        for index in range(self.report_model.columnCount()):
             if action_col is not None and index == action_col:
                 header.setSectionResizeMode(index, QHeaderView.ResizeToContents)
             elif index == 0:
@@ -218,504 +276,208 @@ class ReportsWidget(QWidget):
         
         if role == 'Driver':
             self.generate_btn.setEnabled(False)
+            self.month_end_btn.setEnabled(False)
             self.export_csv_btn.setEnabled(False)
             self.export_json_btn.setEnabled(False)
+            self.export_xlsx_btn.setEnabled(False)
+            self.export_pdf_btn.setEnabled(False)
             self.print_btn.setEnabled(False)
     
     def on_report_type_changed(self, report_type):
         """Handle report type change"""
         # Enable/disable date range based on report type
-        if report_type in ["Outstanding Balances", "Client Summary", "Employee Report", "LPG Khata Summary"]:
-            self.from_date_edit.setEnabled(False)
-            self.to_date_edit.setEnabled(False)
-        else:
-            self.from_date_edit.setEnabled(True)
-            self.to_date_edit.setEnabled(True)
+        spec = get_report(report_type)
+        self.from_date_edit.setEnabled(spec.uses_dates)
+        self.to_date_edit.setEnabled(spec.uses_dates)
+        self.sort = None
+        # Switching back to a report that is still current shows it straight away.
+        cached = self.report_cache.get(self.db_manager, spec, self.report_params(), self.PAGE_SIZE, None)
+        if cached is not None:
+            self.show_result(cached)
+
+    def report_params(self) -> dict:
+        return {
+            'from_date': self.from_date_edit.date().toPython(),
+            'to_date': self.to_date_edit.date().toPython(),
+        }
     
     def generate_report(self):
         """Generate selected report"""
         report_type = self.report_type_combo.currentText()
         
         try:
-            if report_type == "Sales Report":
-                self.generate_sales_report()
-            elif report_type == "Supplier Sales Summary":
-                self.generate_supplier_sales_summary()
-            elif report_type == "Supplier Fill Payment Summary":
-                self.generate_supplier_fill_payment_summary()
-            elif report_type == "Outstanding Balances":
-                self.generate_outstanding_balances_report()
-            elif report_type == "Employee Report":
-                self.generate_employee_report()
-            elif report_type == "Gas Type Summary":
-                self.generate_gas_type_summary()
-            elif report_type == "Client Summary":
-                self.generate_client_summary()
-            elif report_type == "Pending Cylinder Summary by Client":
-                self.generate_pending_cylinder_summary_report()
-            elif report_type == "LPG Refill Report":
-                self.generate_lpg_refill_report()
-            elif report_type == "LPG Khata Summary":
-                self.generate_lpg_khata_summary()
-            
+            result = self.report_cache.run(
+                self.db_manager, get_report(report_type), self.report_params(), self.PAGE_SIZE, self.sort
+            )
+            self.show_result(result)
         except Exception as e:
             QMessageBox.critical(self, "Report Error", f"Failed to generate report: {str(e)}")
-    
-    def generate_sales_report(self):
-        """Generate sales report"""
-        from_date = self.from_date_edit.date().toPython()
-        to_date = self.to_date_edit.date().toPython()
-        
-        # Get sales data
-        sales = self.db_manager.get_sales_report(from_date, to_date)
-        
-        # Calculate summary
-        total_sales = sum(sale['total_amount'] for sale in sales)
-        total_tax = sum(sale['tax_amount'] for sale in sales)
-        total_quantity = sum(sale['quantity'] for sale in sales)
-        
-        # Generate summary
-        summary = f"""
-SALES REPORT
-Period: {from_date} to {to_date}
-Total Sales: Rs. {total_sales:,.2f}
-Total Tax: Rs. {total_tax:,.2f}
-Total Quantity: {total_quantity} cylinders
-Number of Transactions: {len(sales)}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        
-        # Populate table
-        self.report_table.setColumnCount(9)
-        self.report_table.setHorizontalHeaderLabels([
-            "Date", "Client", "Products", "Sources", "Quantities", "Unit Price", "Subtotal", "Tax", "Total"
-        ])
-        
-        self.report_table.setRowCount(len(sales))
-        
-        for row, sale in enumerate(sales):
-            self.report_table.setItem(row, 0, QTableWidgetItem(sale['created_at'][:16]))
-            self.report_table.setItem(row, 1, QTableWidgetItem(sale['client_name']))
-            
-            self.report_table.setItem(row, 2, QTableWidgetItem(sale.get('product_summary') or ''))
-            self.report_table.setItem(row, 3, QTableWidgetItem(sale.get('source_summary') or 'Company Stock'))
-            self.report_table.setItem(row, 4, QTableWidgetItem(sale.get('quantities_summary') or str(sale.get('quantity') or '')))
-            self.report_table.setItem(row, 5, QTableWidgetItem(f"Rs. {sale['unit_price']:,.2f}"))
-            self.report_table.setItem(row, 6, QTableWidgetItem(f"Rs. {sale['subtotal']:,.2f}"))
-            self.report_table.setItem(row, 7, QTableWidgetItem(f"Rs. {sale['tax_amount']:,.2f}"))
-            self.report_table.setItem(row, 8, QTableWidgetItem(f"Rs. {sale['total_amount']:,.2f}"))
-        
-        self._apply_table_resize()
 
-    def generate_supplier_sales_summary(self):
-        from_date = self.from_date_edit.date().toPython()
-        to_date = self.to_date_edit.date().toPython()
-        rows = self.db_manager.get_supplier_sales_summary(from_date, to_date)
-        total_sales = sum(float(row['total_amount'] or 0) for row in rows)
-        total_paid = sum(float(row['allocated_paid'] or 0) for row in rows)
-        total_remaining = sum(float(row['remaining_amount'] or 0) for row in rows)
-        summary = f"""
-SUPPLIER SALES SUMMARY
-Period: {from_date} to {to_date}
-Suppliers / Sources: {len(rows)}
-Total Sales: Rs. {total_sales:,.2f}
-Allocated Paid: Rs. {total_paid:,.2f}
-Remaining: Rs. {total_remaining:,.2f}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        self.report_table.setColumnCount(8)
-        self.report_table.setHorizontalHeaderLabels([
-            "Source", "Clients", "Transactions", "Quantity", "Subtotal", "Tax", "Total", "Remaining"
-        ])
-        self.report_table.setRowCount(len(rows))
-        for row_idx, row in enumerate(rows):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(row['supplier_name']))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(str(int(row['client_count'] or 0))))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(str(int(row['transaction_count'] or 0))))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(str(int(row['total_quantity'] or 0))))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(f"Rs. {float(row['subtotal'] or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(f"Rs. {float(row['tax_amount'] or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 6, QTableWidgetItem(f"Rs. {float(row['total_amount'] or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 7, QTableWidgetItem(f"Rs. {float(row['remaining_amount'] or 0):,.2f}"))
-        self._apply_table_resize()
+    def generate_month_end_pack(self):
+        """Run the month-end reports concurrently into one PDF or Excel file"""
+        params = self.report_params()
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Save Month-End Pack",
+            f"Month_End_Pack_{params['from_date']}_{params['to_date']}.pdf",
+            "PDF Files (*.pdf);;Excel Files (*.xlsx)"
+        )
+        if not filename:
+            return
+        fmt = 'xlsx' if filename.lower().endswith('.xlsx') or 'xlsx' in selected_filter else 'pdf'
+        if not filename.lower().endswith(f".{fmt}"):
+            filename += f".{fmt}"
 
-    def generate_supplier_fill_payment_summary(self):
-        from_date = self.from_date_edit.date().toPython()
-        to_date = self.to_date_edit.date().toPython()
-        rows = self.db_manager.get_supplier_fill_payment_summary(start_date=from_date, end_date=to_date)
-        total_fill = sum(float(row.get('fill_total') or 0) for row in rows)
-        total_paid = sum(float(row.get('total_paid') or 0) for row in rows)
-        total_remaining = sum(float(row.get('remaining_amount') or 0) for row in rows)
-        summary = f"""
-SUPPLIER FILL PAYMENT SUMMARY
-Period: {from_date} to {to_date}
-Suppliers: {len(rows)}
-Total Fill Cost: Rs. {total_fill:,.2f}
-Total Paid: Rs. {total_paid:,.2f}
-Remaining Supplier Balance: Rs. {total_remaining:,.2f}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        self.report_table.setColumnCount(8)
-        self.report_table.setHorizontalHeaderLabels([
-            "Supplier", "Cylinders", "Other Gas Fill", "LPG Fill", "Fill Cost", "Paid", "Remaining", "Last Payment"
-        ])
-        self.report_table.setRowCount(len(rows))
-        for row_idx, row in enumerate(rows):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(row.get('supplier_name') or ''))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(str(int(row.get('total_cylinders') or 0))))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(f"Rs. {float(row.get('other_gas_total') or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(f"Rs. {float(row.get('lpg_refill_total') or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(f"Rs. {float(row.get('fill_total') or 0):,.2f}"))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(f"Rs. {float(row.get('total_paid') or 0):,.2f}"))
-            remaining_item = QTableWidgetItem(f"Rs. {float(row.get('remaining_amount') or 0):,.2f}")
-            if float(row.get('remaining_amount') or 0) > 0:
-                remaining_item.setForeground(Qt.red)
-            else:
-                remaining_item.setForeground(Qt.darkGreen)
-            self.report_table.setItem(row_idx, 6, remaining_item)
-            self.report_table.setItem(row_idx, 7, QTableWidgetItem(str(row.get('last_payment_date') or '')))
-        self._apply_table_resize()
-    
-    def generate_outstanding_balances_report(self):
-        """Generate outstanding balances report"""
-        # Get clients with outstanding balances
-        clients = self.db_manager.get_outstanding_balances()
-        
-        # Calculate summary
-        total_outstanding = sum(client['balance'] for client in clients)
-        
-        # Generate summary
-        summary = f"""
-OUTSTANDING BALANCES REPORT
-Total Outstanding: Rs. {total_outstanding:,.2f}
-Number of Clients with Outstanding Balance: {len(clients)}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        
-        # Populate table
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            "Client ID", "Name", "Phone", "Company", "Total Purchases", "Outstanding Balance"
-        ])
-        
-        self.report_table.setRowCount(len(clients))
-        
-        for row, client in enumerate(clients):
-            self.report_table.setItem(row, 0, QTableWidgetItem(str(client['id'])))
-            self.report_table.setItem(row, 1, QTableWidgetItem(client['name']))
-            self.report_table.setItem(row, 2, QTableWidgetItem(client['phone']))
-            self.report_table.setItem(row, 3, QTableWidgetItem(client['company'] or ''))
-            self.report_table.setItem(row, 4, QTableWidgetItem(f"Rs. {client['total_purchases']:,.2f}"))
-            
-            balance_item = QTableWidgetItem(f"Rs. {client['balance']:,.2f}")
-            balance_item.setForeground(Qt.red)
-            self.report_table.setItem(row, 5, balance_item)
-        
-        self._apply_table_resize()
-    
-    def generate_employee_report(self):
-        """Generate employee report"""
-        # Get employees
-        employees = self.db_manager.get_employees()
-        
-        # Calculate summary
-        total_salary = sum(employee['salary'] for employee in employees)
-        
-        # Role distribution
-        role_counts = {}
-        for employee in employees:
-            role = employee['role']
-            role_counts[role] = role_counts.get(role, 0) + 1
-        
-        # Generate summary
-        summary = f"""
-EMPLOYEE REPORT
-Total Employees: {len(employees)}
-Total Monthly Salary: Rs. {total_salary:,.2f}
-
-Role Distribution:
-{chr(10).join(f"{role}: {count}" for role, count in role_counts.items())}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        
-        # Populate table
-        self.report_table.setColumnCount(5)
-        self.report_table.setHorizontalHeaderLabels([
-            "ID", "Name", "Role", "Salary", "Contact"
-        ])
-        
-        self.report_table.setRowCount(len(employees))
-        
-        for row, employee in enumerate(employees):
-            self.report_table.setItem(row, 0, QTableWidgetItem(str(employee['id'])))
-            self.report_table.setItem(row, 1, QTableWidgetItem(employee['name']))
-            self.report_table.setItem(row, 2, QTableWidgetItem(employee['role']))
-            
-            salary_item = QTableWidgetItem(f"Rs. {employee['salary']:,.2f}")
-            salary_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.report_table.setItem(row, 3, salary_item)
-            
-            self.report_table.setItem(row, 4, QTableWidgetItem(employee['contact'] or ''))
-        
-        self._apply_table_resize()
-    
-    def generate_gas_type_summary(self):
-        """Generate gas type summary report"""
-        from_date = self.from_date_edit.date().toPython()
-        to_date = self.to_date_edit.date().toPython()
-        
-        # Get sales data grouped by gas type
-        query = '''
-            SELECT gp.gas_type, gp.sub_type, gp.capacity,
-                   COUNT(s.id) as transaction_count,
-                   SUM(s.quantity) as total_quantity,
-                   SUM(s.total_amount) as total_amount,
-                   SUM(s.tax_amount) as total_tax
-            FROM sales s
-            JOIN gas_products gp ON s.gas_product_id = gp.id
-            WHERE DATE(s.created_at) BETWEEN ? AND ?
-            GROUP BY gp.gas_type, gp.sub_type, gp.capacity
-            ORDER BY gp.gas_type, gp.sub_type, gp.capacity
-        '''
-        
-        gas_summary = self.db_manager.execute_query(query, (from_date, to_date))
-        
-        # Calculate totals
-        total_transactions = sum(item['transaction_count'] for item in gas_summary)
-        total_quantity = sum(item['total_quantity'] for item in gas_summary)
-        total_amount = sum(item['total_amount'] for item in gas_summary)
-        
-        # Generate summary
-        summary = f"""
-GAS TYPE SUMMARY REPORT
-Period: {from_date} to {to_date}
-Total Transactions: {total_transactions}
-Total Quantity: {total_quantity} cylinders
-Total Sales: Rs. {total_amount:,.2f}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        
-        # Populate table
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            "Gas Type", "Sub Type", "Capacity", "Transactions", "Quantity", "Total Sales"
-        ])
-        
-        self.report_table.setRowCount(len(gas_summary))
-        
-        for row, item in enumerate(gas_summary):
-            self.report_table.setItem(row, 0, QTableWidgetItem(item['gas_type']))
-            self.report_table.setItem(row, 1, QTableWidgetItem(item['sub_type'] or ''))
-            self.report_table.setItem(row, 2, QTableWidgetItem(item['capacity']))
-            self.report_table.setItem(row, 3, QTableWidgetItem(str(item['transaction_count'])))
-            self.report_table.setItem(row, 4, QTableWidgetItem(str(item['total_quantity'])))
-            
-            amount_item = QTableWidgetItem(f"Rs. {item['total_amount']:,.2f}")
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.report_table.setItem(row, 5, amount_item)
-        
-        self._apply_table_resize()
-    
-    def generate_client_summary(self):
-        """Generate client summary report"""
-        # Get all clients
-        clients = self.db_manager.get_clients()
-        
-        # Calculate summary
-        total_clients = len(clients)
-        total_purchases = sum(client['total_purchases'] for client in clients)
-        total_outstanding = sum(client['balance'] for client in clients)
-        clients_with_balance = len([c for c in clients if c['balance'] > 0])
-        
-        # Generate summary
-        summary = f"""
-CLIENT SUMMARY REPORT
-Total Clients: {total_clients}
-Total Purchases: Rs. {total_purchases:,.2f}
-Total Outstanding: Rs. {total_outstanding:,.2f}
-Clients with Outstanding Balance: {clients_with_balance}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        
-        # Populate table
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            "Client ID", "Name", "Phone", "Company", "Total Purchases", "Outstanding Balance"
-        ])
-        
-        # Sort by outstanding balance (descending)
-        clients.sort(key=lambda x: x['balance'], reverse=True)
-        
-        self.report_table.setRowCount(len(clients))
-        
-        for row, client in enumerate(clients):
-            self.report_table.setItem(row, 0, QTableWidgetItem(str(client['id'])))
-            self.report_table.setItem(row, 1, QTableWidgetItem(client['name']))
-            self.report_table.setItem(row, 2, QTableWidgetItem(client['phone']))
-            self.report_table.setItem(row, 3, QTableWidgetItem(client['company'] or ''))
-            self.report_table.setItem(row, 4, QTableWidgetItem(f"Rs. {client['total_purchases']:,.2f}"))
-            
-            balance_item = QTableWidgetItem(f"Rs. {client['balance']:,.2f}")
-            if client['balance'] > 0:
-                balance_item.setForeground(Qt.red)
-            self.report_table.setItem(row, 5, balance_item)
-        
-        self._apply_table_resize()
+        progress = QProgressDialog("Running month-end reports...", "Cancel", 0, len(MONTH_END_PACK), self)
+        progress.setCancelButton(None)
+        progress.setWindowTitle("Month-End Pack")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        lines = []
 
-    def generate_pending_cylinder_summary_report(self):
-        """Generate pending cylinder summary by client"""
-        rows = self.db_manager.get_pending_cylinder_summary_by_client()
-        total_pending = sum(r['pending_cylinders'] for r in rows)
-        with_pending = len([r for r in rows if r['pending_cylinders'] > 0])
-        summary = f"""
-PENDING CYLINDER SUMMARY BY CLIENT
-Total Pending Cylinders: {total_pending}
-Clients with Pending Cylinders: {with_pending}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        self.report_table.setColumnCount(4)
-        self.report_table.setHorizontalHeaderLabels(["Client", "Phone", "Company", "Pending Cylinders"])
-        self.report_table.setRowCount(len(rows))
-        for i, r in enumerate(rows):
-            self.report_table.setItem(i, 0, QTableWidgetItem(r['name']))
-            self.report_table.setItem(i, 1, QTableWidgetItem(r['phone']))
-            self.report_table.setItem(i, 2, QTableWidgetItem(r.get('company') or ''))
-            item = QTableWidgetItem(str(int(r['pending_cylinders'])))
-            if int(r['pending_cylinders']) > 0:
-                item.setForeground(Qt.red)
-            self.report_table.setItem(i, 3, item)
-        self._apply_table_resize()
+        def on_report_done(entry):
+            lines.append(entry.status)
+            progress.setValue(len(lines))
+            progress.setLabelText("\n".join(lines))
 
-    def generate_lpg_refill_report(self):
-        from_date = self.from_date_edit.date().toPython()
-        to_date = self.to_date_edit.date().toPython()
-        rows = self.db_manager.get_lpg_refill_report(from_date, to_date)
-        total_qty = sum(int(row['total_quantity'] or 0) for row in rows)
-        total_amount = sum(float(row['total_amount'] or 0) for row in rows)
-        summary = f"""
-LPG REFILL REPORT
-Period: {from_date} to {to_date}
-Entries: {len(rows)}
-Total Refilled Cylinders: {total_qty}
-Total Refill Amount: Rs. {total_amount:,.2f}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            "Client", "Phone", "Supplier", "Capacity", "Quantity", "Amount"
-        ])
-        self.report_table.setRowCount(len(rows))
-        for row_idx, row in enumerate(rows):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(row['client_name']))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(row['client_phone']))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(row['supplier_name']))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(row['capacity']))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(str(int(row['total_quantity'] or 0))))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(f"Rs. {float(row['total_amount'] or 0):,.2f}"))
-        self._apply_table_resize()
+        started = time.perf_counter()
+        try:
+            entries = run_pack(self.db_manager, MONTH_END_PACK, params,
+                               progress=on_report_done, idle=QApplication.processEvents)
+            title = f"Month-End Pack: {params['from_date']} to {params['to_date']}"
+            count = write_pack(entries, fmt, filename, title, self.current_user.get('full_name') or '')
+        except Exception as e:
+            QMessageBox.critical(self, "Report Error", f"Failed to generate month-end pack: {str(e)}")
+            return
+        finally:
+            progress.close()
 
-    def generate_lpg_khata_summary(self):
-        rows = self.db_manager.get_lpg_khata_summary()
-        total_pending = sum(int(row['pending_client'] or 0) for row in rows)
-        total_refilled = sum(int(row['refilled'] or 0) for row in rows)
-        total_empty_balance = sum(int(row['empty_balance'] or 0) for row in rows)
-        summary = f"""
-LPG KHATA SUMMARY
-Clients / Rows: {len(rows)}
-Pending With Client: {total_pending}
-Refilled: {total_refilled}
-Empty Balance: {total_empty_balance}
-        """
-        self.summary_text.setPlainText(summary.strip())
-        self.report_table.setColumnCount(8)
-        self.report_table.setHorizontalHeaderLabels([
-            "Client", "Phone", "Company", "Capacity", "Delivered", "Returned", "Refilled", "Empty Balance"
+        message = f"{count:,} rows written to {filename} in {time.perf_counter() - started:.2f}s\n\n" + "\n".join(
+            entry.status for entry in entries
+        )
+        if any(entry.error for entry in entries):
+            QMessageBox.warning(self, "Month-End Pack", message)
+        else:
+            QMessageBox.information(self, "Month-End Pack", message)
+
+    def on_header_clicked(self, section: int):
+        """Sort a pageable report on the clicked column, in the database"""
+        if self.result is None or not self.result.spec.pageable or not 0 <= section < len(self.result.columns):
+            return
+        column = self.result.columns[section]
+        current_key, current_desc = self.result.sort or (None, True)
+        # Same column flips the direction; a new one starts with the largest / latest values first.
+        descending = not current_desc if column.key == current_key else column.numeric or column.type == DATETIME
+        self.sort = (column.key, descending)
+        self.generate_report()
+
+    def show_result(self, result):
+        """Show a report result in the summary box and the grid"""
+        self.result = result
+        self.summary_text.setPlainText(result.summary_text())
+        self.report_model.set_columns([
+            Column(
+                c.title,
+                text=lambda r, c=c: c.format(r[c.key]),
+                align=RIGHT if c.numeric else None,
+                foreground=(lambda r, c=c: self._TONES.get(c.tone(r[c.key]))) if c.tone else None,
+            )
+            for c in result.columns
         ])
-        self.report_table.setRowCount(len(rows))
-        for row_idx, row in enumerate(rows):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(row['client_name']))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(row['phone']))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(row['company']))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(row['capacity']))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(str(int(row['delivered'] or 0))))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(str(int(row['returned'] or 0))))
-            self.report_table.setItem(row_idx, 6, QTableWidgetItem(str(int(row['refilled'] or 0))))
-            self.report_table.setItem(row_idx, 7, QTableWidgetItem(str(int(row['empty_balance'] or 0))))
+        pager = None
+        if not result.complete:
+            spec, params, sort = result.spec, dict(result.params), result.sort
+            pager = lambda last, limit: fetch_page(self.db_manager, spec, params, sort, last, limit)
+        self.report_model.set_rows(result.rows, pager)
         self._apply_table_resize()
-    
-    def export_csv(self):
-        """Export report as CSV"""
+
+        header = self.report_table.horizontalHeader()
+        header.setSectionsClickable(result.spec.pageable)
+        sort_section = next((i for i, c in enumerate(result.columns) if result.sort and c.key == result.sort[0]), -1)
+        header.setSortIndicatorShown(sort_section >= 0)
+        if sort_section >= 0:
+            header.setSortIndicator(sort_section, Qt.DescendingOrder if result.sort[1] else Qt.AscendingOrder)
+        self.row_count_label.setText(f"{result.row_count:,} rows")
+
+    def complete_result(self):
+        """The shown report with every row, for printing and PDF (a paged result holds one page)."""
+        if self.result.complete:
+            return self.result
+        return run_report(self.db_manager, self.result.spec, self.result.params)
+
+    _TONES = {'negative': Qt.red, 'positive': Qt.darkGreen, 'warning': Qt.darkYellow}
+
+    def _export_filename(self, title: str, extension: str, file_filter: str) -> str:
         filename, _ = QFileDialog.getSaveFileName(
             self,
-            "Export Report as CSV",
-            f"Report_{self.report_type_combo.currentText().replace(' ', '_')}_{QDate.currentDate().toString('yyyy-MM-dd')}.csv",
-            "CSV Files (*.csv)"
+            title,
+            f"Report_{self.report_type_combo.currentText().replace(' ', '_')}_{QDate.currentDate().toString('yyyy-MM-dd')}.{extension}",
+            file_filter
         )
-        
+        return filename
+
+    def _stream_export(self, fmt: str, filename: str):
+        """Stream the selected report from the database into filename"""
+        spec = get_report(self.report_type_combo.currentText())
+        progress = QProgressDialog(f"Exporting {spec.name}...", "Cancel", 0, 0, self)
+        progress.setCancelButton(None)
+        progress.setWindowTitle("Export")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def on_progress(count: int):
+            progress.setLabelText(f"Exporting {spec.name}... {count:,} rows")
+            QApplication.processEvents()
+
+        try:
+            result = export_report(self.db_manager, spec, self.report_params(), fmt, filename, progress=on_progress)
+        finally:
+            progress.close()
+        return result
+
+    def _export(self, fmt: str, label: str, extension: str, file_filter: str):
+        filename = self._export_filename(f"Export Report as {label}", extension, file_filter)
         if filename:
+            if filename.lower().endswith('.ndjson'):
+                fmt = 'ndjson'
             try:
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    
-                    # Write headers
-                    headers = []
-                    for col in range(self.report_table.columnCount()):
-                        headers.append(self.report_table.horizontalHeaderItem(col).text())
-                    writer.writerow(headers)
-                    
-                    # Write data
-                    for row in range(self.report_table.rowCount()):
-                        row_data = []
-                        for col in range(self.report_table.columnCount()):
-                            item = self.report_table.item(row, col)
-                            row_data.append(item.text() if item else '')
-                        writer.writerow(row_data)
-                
-                QMessageBox.information(self, "Success", f"Report exported to {filename}")
-                
+                result = self._stream_export(fmt, filename)
+                QMessageBox.information(self, "Success", f"{result.row_count:,} rows exported to {filename}")
             except Exception as e:
-                QMessageBox.critical(self, "Export Error", f"Failed to export CSV: {str(e)}")
+                QMessageBox.critical(self, "Export Error", f"Failed to export {label}: {str(e)}")
+    
+    def export_csv(self):
+        """Export report as CSV"""
+        self._export('csv', "CSV", "csv", "CSV Files (*.csv)")
     
     def export_json(self):
         """Export report as JSON"""
-        filename, _ = QFileDialog.getSaveFileName(
-            self,
-            "Export Report as JSON",
-            f"Report_{self.report_type_combo.currentText().replace(' ', '_')}_{QDate.currentDate().toString('yyyy-MM-dd')}.json",
-            "JSON Files (*.json)"
-        )
-        
+        self._export('json', "JSON", "json", "JSON Files (*.json);;JSON Lines (*.ndjson)")
+
+    def export_xlsx(self):
+        """Export report as an Excel workbook"""
+        self._export('xlsx', "Excel", "xlsx", "Excel Files (*.xlsx)")
+
+    def export_pdf(self):
+        """Export report as PDF"""
+        if self.result is None:
+            QMessageBox.information(self, "Export", "Generate a report first.")
+            return
+        filename = self._export_filename("Export Report as PDF", "pdf", "PDF Files (*.pdf)")
         if filename:
             try:
-                # Build JSON data
-                report_data = {
-                    "report_type": self.report_type_combo.currentText(),
-                    "generated_date": QDate.currentDate().toString("yyyy-MM-dd"),
-                    "summary": self.summary_text.toPlainText(),
-                    "data": []
-                }
-                
-                # Add table data
-                for row in range(self.report_table.rowCount()):
-                    row_data = {}
-                    for col in range(self.report_table.columnCount()):
-                        header = self.report_table.horizontalHeaderItem(col).text()
-                        item = self.report_table.item(row, col)
-                        row_data[header] = item.text() if item else ''
-                    report_data["data"].append(row_data)
-                
-                with open(filename, 'w', encoding='utf-8') as jsonfile:
-                    json.dump(report_data, jsonfile, indent=2, ensure_ascii=False)
-                
+                write_pdf(self.complete_result(), filename, self.current_user.get('full_name') or '')
                 QMessageBox.information(self, "Success", f"Report exported to {filename}")
-                
             except Exception as e:
-                QMessageBox.critical(self, "Export Error", f"Failed to export JSON: {str(e)}")
+                QMessageBox.critical(self, "Export Error", f"Failed to export PDF: {str(e)}")
     
     def print_report(self):
         """Print the report"""
         from PySide6.QtPrintSupport import QPrinter, QPrintDialog
         from PySide6.QtGui import QTextDocument
+
+        if self.result is None:
+            return
         
         printer = QPrinter(QPrinter.HighResolution)
         dialog = QPrintDialog(printer, self)
@@ -730,45 +492,4 @@ Empty Balance: {total_empty_balance}
     
     def generate_print_html(self):
         """Generate HTML content for printing"""
-        # Build table HTML
-        table_html = "<table border='1' cellpadding='5' cellspacing='0' style='width: 100%; border-collapse: collapse;'>"
-        
-        # Headers
-        table_html += "<tr>"
-        for col in range(self.report_table.columnCount()):
-            header = self.report_table.horizontalHeaderItem(col).text()
-            table_html += f"<th style='background-color: #f2f2f2; font-weight: bold;'>{header}</th>"
-        table_html += "</tr>"
-        
-        # Data rows
-        for row in range(self.report_table.rowCount()):
-            table_html += "<tr>"
-            for col in range(self.report_table.columnCount()):
-                item = self.report_table.item(row, col)
-                text = item.text() if item else ''
-                table_html += f"<td>{text}</td>"
-            table_html += "</tr>"
-        
-        table_html += "</table>"
-        
-        return f"""
-<html>
-<head>
-<style>
-body {{ font-family: Arial, sans-serif; margin: 20px; }}
-h1 {{ color: #2c3e50; }}
-.summary {{ background-color: #f8f9fa; padding: 15px; border: 1px solid #dee2e6; margin-bottom: 20px; }}
-</style>
-</head>
-<body>
-<h1>{self.report_type_combo.currentText()}</h1>
-<div class="summary">
-<pre>{self.summary_text.toPlainText()}</pre>
-</div>
-{table_html}
-<p style="margin-top: 20px; font-size: 12px; color: #666;">
-Generated on: {QDate.currentDate().toString("yyyy-MM-dd")} by {self.current_user['full_name']}
-</p>
-</body>
-</html>
-        """
+        return render_html(self.complete_result(), self.current_user['full_name'])
@@ -6,7 +6,10 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 from src.database_module import DatabaseManager
-from src.components.ui_helpers import as_datetime_text, as_money, as_text, refresh_application_views, table_batch_update
+from src.components.ui_helpers import as_datetime_text, as_money, as_text, table_batch_update
+from src.core.events import CLIENT_CHANGED, PAYMENT_RECORDED, SALE_CREATED, publish
+from src.core.directory import attach_directory, supplier_directory_model
+from src.core.client_search import ClientSearch
 
 class SalesWidget(QWidget):
     def __init__(self, db_manager: DatabaseManager, current_user: dict):
@@ -16,10 +19,18 @@ class SalesWidget(QWidget):
         self.current_client = None
         self.current_products = []
         self.init_ui()
+        # Pages live inside the main window's stack and may never get a close event of their own.
+        search = self.client_search
+        self.destroyed.connect(lambda *_: search.shutdown())
         self.load_suppliers()
         self.load_gas_products()
         self.load_recent_sales()
 
+    def closeEvent(self, event):
+        """Stop the client search worker with the page."""
+        self.client_search.shutdown()
+        super().closeEvent(event)
+
     def init_ui(self):
         self.setStyleSheet("""
             QWidget { background-color: #f5f6f8; color: #1f2937; font-size: 13px; }
@@ -70,6 +81,11 @@ class SalesWidget(QWidget):
         client_row.setSpacing(8)
         self.client_search_input = QLineEdit()
         self.client_search_input.setPlaceholderText("Search client by name, phone, or company...")
+        self.client_search = ClientSearch(self.db_manager, limit=50, parent=self)
+        self.client_search.results_ready.connect(self.show_client_results)
+        self.client_search.search_failed.connect(
+            lambda error: QMessageBox.critical(self, "Database Error", f"Failed to search clients: {error}")
+        )
         self.client_search_input.textChanged.connect(self.search_clients)
         self.client_combo = QComboBox()
         self.client_combo.currentIndexChanged.connect(self.on_client_selected)
@@ -95,6 +111,8 @@ class SalesWidget(QWidget):
         product_form.addRow("Product:", self.gas_product_combo)
 
         self.supplier_combo = QComboBox()
+        self.supplier_directory = supplier_directory_model(self.db_manager)
+        attach_directory(self.supplier_combo, self.supplier_directory, "Company Stock / No Supplier")
         self.supplier_combo.currentIndexChanged.connect(self.on_supplier_changed)
         product_form.addRow("Source Supplier:", self.supplier_combo)
 
@@ -311,22 +329,21 @@ class SalesWidget(QWidget):
         table.verticalHeader().setDefaultSectionSize(34)
 
     def search_clients(self):
-        search_text = self.client_search_input.text().strip()
-        if not search_text:
+        self.client_search.set_term(self.client_search_input.text())
+
+    def show_client_results(self, term: str, clients: list):
+        """Fill the client picker with the ranked matches for the current search"""
+        if not term:
             self.client_combo.clear()
             self.current_client = None
             self.client_info_label.setText("No client selected")
             return
-        try:
-            clients = self.db_manager.get_clients(search_text)
-            self.client_combo.clear()
-            for client in clients:
-                display_text = f"{client['name']} ({client['phone']})"
-                if client['company']:
-                    display_text += f" - {client['company']}"
-                self.client_combo.addItem(display_text, client)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to search clients: {str(e)}")
+        self.client_combo.clear()
+        for client in clients:
+            display_text = f"{client['name']} ({client['phone']})"
+            if client['company']:
+                display_text += f" - {client['company']}"
+            self.client_combo.addItem(display_text, client)
 
     def on_client_selected(self):
         index = self.client_combo.currentIndex()
@@ -342,6 +359,28 @@ class SalesWidget(QWidget):
             self.current_client = None
             self.client_info_label.setText("No client selected")
 
+    def refresh_selected_client(self):
+        """Reload the selected client's balance after a change elsewhere"""
+        index = self.client_combo.currentIndex()
+        if index < 0 or not self.current_client:
+            return
+        client = self.db_manager.get_client_by_id(self.current_client['id'])
+        if client:
+            self.client_combo.setItemData(index, client)
+            self.on_client_selected()
+
+    def handle_domain_event(self, event) -> bool:
+        """Apply a domain event without reloading the whole page"""
+        if event.name == CLIENT_CHANGED:
+            self.client_search.invalidate()
+        if event.name not in (SALE_CREATED, PAYMENT_RECORDED, CLIENT_CHANGED) or not event.client_id:
+            return False
+        if self.current_client and self.current_client.get('id') == event.client_id:
+            self.refresh_selected_client()
+        if event.name == SALE_CREATED:
+            self.load_recent_sales()
+        return True
+
     def on_product_selected(self):
         index = self.gas_product_combo.currentIndex()
         if index >= 0:
@@ -362,20 +401,9 @@ class SalesWidget(QWidget):
 
     def load_suppliers(self):
         try:
-            current_supplier = self.supplier_combo.currentData() if hasattr(self, "supplier_combo") else None
-            self.supplier_combo.clear()
-            self.supplier_combo.addItem("Company Stock / No Supplier", None)
-            for supplier in self.db_manager.get_suppliers():
-                self.supplier_combo.addItem(supplier["name"], supplier)
-            if current_supplier is None:
-                self.supplier_combo.setCurrentIndex(0)
-                return
-            for idx in range(self.supplier_combo.count()):
-                data = self.supplier_combo.itemData(idx)
-                if isinstance(data, dict) and data.get("id") == current_supplier.get("id"):
-                    self.supplier_combo.setCurrentIndex(idx)
-                    return
-            self.supplier_combo.setCurrentIndex(0)
+            # The shared model keeps the current selection across refreshes; a deactivated
+            # supplier drops out and the combo falls back to company stock.
+            self.supplier_directory.refresh()
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to load suppliers: {str(e)}")
 
@@ -613,8 +641,7 @@ class SalesWidget(QWidget):
             try:
                 current_client_id = self.current_client['id']
                 current_client_name = self.current_client['name']
-                receipt_number = self.db_manager.get_next_receipt_number()
-                result = self.db_manager.create_sale_with_receipt(
+                result = self.db_manager.commit_sale(
                     client_id=current_client_id,
                     items=[
                         {
@@ -636,30 +663,21 @@ class SalesWidget(QWidget):
                     amount_paid=amount_paid,
                     balance=balance,
                     created_by=self.current_user['id'],
-                    receipt_number=receipt_number,
-                )
-                self.db_manager.log_activity(
-                    "CREATE_SALE",
-                    f"Created sale for client: {current_client_name}, Receipt: {receipt_number}",
-                    self.current_user['id']
                 )
-                try:
-                    from datetime import date, timedelta
-                    d = date.today()
-                    wd = d.weekday()
-                    sat_offset = (wd - 5) % 7
-                    week_start = d if wd == 5 else (d - timedelta(days=sat_offset))
-                    week_end = week_start + timedelta(days=6)
-                    ws = week_start.strftime('%Y-%m-%d')
-                    we = week_end.strftime('%Y-%m-%d')
-                    self.db_manager.upsert_weekly_invoice(current_client_id, ws, we, self.current_user.get('id'))
-                except Exception:
-                    pass
                 QMessageBox.information(
                     self,
                     "Sale Completed",
-                    f"Sale completed successfully!\nReceipt Number: {result['receipt_number']}"
+                    f"Sale completed successfully!\nReceipt Number: {result['receipt_number']}\n"
+                    f"Client Balance: Rs. {result['client_balance']:,.2f}"
                 )
+                if result.get('weekly_invoice_error'):
+                    QMessageBox.warning(
+                        self,
+                        "Weekly Invoice Not Updated",
+                        f"The sale was saved, but the weekly invoice for {result['week_start']} to "
+                        f"{result['week_end']} could not be updated:\n{result['weekly_invoice_error']}\n\n"
+                        "It is refreshed again when that week is opened on the Weekly Payments page."
+                    )
                 self.clear_cart()
                 self.clear_form()
                 self.load_recent_sales()
@@ -678,15 +696,12 @@ class SalesWidget(QWidget):
                     self.client_combo.setCurrentIndex(-1)
                     self.current_client = None
                     self.client_info_label.setText("No client selected")
-                refresh_application_views(
-                    "sales",
-                    "supplier_payments",
-                    "weekly_payments",
-                    "cylinder_availability",
-                    "daily_transactions",
-                    "receipts",
-                    "cylinder_track",
-                    "reports",
+                publish(
+                    SALE_CREATED,
+                    current_client_id,
+                    source="sales",
+                    sale_id=result['sale_id'],
+                    receipt_number=result['receipt_number'],
                 )
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to complete sale: {str(e)}")
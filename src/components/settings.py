@@ -1,11 +1,13 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                                QLabel, QGroupBox, QFormLayout, QLineEdit, 
                                QMessageBox, QTabWidget, QTableWidget, QTableWidgetItem,
-                               QHeaderView, QCheckBox, QTextEdit, QComboBox)
-from PySide6.QtCore import Qt, QDateTime
+                               QHeaderView, QCheckBox, QTextEdit, QComboBox, QDateEdit)
+from PySide6.QtCore import Qt, QDateTime, QDate
 from src.database_module import DatabaseManager
 from src.components.backup import BackupManager
 from src.components.ui_helpers import as_text, as_datetime_text, table_batch_update
+from src.core.events import PERIOD_CLOSED, publish
+import json
 import os
 
 class SettingsWidget(QWidget):
@@ -356,6 +358,37 @@ class SettingsWidget(QWidget):
         cleanup_btn = QPushButton("Cleanup Backups Older Than 30 Days")
         cleanup_btn.clicked.connect(self.cleanup_old_backups)
         backup_layout.addWidget(cleanup_btn)
+
+        # Period close / archive
+        period_close_group = QGroupBox("Close Financial Period")
+        period_close_layout = QVBoxLayout()
+        period_close_layout.setSpacing(10)
+
+        period_close_info = QLabel(
+            "Billing weeks that ended before the cutoff and are fully paid (sales, receipts and the weekly "
+            "invoice) are moved to archive tables. Client balances and cylinder positions are carried forward "
+            "as opening rows, and historical reports still include archived sales."
+        )
+        period_close_info.setWordWrap(True)
+        period_close_layout.addWidget(period_close_info)
+
+        period_close_controls = QHBoxLayout()
+        period_close_controls.addWidget(QLabel("Archive history before:"))
+        self.period_cutoff_edit = QDateEdit()
+        self.period_cutoff_edit.setCalendarPopup(True)
+        self.period_cutoff_edit.setDate(QDate.currentDate().addYears(-1))
+        period_close_controls.addWidget(self.period_cutoff_edit)
+        close_period_btn = QPushButton("Close Period")
+        close_period_btn.clicked.connect(self.close_financial_period)
+        period_close_controls.addWidget(close_period_btn)
+        period_close_controls.addStretch()
+        period_close_layout.addLayout(period_close_controls)
+
+        self.period_close_label = QLabel("")
+        period_close_layout.addWidget(self.period_close_label)
+
+        period_close_group.setLayout(period_close_layout)
+        backup_layout.addWidget(period_close_group)
         
         backup_layout.addStretch()
         tab_widget.addTab(backup_tab, "Backup & Restore")
@@ -401,6 +434,61 @@ class SettingsWidget(QWidget):
         
         logs_layout.addStretch()
         tab_widget.addTab(logs_tab, "Activity Logs")
+
+        # Query Plans Tab
+        plans_tab = QWidget()
+        plans_layout = QVBoxLayout(plans_tab)
+        plans_layout.setSpacing(15)
+
+        plans_group = QGroupBox("Slow Query Plans")
+        plans_group_layout = QVBoxLayout()
+
+        threshold = self.db_manager.slow_query_ms
+        plans_info = QLabel(
+            f"Capturing EXPLAIN ANALYZE for queries slower than {threshold:g} ms "
+            f"(sample rate {self.db_manager.plan_sample_rate:.0%})." if threshold > 0 else
+            "Plan capture is off. Set PG_SLOW_QUERY_MS (and optionally PG_PLAN_SAMPLE_RATE) to enable it."
+        )
+        plans_info.setWordWrap(True)
+        plans_group_layout.addWidget(plans_info)
+
+        self.plans_table = QTableWidget()
+        self.plans_table.setColumnCount(4)
+        self.plans_table.setHorizontalHeaderLabels([
+            "Captured", "Duration (ms)", "Execution (ms)", "Query"
+        ])
+        self.plans_table.setAlternatingRowColors(True)
+        self.plans_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.plans_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.plans_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.plans_table.verticalHeader().setVisible(False)
+        self.plans_table.verticalHeader().setDefaultSectionSize(30)
+        self.plans_table.itemSelectionChanged.connect(self.show_selected_plan)
+        plans_group_layout.addWidget(self.plans_table)
+
+        self.plan_text = QTextEdit()
+        self.plan_text.setReadOnly(True)
+        self.plan_text.setStyleSheet("""
+            QTextEdit {
+                background-color: #f8f9fa;
+                border: 1px solid #dee2e6;
+                border-radius: 4px;
+                font-family: 'Courier New';
+                font-size: 10px;
+            }
+        """)
+        plans_group_layout.addWidget(self.plan_text)
+
+        plan_controls_layout = QHBoxLayout()
+        self.refresh_plans_btn = QPushButton("Refresh Plans")
+        self.refresh_plans_btn.clicked.connect(self.load_query_plans)
+        plan_controls_layout.addWidget(self.refresh_plans_btn)
+        plan_controls_layout.addStretch()
+        plans_group_layout.addLayout(plan_controls_layout)
+
+        plans_group.setLayout(plans_group_layout)
+        plans_layout.addWidget(plans_group)
+        tab_widget.addTab(plans_tab, "Query Plans")
         
         self.layout().addWidget(tab_widget)
         
@@ -408,6 +496,8 @@ class SettingsWidget(QWidget):
         self.load_users()
         self.load_backup_history()
         self.load_activity_logs()
+        self.load_period_closes()
+        self.load_query_plans()
     
     def save_company_info(self):
         """Save company information"""
@@ -726,6 +816,50 @@ class SettingsWidget(QWidget):
             except Exception as e:
                 QMessageBox.critical(self, "Cleanup Error", f"Failed to cleanup old backups: {str(e)}")
     
+    def load_period_closes(self):
+        """Show the most recent period close"""
+        try:
+            closes = self.db_manager.get_period_closes()
+            if closes:
+                last = closes[0]
+                self.period_close_label.setText(
+                    f"Last close: before {last['cutoff_date']} on {as_datetime_text(last['created_at'])} "
+                    f"({int(last['sales_archived'] or 0)} sales, {int(last['weekly_invoices_archived'] or 0)} weekly invoices archived)"
+                )
+            else:
+                self.period_close_label.setText("No period has been closed yet.")
+        except Exception as e:
+            self.period_close_label.setText(f"Failed to load period closes: {str(e)}")
+
+    def close_financial_period(self):
+        """Archive settled history before the selected cutoff date"""
+        cutoff = self.period_cutoff_edit.date().toString('yyyy-MM-dd')
+        reply = QMessageBox.question(
+            self,
+            "Close Financial Period",
+            f"Archive every fully paid billing week that ended before {cutoff}?\n\n"
+            "Create a backup first. Archived rows no longer appear in day-to-day screens; reports still include them.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+
+        if reply == QMessageBox.Yes:
+            try:
+                result = self.db_manager.close_financial_period(cutoff, self.current_user['id'])
+                QMessageBox.information(
+                    self,
+                    "Success",
+                    f"Period closed.\n\nSales archived: {result['sales_archived']}\n"
+                    f"Receipts archived: {result['receipts_archived']}\n"
+                    f"Weekly invoices archived: {result['weekly_invoices_archived']}"
+                )
+                self.load_period_closes()
+                self.load_activity_logs()
+                publish(PERIOD_CLOSED, source="settings", period_close_id=result['period_close_id'])
+
+            except Exception as e:
+                QMessageBox.critical(self, "Database Error", f"Failed to close period: {str(e)}")
+
     def load_activity_logs(self):
         """Load activity logs"""
         try:
@@ -757,6 +891,46 @@ class SettingsWidget(QWidget):
         except Exception as e:
             self.logs_text.setPlainText(f"Failed to load activity logs: {str(e)}")
     
+    def load_query_plans(self):
+        """Load captured slow query plans"""
+        try:
+            plans = self.db_manager.get_query_plans()
+            with table_batch_update(self.plans_table):
+                self.plans_table.setRowCount(len(plans))
+                for row, plan in enumerate(plans):
+                    captured_item = QTableWidgetItem(as_datetime_text(plan.get('captured_at'), 19))
+                    captured_item.setData(Qt.UserRole, plan['id'])
+                    self.plans_table.setItem(row, 0, captured_item)
+                    self.plans_table.setItem(row, 1, QTableWidgetItem(f"{float(plan.get('duration_ms') or 0):,.1f}"))
+                    execution_ms = plan.get('execution_ms')
+                    self.plans_table.setItem(row, 2, QTableWidgetItem(f"{float(execution_ms):,.1f}" if execution_ms is not None else ""))
+                    self.plans_table.setItem(row, 3, QTableWidgetItem(as_text(plan.get('fingerprint'))[:300]))
+            plans_header = self.plans_table.horizontalHeader()
+            plans_header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+            plans_header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+            plans_header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+            plans_header.setSectionResizeMode(3, QHeaderView.Stretch)
+            self.plan_text.clear()
+        except Exception as e:
+            self.plan_text.setPlainText(f"Failed to load query plans: {str(e)}")
+
+    def show_selected_plan(self):
+        """Show the full plan for the selected row"""
+        row = self.plans_table.currentRow()
+        item = self.plans_table.item(row, 0) if row >= 0 else None
+        if not item:
+            return
+        try:
+            plan = self.db_manager.get_query_plan(int(item.data(Qt.UserRole)))
+            if not plan:
+                self.plan_text.clear()
+                return
+            text = f"Query:\n{plan['query_text']}\n\nParameters: {plan.get('params_text') or '()'}\n\n"
+            text += json.dumps(plan['plan'], indent=2) if not isinstance(plan['plan'], str) else plan['plan']
+            self.plan_text.setPlainText(text)
+        except Exception as e:
+            self.plan_text.setPlainText(f"Failed to load plan: {str(e)}")
+
     def clear_old_logs(self):
         """Clear old activity logs"""
         reply = QMessageBox.question(
@@ -22,7 +22,8 @@ from PySide6.QtWidgets import (
     QHeaderView,
 )
 
-from src.components.ui_helpers import as_datetime_text, as_money, refresh_application_views, table_batch_update
+from src.components.ui_helpers import as_datetime_text, as_money, table_batch_update
+from src.core.events import PAYMENT_RECORDED, publish
 from src.database_module import DatabaseManager
 
 
@@ -415,5 +416,5 @@ class SupplierPaymentsWidget(QWidget):
         if not dlg.exec():
             return
         self.load_data()
-        refresh_application_views("supplier_payments", "reports", "suppliers", "daily_transactions")
+        publish(PAYMENT_RECORDED, source="supplier_payments", supplier_id=row['supplier_id'])
         QMessageBox.information(self, "Success", "Supplier payment recorded.")
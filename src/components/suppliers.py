@@ -18,7 +18,8 @@ from PySide6.QtWidgets import (
     QHeaderView,
 )
 
-from src.components.ui_helpers import refresh_application_views, table_batch_update
+from src.components.ui_helpers import table_batch_update
+from src.core.events import SUPPLIER_CHANGED, publish
 from src.database_module import DatabaseManager
 
 
@@ -255,9 +256,9 @@ class SuppliersWidget(QWidget):
             return
         payload = dlg.get_payload()
         try:
-            self.db_manager.add_supplier(**payload)
+            supplier_id = self.db_manager.add_supplier(**payload)
             self.load_suppliers()
-            refresh_application_views("suppliers", "supplier_payments", "sales", "weekly_payments", "receipts", "daily_transactions")
+            publish(SUPPLIER_CHANGED, source="suppliers", supplier_id=supplier_id)
             QMessageBox.information(self, "Success", "Supplier added successfully.")
         except Exception as exc:
             QMessageBox.critical(self, "Database Error", f"Failed to add supplier: {exc}")
@@ -270,7 +271,7 @@ class SuppliersWidget(QWidget):
         try:
             self.db_manager.update_supplier(supplier_data["id"], **payload, is_active=bool(supplier_data.get("is_active")))
             self.load_suppliers()
-            refresh_application_views("suppliers", "supplier_payments", "sales", "weekly_payments", "receipts", "daily_transactions")
+            publish(SUPPLIER_CHANGED, source="suppliers", supplier_id=supplier_data["id"])
             QMessageBox.information(self, "Success", "Supplier updated successfully.")
         except Exception as exc:
             QMessageBox.critical(self, "Database Error", f"Failed to update supplier: {exc}")
@@ -288,7 +289,7 @@ class SuppliersWidget(QWidget):
         try:
             self.db_manager.deactivate_supplier(supplier_id)
             self.load_suppliers()
-            refresh_application_views("suppliers", "supplier_payments", "sales", "weekly_payments", "receipts", "daily_transactions")
+            publish(SUPPLIER_CHANGED, source="suppliers", supplier_id=supplier_id)
             QMessageBox.information(self, "Success", "Supplier deactivated.")
         except Exception as exc:
             QMessageBox.critical(self, "Database Error", f"Failed to deactivate supplier: {exc}")
@@ -0,0 +1,233 @@
+"""
+Model/view tables for the large list pages.
+
+RecordTableModel keeps the query result dicts exactly as DatabaseManager returned them
+and formats a cell only when the view paints it, so a page of thousands of rows costs one
+list instead of a QTableWidgetItem per cell and a QWidget per row. Rows reach the view in
+batches through fetchMore; with a pager the next batch is only read from the database
+once the user scrolls to the end. ActionButtonDelegate paints the per-row buttons.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from PySide6.QtCore import QAbstractTableModel, QEvent, QModelIndex, QRect, QSize, Qt, Signal
+from PySide6.QtGui import QColor, QFont, QPainter
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from src.components.ui_helpers import as_text
+
+RIGHT = Qt.AlignRight | Qt.AlignVCenter
+
+Row = Dict[str, Any]
+# pager(last_loaded_row, limit) -> the next rows after last_loaded_row, at most limit of them.
+Pager = Callable[[Optional[Row], int], List[Row]]
+
+
+@dataclass
+class Column:
+    title: str
+    key: Optional[str] = None
+    text: Optional[Callable[[Row], str]] = None
+    align: Any = None
+    foreground: Optional[Callable[[Row], Any]] = None
+
+    def display(self, row: Row) -> str:
+        if self.text is not None:
+            return self.text(row)
+        return as_text(row.get(self.key)) if self.key else ""
+
+
+@dataclass
+class RowAction:
+    name: str
+    label: str
+    color: str
+    width: int = 58
+    enabled: Optional[Callable[[Row], bool]] = None
+
+    def is_enabled(self, row: Row) -> bool:
+        return self.enabled is None or bool(self.enabled(row))
+
+
+class RecordTableModel(QAbstractTableModel):
+    RowRole = Qt.UserRole
+    BATCH_SIZE = 200
+
+    fetch_failed = Signal(str)
+
+    def __init__(self, columns: Sequence[Column], batch_size: Optional[int] = None,
+                 prepare: Optional[Callable[[List[Row]], None]] = None, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.batch_size = int(batch_size or self.BATCH_SIZE)
+        # prepare(rows) runs on each batch before it is shown, e.g. to read per-row details
+        # in one query, so data() never has to go to the database.
+        self._prepare = prepare
+        self._rows: List[Row] = []
+        self._shown = 0
+        self._pager: Optional[Pager] = None
+        self._exhausted = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._shown
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self.columns):
+            return self.columns[section].title
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < self._shown:
+            return None
+        row = self._rows[index.row()]
+        column = self.columns[index.column()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return column.display(row)
+        if role == Qt.TextAlignmentRole:
+            return column.align
+        if role == Qt.ForegroundRole and column.foreground is not None:
+            return column.foreground(row)
+        if role == self.RowRole:
+            return row
+        return None
+
+    def set_columns(self, columns: Sequence[Column]):
+        """Switch to a different column layout; the rows are cleared."""
+        self.beginResetModel()
+        self.columns = list(columns)
+        self._rows = []
+        self._shown = 0
+        self._pager = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def set_rows(self, rows: Sequence[Row], pager: Optional[Pager] = None):
+        """Replace the contents; with a pager, rows past the last one are read on demand."""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._shown = min(len(self._rows), self.batch_size)
+        self._prepare_rows(self._rows[:self._shown])
+        self._pager = pager
+        # A first page shorter than a batch means there is nothing more to ask for.
+        self._exhausted = pager is None or len(self._rows) < self.batch_size
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._shown < len(self._rows) or not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._shown >= len(self._rows) and not self._exhausted:
+            try:
+                more = list(self._pager(self._rows[-1] if self._rows else None, self.batch_size))
+            except Exception as e:
+                self._exhausted = True
+                self.fetch_failed.emit(str(e))
+                return
+            if len(more) < self.batch_size:
+                self._exhausted = True
+            self._rows.extend(more)
+        count = min(len(self._rows) - self._shown, self.batch_size)
+        if count <= 0:
+            return
+        self._prepare_rows(self._rows[self._shown:self._shown + count])
+        self.beginInsertRows(QModelIndex(), self._shown, self._shown + count - 1)
+        self._shown += count
+        self.endInsertRows()
+
+    def _prepare_rows(self, rows: List[Row]):
+        if self._prepare is None or not rows:
+            return
+        try:
+            self._prepare(rows)
+        except Exception as e:
+            self.fetch_failed.emit(str(e))
+
+    def row(self, index: int) -> Row:
+        return self._rows[index]
+
+    def rows(self) -> List[Row]:
+        """Every loaded row, including ones not yet scrolled into the view."""
+        return list(self._rows)
+
+    def find_row(self, key: str, value: Any) -> int:
+        for i, row in enumerate(self._rows):
+            if str(row.get(key)) == str(value):
+                return i
+        return -1
+
+    def update_row(self, index: int, row: Row):
+        self._rows[index] = row
+        if index < self._shown:
+            self.dataChanged.emit(self.index(index, 0), self.index(index, len(self.columns) - 1))
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Paints a row of push-button lookalikes in one column and reports clicks."""
+
+    clicked = Signal(str, object)
+
+    BUTTON_HEIGHT = 24
+    SPACING = 4
+
+    def __init__(self, actions: Sequence[RowAction], parent=None):
+        super().__init__(parent)
+        self.actions = list(actions)
+
+    def _buttons(self, rect: QRect, row: Row):
+        total = sum(a.width for a in self.actions) + self.SPACING * max(0, len(self.actions) - 1)
+        x = rect.left() + max(2, (rect.width() - total) // 2)
+        y = rect.top() + (rect.height() - self.BUTTON_HEIGHT) // 2
+        for action in self.actions:
+            yield action, QRect(x, y, action.width, self.BUTTON_HEIGHT), action.is_enabled(row)
+            x += action.width + self.SPACING
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, opt, painter, opt.widget)
+
+        row = index.data(RecordTableModel.RowRole) or {}
+        font = QFont(option.font)
+        font.setPixelSize(11)
+        font.setBold(True)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(font)
+        for action, rect, enabled in self._buttons(option.rect, row):
+            fill = QColor(action.color) if enabled else QColor("#b8bec6")
+            painter.setPen(fill.darker(115))
+            painter.setBrush(fill)
+            painter.drawRoundedRect(rect.adjusted(0, 0, -1, -1), 5, 5)
+            painter.setPen(QColor("#ffffff"))
+            painter.drawText(rect, Qt.AlignCenter, action.label)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return False
+        if event.button() != Qt.LeftButton:
+            return False
+        row = index.data(RecordTableModel.RowRole)
+        if not row:
+            return False
+        pos = event.position().toPoint()
+        for action, rect, enabled in self._buttons(option.rect, row):
+            if rect.contains(pos):
+                if enabled and event.type() == QEvent.MouseButtonRelease:
+                    self.clicked.emit(action.name, row)
+                return True
+        return False
+
+    def sizeHint(self, option, index):
+        total = sum(a.width for a in self.actions) + self.SPACING * max(0, len(self.actions) - 1)
+        return QSize(total + 8, self.BUTTON_HEIGHT + 12)
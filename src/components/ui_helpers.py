@@ -39,33 +39,23 @@ def table_batch_update(table):
 
 
 def refresh_application_views(*page_names: str, include_dashboard: bool = True):
+    """Mark pages stale after a write that has no matching domain event.
+
+    Prefer src.core.events.publish(); this is the coarse fallback. The visible page
+    reloads now and the others reload when next shown.
+    """
     try:
         main_window = None
         for widget in QApplication.topLevelWidgets():
-            if hasattr(widget, "widgets") and hasattr(widget, "refresh_current_page"):
+            if hasattr(widget, "widgets") and hasattr(widget, "invalidate_pages"):
                 main_window = widget
                 break
         if not main_window:
             return
 
-        if include_dashboard and hasattr(main_window, "refresh_dashboard"):
-            try:
-                main_window.refresh_dashboard()
-            except Exception:
-                pass
-
-        ordered_pages = list(dict.fromkeys(page_names))
-        for page_name in ordered_pages:
-            try:
-                main_window.refresh_current_page(page_name)
-            except Exception:
-                continue
-
-        reports_widget = getattr(main_window, "widgets", {}).get("reports")
-        if reports_widget and hasattr(reports_widget, "generate_report"):
-            try:
-                reports_widget.generate_report()
-            except Exception:
-                pass
+        pages = list(page_names)
+        if include_dashboard:
+            pages.insert(0, "dashboard")
+        main_window.invalidate_pages(*pages)
     except Exception:
         pass
@@ -1,14 +1,16 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit, QComboBox,
-    QPushButton, QTableWidget, QTableWidgetItem, QGroupBox, QMessageBox,
+    QPushButton, QGroupBox, QMessageBox,
     QDialog, QTextEdit, QLineEdit, QFormLayout, QDoubleSpinBox,
-    QFrame, QHeaderView, QAbstractItemView
+    QFrame, QHeaderView, QAbstractItemView, QTableView
 )
 from PySide6.QtCore import Qt, QDate, QSizeF
 from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from PySide6.QtGui import QTextDocument, QFont, QPageSize, QPageLayout
 from src.database_module import DatabaseManager
-from src.components.ui_helpers import refresh_application_views
+from src.core.events import PAYMENT_RECORDED, publish
+from src.core.directory import DirectoryModel, attach_directory, client_directory_model, supplier_directory_model
+from src.components.table_models import RIGHT, ActionButtonDelegate, Column, RecordTableModel, RowAction
 
 class WeeklyClientReceiptDialog(QDialog):
     def __init__(self, db_manager: DatabaseManager, invoice_row: dict, parent=None):
@@ -210,7 +212,7 @@ class WeeklyPaymentsWidget(QWidget):
                 padding: 6px 8px;
                 min-height: 28px;
             }
-            QTableWidget {
+            QTableView {
                 background: #ffffff;
                 border: 1px solid #d7dde3;
                 border-radius: 8px;
@@ -251,10 +253,14 @@ class WeeklyPaymentsWidget(QWidget):
         bar.addWidget(QLabel("Week end:"))
         bar.addWidget(self.end_day_combo)
         self.client_filter = QComboBox()
+        self.client_directory = client_directory_model(self.db_manager)
+        attach_directory(self.client_filter, self.client_directory, "All Clients")
         self.client_filter.currentIndexChanged.connect(self.load_weekly_invoices)
         bar.addWidget(QLabel("Client:"))
         bar.addWidget(self.client_filter)
         self.supplier_filter = QComboBox()
+        self.supplier_directory = supplier_directory_model(self.db_manager)
+        attach_directory(self.supplier_filter, self.supplier_directory, "All Sources")
         self.supplier_filter.currentIndexChanged.connect(self.load_weekly_invoices)
         bar.addWidget(QLabel("Source:"))
         bar.addWidget(self.supplier_filter)
@@ -300,11 +306,38 @@ class WeeklyPaymentsWidget(QWidget):
         group_title.setStyleSheet("font-size: 15px; font-weight: 700;")
         g_layout.addWidget(group_title)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(15)
-        self.table.setHorizontalHeaderLabels([
-            "Client", "Cylinders", "Empty Return", "Sources", "Subtotal", "Discount", "Tax (16%)", "Total Payable", "Prev Balance", "Final Payable", "Paid", "Remaining", "Status", "Actions", "Week"
-        ])
+        def amount(title, key):
+            return Column(title, text=lambda r: f"{float(r[key]):,.2f}", align=RIGHT)
+
+        columns = [
+            Column("Client", text=self._client_text),
+            Column("Cylinders", text=lambda r: self._detail(r, 'cylinders_text')),
+            Column("Empty Return", text=lambda r: self._detail(r, 'empty_return_text')),
+            Column("Sources", text=lambda r: self._detail(r, 'sources_text')),
+            amount("Subtotal", 'subtotal'),
+            amount("Discount", 'discount'),
+            amount("Tax (16%)", 'tax_amount'),
+            amount("Total Payable", 'total_payable'),
+            amount("Prev Balance", 'previous_balance'),
+            amount("Final Payable", 'final_payable'),
+            amount("Paid", 'amount_paid'),
+            Column("Remaining", text=lambda r: f"{self._remaining(r):,.2f}", align=RIGHT),
+            Column("Status", 'status', foreground=lambda r: Qt.darkGreen if r['status'] == 'PAID' else Qt.red),
+            Column("Actions"),
+            Column("Week", text=lambda r: f"{r['week_start']} to {r['week_end']}"),
+        ]
+        self.table_model = RecordTableModel(columns, prepare=self._load_details, parent=self)
+        self.table_actions = ActionButtonDelegate([
+            RowAction('view', "View", "#f39c12", width=50),
+            RowAction('pay', "Pay", "#28a745", width=50),
+            RowAction('mark_paid', "Mark Paid", "#1a73e8", width=68,
+                      enabled=lambda r: self._remaining(r) <= 0.01 and r['status'] != 'PAID'),
+        ], self)
+        self.table_actions.clicked.connect(self.on_invoice_action)
+
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setItemDelegateForColumn(13, self.table_actions)
         self._setup_table()
         g_layout.addWidget(self.table)
         layout.addWidget(group, 1)
@@ -347,10 +380,10 @@ class WeeklyPaymentsWidget(QWidget):
         self.table.setAlternatingRowColors(True)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setWordWrap(True)
         self.table.verticalHeader().setVisible(False)
-        self.table.verticalHeader().setDefaultSectionSize(36)
+        self.table.verticalHeader().setDefaultSectionSize(28)
         self.table.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         self.table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
 
@@ -391,56 +424,30 @@ class WeeklyPaymentsWidget(QWidget):
         return week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d')
 
     def refresh_filters(self):
-        current_client = self.client_filter.currentData() if self.client_filter.count() else None
-        current_supplier = self.supplier_filter.currentData() if self.supplier_filter.count() else None
-
-        self.client_filter.blockSignals(True)
-        self.client_filter.clear()
-        self.client_filter.addItem("All Clients", None)
-        for client in self.db_manager.get_clients():
-            self.client_filter.addItem(client['name'], client['id'])
-        for idx in range(self.client_filter.count()):
-            if self.client_filter.itemData(idx) == current_client:
-                self.client_filter.setCurrentIndex(idx)
-                break
-        self.client_filter.blockSignals(False)
-
-        self.supplier_filter.blockSignals(True)
-        self.supplier_filter.clear()
-        self.supplier_filter.addItem("All Sources", None)
-        for supplier in self.db_manager.get_suppliers():
-            self.supplier_filter.addItem(supplier['name'], supplier['id'])
-        for idx in range(self.supplier_filter.count()):
-            if self.supplier_filter.itemData(idx) == current_supplier:
-                self.supplier_filter.setCurrentIndex(idx)
-                break
-        self.supplier_filter.blockSignals(False)
+        # Shared directory models: a refresh keeps both selections and only touches changed rows.
+        for combo, model in ((self.client_filter, self.client_directory), (self.supplier_filter, self.supplier_directory)):
+            combo.blockSignals(True)
+            try:
+                model.refresh()
+            finally:
+                combo.blockSignals(False)
 
     def load_weekly_invoices(self):
         self.refresh_filters()
         ws, we = self.get_week_range()
         self.week_label.setText(f"Week: {ws} to {we}")
-        clients = self.db_manager.get_clients()
-        for c in clients:
-            try:
-                self.db_manager.upsert_weekly_invoice(c['id'], ws, we, self.current_user.get('id'))
-            except Exception:
-                continue
+        self.db_manager.refresh_weekly_invoices(ws, we, self.current_user.get('id'))
         rows = self.db_manager.get_weekly_invoices(ws, we)
 
         search_text = (self.search_input.text() or "").strip().lower()
 
-        cid = self.client_filter.currentData()
+        cid = self.client_filter.currentData(DirectoryModel.IdRole)
         if cid:
             rows = [r for r in rows if r['client_id'] == cid]
-        selected_supplier = self.supplier_filter.currentData()
+        selected_supplier = self.supplier_filter.currentData(DirectoryModel.IdRole)
         if selected_supplier:
-            filtered_rows = []
-            for row in rows:
-                supplier_rows = self.db_manager.get_weekly_supplier_breakdown(row['client_id'], ws, we)
-                if any(int(s.get('supplier_key') or 0) == int(selected_supplier) for s in supplier_rows):
-                    filtered_rows.append(row)
-            rows = filtered_rows
+            self._load_details(rows)
+            rows = [r for r in rows if int(selected_supplier) in r['supplier_keys']]
         st = self.status_filter.currentText()
         if st in ("PAID", "UNPAID"):
             rows = [r for r in rows if r['status'] == st]
@@ -464,6 +471,7 @@ class WeeklyPaymentsWidget(QWidget):
             rows = frows
 
         if search_text:
+            self._load_details(rows)
             filtered = []
             for r in rows:
                 hay = " ".join([
@@ -472,7 +480,7 @@ class WeeklyPaymentsWidget(QWidget):
                     str(r.get('status') or ''),
                     str(r.get('invoice_number') or ''),
                     str(r.get('receipt_number') or ''),
-                    self.db_manager.get_weekly_supplier_breakdown_text(r['client_id'], ws, we),
+                    self._detail(r, 'sources_text'),
                     str(r.get('week_start') or ''),
                     str(r.get('week_end') or ''),
                 ]).lower()
@@ -480,65 +488,54 @@ class WeeklyPaymentsWidget(QWidget):
                     filtered.append(r)
             rows = filtered
 
-        self.table.setRowCount(len(rows))
-        for i, r in enumerate(rows):
-            client_text = r['client_name']
-            if r.get('client_company'):
-                client_text += f" ({r['client_company']})"
-            self.table.setItem(i, 0, QTableWidgetItem(client_text))
-            
-            # Cylinder breakdown and Empty Return
-            cyl_breakdown = self.db_manager.get_weekly_sales_breakdown(r['client_id'], ws, we)
-            empty_returns = self.db_manager.get_weekly_returns_breakdown(r['client_id'], ws, we)
-            supplier_breakdown = self.db_manager.get_weekly_supplier_breakdown_text(r['client_id'], ws, we)
-            self.table.setItem(i, 1, QTableWidgetItem(cyl_breakdown))
-            self.table.setItem(i, 2, QTableWidgetItem(empty_returns))
-            self.table.setItem(i, 3, QTableWidgetItem(supplier_breakdown))
-            
-            self.table.setItem(i, 4, QTableWidgetItem(f"{float(r['subtotal']):,.2f}"))
-            self.table.setItem(i, 5, QTableWidgetItem(f"{float(r['discount']):,.2f}"))
-            self.table.setItem(i, 6, QTableWidgetItem(f"{float(r['tax_amount']):,.2f}"))
-            self.table.setItem(i, 7, QTableWidgetItem(f"{float(r['total_payable']):,.2f}"))
-            self.table.setItem(i, 8, QTableWidgetItem(f"{float(r['previous_balance']):,.2f}"))
-            self.table.setItem(i, 9, QTableWidgetItem(f"{float(r['final_payable']):,.2f}"))
-            self.table.setItem(i, 10, QTableWidgetItem(f"{float(r['amount_paid']):,.2f}"))
-            remaining_val = max(0.0, float(r['final_payable']) - float(r['amount_paid']))
-            self.table.setItem(i, 11, QTableWidgetItem(f"{remaining_val:,.2f}"))
-            status_item = QTableWidgetItem(r['status'])
-            if r['status'] == 'PAID':
-                status_item.setForeground(Qt.darkGreen)
-            else:
-                status_item.setForeground(Qt.red)
-            self.table.setItem(i, 12, status_item)
-
-            for col_idx in [4, 5, 6, 7, 8, 9, 10, 11]:
-                item = self.table.item(i, col_idx)
-                if item:
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-
-            actions = QWidget()
-            actions.setMinimumHeight(22)
-            h = QHBoxLayout(actions)
-            h.setContentsMargins(0, 0, 0, 0)
-            h.setSpacing(2)
-            h.setAlignment(Qt.AlignCenter)
-            btn_print = self._small_button("View", "warning")
-            btn_print.setFixedWidth(50)
-            btn_print.clicked.connect(lambda checked=False, row=r: self.print_client(row))
-            h.addWidget(btn_print)
-            btn_pay = self._small_button("Pay", "success")
-            btn_pay.setFixedWidth(50)
-            btn_pay.clicked.connect(lambda checked=False, row=r: self.record_payment(row))
-            h.addWidget(btn_pay)
-            btn_mark = self._small_button("Mark Paid", "primary")
-            btn_mark.setFixedWidth(68)
-            btn_mark.setEnabled(max(0.0, float(r['final_payable']) - float(r['amount_paid'])) <= 0.01 and r['status'] != 'PAID')
-            btn_mark.clicked.connect(lambda checked=False, row=r: self.mark_paid(row))
-            h.addWidget(btn_mark)
-            actions.setLayout(h)
-            self.table.setCellWidget(i, 13, actions)
-            self.table.setItem(i, 14, QTableWidgetItem(f"{r['week_start']} to {r['week_end']}"))
-            self.table.setRowHeight(i, 28)
+        self.table_model.set_rows(rows)
+
+    def _load_details(self, rows: list):
+        """Read the breakdown columns for rows that lack them, three queries per week shown.
+
+        The model calls this for each batch before showing it; filtering, searching and
+        printing call it for all their rows.
+        """
+        weeks = {}
+        for r in rows:
+            if 'cylinders_text' not in r:
+                weeks.setdefault((str(r['week_start']), str(r['week_end'])), []).append(r)
+        for (ws, we), week_rows in weeks.items():
+            client_ids = sorted({int(r['client_id']) for r in week_rows})
+            cylinders = self.db_manager.get_weekly_sales_breakdowns(client_ids, ws, we)
+            returns = self.db_manager.get_weekly_returns_breakdowns(client_ids, ws, we)
+            sources = self.db_manager.get_weekly_supplier_breakdowns(client_ids, ws, we)
+            for r in week_rows:
+                cid = int(r['client_id'])
+                supplier_rows = sources.get(cid, [])
+                r['cylinders_text'] = cylinders.get(cid, "0")
+                r['empty_return_text'] = returns.get(cid, "0")
+                r['sources_text'] = self.db_manager.supplier_breakdown_text(supplier_rows)
+                r['supplier_keys'] = {int(s.get('supplier_key') or 0) for s in supplier_rows}
+
+    @staticmethod
+    def _detail(r: dict, key: str) -> str:
+        # Filled in by _load_details(); painting never queries.
+        return r.get(key, "")
+
+    @staticmethod
+    def _client_text(r: dict) -> str:
+        client_text = r['client_name']
+        if r.get('client_company'):
+            client_text += f" ({r['client_company']})"
+        return client_text
+
+    @staticmethod
+    def _remaining(r: dict) -> float:
+        return max(0.0, float(r['final_payable']) - float(r['amount_paid']))
+
+    def on_invoice_action(self, action: str, row: dict):
+        if action == 'view':
+            self.print_client(row)
+        elif action == 'pay':
+            self.record_payment(row)
+        elif action == 'mark_paid':
+            self.mark_paid(row)
 
     def print_client(self, invoice_row: dict):
         dlg = WeeklyClientReceiptDialog(self.db_manager, invoice_row, self)
@@ -585,7 +582,7 @@ class WeeklyPaymentsWidget(QWidget):
             self.db_manager.record_weekly_payment(invoice_row['id'], amount, day, self.current_user.get('id'), method.currentText())
             QMessageBox.information(self, "Success", "Payment recorded.")
             self.load_weekly_invoices()
-            refresh_application_views("weekly_payments", "clients", "receipts", "cylinder_track", "reports")
+            publish(PAYMENT_RECORDED, invoice_row.get('client_id'), source="weekly_payments", weekly_invoice_id=invoice_row['id'])
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
@@ -594,7 +591,7 @@ class WeeklyPaymentsWidget(QWidget):
             self.db_manager.mark_weekly_invoice_paid(invoice_row['id'])
             QMessageBox.information(self, "Success", "Weekly invoice marked as PAID.")
             self.load_weekly_invoices()
-            refresh_application_views("weekly_payments", "clients", "receipts", "cylinder_track", "reports")
+            publish(PAYMENT_RECORDED, invoice_row.get('client_id'), source="weekly_payments", weekly_invoice_id=invoice_row['id'])
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
@@ -628,7 +625,10 @@ class WeeklyPaymentsWidget(QWidget):
 
                 ws, we = self.get_week_range()
                 logo = self.resolve_logo_path()
-                total_clients = self.table.rowCount()
+                rows = self.table_model.rows()
+                self._load_details(rows)
+                columns = self.table_model.columns
+                total_clients = len(rows)
                 total_final = 0.0
                 total_paid = 0.0
                 total_remaining = 0.0
@@ -663,22 +663,12 @@ class WeeklyPaymentsWidget(QWidget):
 
                 html.append("<table><tr><th>#</th><th>First Name</th><th>Cylinders</th><th>Empty Return</th><th>Sources</th><th>Subtotal</th><th>Discount</th><th>Tax</th><th>Total</th><th>Prev</th><th>Final</th><th>Paid</th><th>Remaining</th><th>Status</th></tr>")
 
-                for i in range(self.table.rowCount()):
-                    raw_client = self.table.item(i, 0).text() if self.table.item(i, 0) else ""
+                for i, r in enumerate(rows):
+                    raw_client, cyl, empty, source, sub, disc, tax, tot, prev, final, paid, remaining, status = (
+                        columns[c].display(r) for c in range(13)
+                    )
                     full_name = raw_client.split(' (')[0].strip()
                     first_name = full_name.split()[0] if full_name else "-"
-                    cyl = self.table.item(i, 1).text() if self.table.item(i, 1) else ""
-                    empty = self.table.item(i, 2).text() if self.table.item(i, 2) else ""
-                    source = self.table.item(i, 3).text() if self.table.item(i, 3) else ""
-                    sub = self.table.item(i, 4).text() if self.table.item(i, 4) else ""
-                    disc = self.table.item(i, 5).text() if self.table.item(i, 5) else ""
-                    tax = self.table.item(i, 6).text() if self.table.item(i, 6) else ""
-                    tot = self.table.item(i, 7).text() if self.table.item(i, 7) else ""
-                    prev = self.table.item(i, 8).text() if self.table.item(i, 8) else ""
-                    final = self.table.item(i, 9).text() if self.table.item(i, 9) else ""
-                    paid = self.table.item(i, 10).text() if self.table.item(i, 10) else ""
-                    remaining = self.table.item(i, 11).text() if self.table.item(i, 11) else ""
-                    status = self.table.item(i, 12).text() if self.table.item(i, 12) else ""
 
                     try:
                         total_final += float((final or "0").replace(',', ''))
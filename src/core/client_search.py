@@ -0,0 +1,102 @@
+"""
+Search-as-you-type for clients.
+
+Keystrokes are debounced, and the query runs on a worker thread so the GUI never waits
+on the database. Every term gets a generation number and results from a superseded
+generation are dropped. When the new term extends the previous one and the previous
+result set was not cut off by the limit, the answer is a subset of rows already in hand,
+so it is filtered and re-ranked for the longer term in memory without a query.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class ClientSearch(QObject):
+    results_ready = Signal(str, list)
+    search_failed = Signal(str)
+    _finished = Signal(int, str, object, object)
+
+    DEBOUNCE_MS = 200
+    # Narrowed results reuse rows fetched this recently; balances on older rows may have moved.
+    CACHE_TTL_S = 30.0
+
+    def __init__(self, db_manager, limit: int = 50, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.limit = limit
+        self._generation = 0
+        self._pending_term = ""
+        self._cache_term = None
+        self._cache_rows = []
+        self._cache_complete = False
+        self._cache_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="client-search")
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._start_query)
+        self._finished.connect(self._on_finished)
+
+    def set_term(self, text: str):
+        """Search for text; results arrive through results_ready."""
+        term = (text or "").strip().lower()
+        self._generation += 1
+        self._pending_term = term
+        self._timer.stop()
+        if not term:
+            self.results_ready.emit("", [])
+            return
+        if self._can_narrow(term):
+            rows = [r for r in self._cache_rows if term in self.db_manager.client_search_text(r)]
+            rows.sort(key=lambda r: self.db_manager.client_search_rank(r, term))
+            self.results_ready.emit(term, rows)
+            return
+        self._timer.start()
+
+    def invalidate(self):
+        """Forget cached results, e.g. after a client was added or renamed."""
+        self._cache_term = None
+        self._cache_rows = []
+        self._cache_complete = False
+
+    def shutdown(self):
+        self._timer.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _can_narrow(self, term: str) -> bool:
+        return (
+            self._cache_term is not None
+            and self._cache_complete
+            and term.startswith(self._cache_term)
+            and time.monotonic() - self._cache_at < self.CACHE_TTL_S
+        )
+
+    def _start_query(self):
+        generation, term = self._generation, self._pending_term
+
+        def run():
+            # A newer keystroke arrived while this was queued; skip the round trip entirely.
+            if generation != self._generation:
+                return
+            try:
+                rows = self.db_manager.search_clients(term, self.limit)
+                self._finished.emit(generation, term, rows, None)
+            except Exception as e:
+                self._finished.emit(generation, term, None, e)
+
+        self._executor.submit(run)
+
+    def _on_finished(self, generation: int, term: str, rows, error):
+        if generation != self._generation:
+            return
+        if error is not None:
+            self.search_failed.emit(str(error))
+            return
+        self._cache_term = term
+        self._cache_rows = rows
+        self._cache_complete = len(rows) < self.limit
+        self._cache_at = time.monotonic()
+        self.results_ready.emit(term, rows)
@@ -0,0 +1,147 @@
+"""
+Shared client and supplier pickers.
+
+One DirectoryModel per directory is shared by every combo box in the session. Refreshing
+it asks DatabaseManager for the cached directory, which only goes to the database when the
+directory is stale, and the model applies the difference row by row so open combo boxes
+keep their current selection. Each combo box gets its own leading "All ..." / "None" row
+through a concatenating proxy, without copying the shared rows.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from PySide6.QtCore import QAbstractListModel, QConcatenateTablesProxyModel, QModelIndex, Qt
+from PySide6.QtGui import QStandardItem, QStandardItemModel
+
+
+def client_label(row: Dict[str, Any]) -> str:
+    label = row.get('name') or ''
+    if row.get('company'):
+        label += f" - {row['company']}"
+    return label
+
+
+def supplier_label(row: Dict[str, Any]) -> str:
+    return row.get('name') or ''
+
+
+class DirectoryModel(QAbstractListModel):
+    # Qt.UserRole is what QComboBox.currentData() returns: the directory row.
+    RowRole = Qt.UserRole
+    IdRole = Qt.UserRole + 1
+
+    def __init__(self, db_manager, kind: str, label: Callable[[Dict[str, Any]], str],
+                 row_filter: Optional[Callable[[Dict[str, Any]], bool]] = None, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.kind = kind
+        self.label = label
+        self.row_filter = row_filter
+        self._rows: List[Dict[str, Any]] = []
+        self._version: Optional[int] = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.label(row)
+        if role == self.RowRole:
+            return row
+        if role == self.IdRole:
+            return int(row['id'])
+        return None
+
+    def refresh(self):
+        version, rows = self.db_manager.get_directory(self.kind)
+        if version == self._version:
+            return
+        if self.row_filter is not None:
+            rows = [r for r in rows if self.row_filter(r)]
+        self._apply(rows)
+        self._version = version
+
+    def _apply(self, rows: List[Dict[str, Any]]):
+        new_by_id = {int(r['id']): r for r in rows}
+
+        for i in range(len(self._rows) - 1, -1, -1):
+            if int(self._rows[i]['id']) not in new_by_id:
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._rows[i]
+                self.endRemoveRows()
+
+        for i, row in enumerate(self._rows):
+            fresh = new_by_id[int(row['id'])]
+            if fresh != row:
+                self._rows[i] = fresh
+                idx = self.index(i)
+                self.dataChanged.emit(idx, idx)
+
+        known = {int(r['id']) for r in self._rows}
+        added = [r for r in rows if int(r['id']) not in known]
+        if added:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+
+        # Same rows, possibly out of order after renames or inserts: move persistent indexes
+        # (the combo boxes' current items) along with their rows.
+        if [int(r['id']) for r in self._rows] != [int(r['id']) for r in rows]:
+            self.layoutAboutToBeChanged.emit()
+            old_ids = [int(r['id']) for r in self._rows]
+            new_pos = {int(r['id']): i for i, r in enumerate(rows)}
+            persistent = self.persistentIndexList()
+            self._rows = list(rows)
+            self.changePersistentIndexList(
+                persistent,
+                [self.index(new_pos[old_ids[idx.row()]]) for idx in persistent],
+            )
+            self.layoutChanged.emit()
+
+
+_models: Dict[str, DirectoryModel] = {}
+
+
+def client_directory_model(db_manager) -> DirectoryModel:
+    model = _models.get('clients')
+    if model is None:
+        model = _models['clients'] = DirectoryModel(db_manager, 'clients', client_label)
+        model.refresh()
+    return model
+
+
+def supplier_directory_model(db_manager) -> DirectoryModel:
+    model = _models.get('suppliers')
+    if model is None:
+        model = _models['suppliers'] = DirectoryModel(
+            db_manager, 'suppliers', supplier_label, row_filter=lambda r: bool(r.get('is_active')),
+        )
+        model.refresh()
+    return model
+
+
+def attach_directory(combo, model: DirectoryModel, placeholder: str):
+    """Show the shared directory in combo, led by a placeholder row whose data is None."""
+    head = QStandardItemModel(combo)
+    head.appendRow(QStandardItem(placeholder))
+    proxy = QConcatenateTablesProxyModel(combo)
+    proxy.addSourceModel(head)
+    proxy.addSourceModel(model)
+    combo.setModel(proxy)
+    combo.setCurrentIndex(0)
+    return proxy
+
+
+def select_directory_id(combo, record_id: Optional[int]) -> bool:
+    """Select the row for record_id (or the placeholder for None); False when it is not listed."""
+    if record_id is None:
+        combo.setCurrentIndex(0)
+        return True
+    idx = combo.findData(int(record_id), DirectoryModel.IdRole)
+    if idx < 0:
+        return False
+    combo.setCurrentIndex(idx)
+    return True
@@ -0,0 +1,94 @@
+"""
+Domain event bus.
+
+Write paths publish a small event once their transaction has committed. The main
+window routes each event to the pages that depend on it: the visible page applies
+the change (row-level via ``handle_domain_event`` when it has one, otherwise a
+reload), and hidden pages are only marked stale and reload when shown again.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+SALE_CREATED = "SaleCreated"
+PAYMENT_RECORDED = "PaymentRecorded"
+RETURN_RECORDED = "ReturnRecorded"
+REFILL_RECORDED = "RefillRecorded"
+CLIENT_CHANGED = "ClientChanged"
+SUPPLIER_CHANGED = "SupplierChanged"
+STOCK_CHANGED = "StockChanged"
+PERIOD_CLOSED = "PeriodClosed"
+PRODUCT_CHANGED = "ProductChanged"
+
+# Pages whose data depends on each event; the dashboard is refreshed like any other page.
+PAGE_DEPENDENCIES: Dict[str, tuple] = {
+    SALE_CREATED: (
+        "dashboard", "clients", "sales", "receipts", "daily_transactions", "weekly_payments",
+        "cylinder_availability", "cylinder_track", "supplier_payments", "reports",
+    ),
+    PAYMENT_RECORDED: (
+        "dashboard", "clients", "receipts", "weekly_payments", "cylinder_track",
+        "suppliers", "supplier_payments", "daily_transactions", "reports",
+    ),
+    RETURN_RECORDED: (
+        "dashboard", "cylinder_availability", "cylinder_track", "weekly_payments", "daily_transactions", "reports",
+    ),
+    REFILL_RECORDED: (
+        "dashboard", "cylinder_track", "supplier_payments", "weekly_payments", "daily_transactions", "reports",
+    ),
+    CLIENT_CHANGED: (
+        "dashboard", "clients", "sales", "cylinder_track", "cylinder_availability", "weekly_payments",
+        "receipts", "daily_transactions", "reports",
+    ),
+    SUPPLIER_CHANGED: (
+        "suppliers", "supplier_payments", "sales", "weekly_payments", "receipts", "daily_transactions",
+    ),
+    STOCK_CHANGED: (
+        "dashboard", "cylinder_availability", "cylinder_track", "weekly_payments", "daily_transactions",
+        "receipts", "sales", "clients", "reports",
+    ),
+    PERIOD_CLOSED: (
+        "dashboard", "clients", "sales", "receipts", "weekly_payments", "daily_transactions",
+        "cylinder_track", "reports",
+    ),
+    PRODUCT_CHANGED: (
+        "gas_products", "sales", "clients", "cylinder_availability", "cylinder_track", "weekly_payments",
+    ),
+}
+
+
+@dataclass
+class DomainEvent:
+    name: str
+    client_id: Optional[int] = None
+    payload: Dict[str, Any] = field(default_factory=dict)
+    origin: str = "local"
+
+
+class EventBus(QObject):
+    event_published = Signal(object)
+
+    def publish(self, name: str, client_id: Optional[int] = None, origin: str = "local", **payload) -> DomainEvent:
+        event = DomainEvent(name=name, client_id=client_id, payload=payload, origin=origin)
+        self.event_published.emit(event)
+        return event
+
+
+_bus: Optional[EventBus] = None
+
+
+def event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        _bus = EventBus()
+    return _bus
+
+
+def publish(name: str, client_id: Optional[int] = None, **payload) -> Optional[DomainEvent]:
+    """Publish a local domain event; never lets a subscriber failure reach the caller."""
+    try:
+        return event_bus().publish(name, client_id, **payload)
+    except Exception:
+        return None
@@ -0,0 +1,88 @@
+"""
+Cross-terminal live updates.
+
+DatabaseManager sends pg_notify() on NOTIFY_CHANNEL from its write paths. The
+listener keeps one dedicated autocommit connection LISTENing on a background
+thread and hands other terminals' notifications to the GUI thread as a Qt
+signal, where they are re-published on the local event bus.
+"""
+
+import json
+
+from PySide6.QtCore import QThread, Signal
+
+try:
+    import psycopg
+except Exception:  # pragma: no cover
+    psycopg = None
+
+from src.database_module.database_manager import NOTIFY_CHANNEL
+from src.core.events import event_bus
+
+
+class LiveUpdateListener(QThread):
+    notification_received = Signal(dict)
+
+    # Seconds between checks of the stop flag while waiting for notifications.
+    POLL_TIMEOUT_S = 1.0
+    RECONNECT_DELAY_MS = 5000
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._running = False
+
+    def start(self, *args, **kwargs):
+        if psycopg is None or not getattr(self.db_manager, "notify_enabled", False):
+            return
+        self._running = True
+        super().start(*args, **kwargs)
+
+    @property
+    def is_active(self) -> bool:
+        """Whether start() launched the listener (notifications enabled and psycopg available)."""
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self.isRunning():
+            self.wait(int(self.POLL_TIMEOUT_S * 1000) + 2000)
+
+    def run(self):
+        while self._running:
+            try:
+                with psycopg.connect(self.db_manager.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    while self._running:
+                        for notify in conn.notifies(timeout=self.POLL_TIMEOUT_S):
+                            self._dispatch(notify.payload)
+            except Exception as e:
+                if not self._running:
+                    break
+                print(f"Live updates connection lost, retrying: {str(e)}")
+                # Sleep in short steps so stop() is not held up by the reconnect delay.
+                for _ in range(self.RECONNECT_DELAY_MS // 250):
+                    if not self._running:
+                        break
+                    self.msleep(250)
+
+    def _dispatch(self, raw: str):
+        try:
+            message = json.loads(raw)
+        except Exception:
+            return
+        if not isinstance(message, dict) or not message.get("event"):
+            return
+        # This terminal already published its own writes locally.
+        if message.get("origin") == self.db_manager.instance_id:
+            return
+        # Caches are dropped here rather than on the GUI thread so no read in between sees stale rows.
+        self.db_manager.apply_remote_change(message["event"])
+        self.notification_received.emit(message)
+
+
+def publish_remote_change(message: dict):
+    """Re-publish a notification from another terminal on the local event bus."""
+    payload = message.get("payload") or {}
+    payload = {k: v for k, v in payload.items() if k not in ("source", "origin")}
+    event_bus().publish(message["event"], message.get("client_id"), origin="remote", **payload)
@@ -12,6 +12,7 @@ from src.database_module import DatabaseManager
 from src.components.auth import LoginDialog
 from src.ui.main_window import MainWindow
 from src.components.backup import BackupManager
+from src.core.live_updates import LiveUpdateListener, publish_remote_change
 
 class RajputGasManagement(QApplication):
     def __init__(self, argv):
@@ -44,6 +45,12 @@ class RajputGasManagement(QApplication):
     def show_main_window(self):
         self.main_window = MainWindow(self.db, self.current_user)
         self.main_window.show()
+
+        # Pick up other terminals' writes as they commit
+        self.live_updates = LiveUpdateListener(self.db)
+        self.live_updates.notification_received.connect(self.on_live_update)
+        self.live_updates.start()
+        self.main_window.live_updates_active = self.live_updates.is_active
         
         # Log successful login
         self.db.log_activity("LOGIN", f"User {self.current_user['username']} logged in")
@@ -71,7 +78,25 @@ class RajputGasManagement(QApplication):
         except Exception as e:
             print(f"Automatic backup check failed: {str(e)}")
 
+    def on_live_update(self, message: dict):
+        """Apply a change notification from another terminal"""
+        try:
+            publish_remote_change(message)
+        except Exception as e:
+            print(f"Failed to apply live update: {str(e)}")
+
     def shutdown(self):
+        # Close the pages so they stop their background workers (e.g. client search).
+        for widget in getattr(getattr(self, "main_window", None), "widgets", {}).values():
+            try:
+                widget.close()
+            except Exception:
+                pass
+        try:
+            if getattr(self, "live_updates", None) is not None:
+                self.live_updates.stop()
+        except Exception:
+            pass
         try:
             self.db.close()
         except Exception:
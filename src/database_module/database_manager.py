@@ -1,25 +1,68 @@
 import os
+import queue
 import re
 import time as pytime
 import random
+import hashlib
+import threading
+import uuid
 from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, date, time, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 import json
 
 try:
     import psycopg
-    from psycopg.rows import dict_row
+    from psycopg.rows import dict_row, tuple_row
 except Exception:  # pragma: no cover
     psycopg = None
     dict_row = None
+    tuple_row = None
 
 try:
     from psycopg_pool import ConnectionPool
 except Exception:  # pragma: no cover
     ConnectionPool = None
 
+
+# LISTEN/NOTIFY channel used to tell other terminals about committed writes.
+NOTIFY_CHANNEL = "rajput_gas_events"
+
+# Tables whose writes never change business data, so they do not move data_change_seq.
+UNTRACKED_TABLES = frozenset({
+    'users', 'activity_logs', 'backup_logs', 'query_fingerprints', 'query_plans', 'report_snapshots',
+    'day_changes',
+})
+# data_change_seq's current value; 0 until the first nextval (last_value is already 1 then).
+_CHANGE_SEQ_SQL = "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM data_change_seq"
+# Snapshots whose params_key is a day. Once the day is over they are checked against the last
+# write that touched that day (day_changes) instead of data_change_seq.
+_DAY_SNAPSHOTS = frozenset({'daily_sales', 'daily_lpg_refills', 'daily_totals'})
+_DAY_CHANGE_SEQ_SQL = f'''
+    SELECT CASE WHEN ?::date < CURRENT_DATE
+                THEN (SELECT COALESCE(MAX(change_seq), 0) FROM day_changes WHERE day = ?::date)
+                ELSE ({_CHANGE_SEQ_SQL}) END
+'''
+_WRITE_TARGET = re.compile(r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> str:
+    """Normalize a statement so calls that differ only by literals share one fingerprint."""
+    text = re.sub(r"--[^\n]*", " ", sql)
+    text = re.sub(r"'(?:[^']|'')*'", "?", text)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = text.replace("%s", "?")
+    return re.sub(r"\s+", " ", text).strip()
+
+
 class DatabaseManager:
+    # Sampled slow queries waiting to be explained.
+    PLAN_QUEUE_MAX = 16
+    # Attempts at drawing a free weekly invoice number, as get_next_weekly_invoice_number.
+    WEEKLY_NUMBER_RETRIES = 50
+
     def __init__(self, dsn: str | None = None):
         if psycopg is None:
             raise RuntimeError(
@@ -32,6 +75,34 @@ class DatabaseManager:
         self.lock_timeout_ms = int(os.environ.get("PG_LOCK_TIMEOUT_MS", "10000"))
         self.query_retries = max(0, int(os.environ.get("PG_QUERY_RETRIES", "2")))
         self.retry_backoff_ms = max(10, int(os.environ.get("PG_RETRY_BACKOFF_MS", "120")))
+        self.query_stats_enabled = os.environ.get("PG_QUERY_STATS", "1") != "0"
+        self.query_stats: Dict[str, Dict[str, Any]] = {}
+        self._query_stats_lock = threading.Lock()
+        # Stats are flushed to query_fingerprints this often, so a crash loses at most one interval.
+        self.query_stats_flush_s = float(os.environ.get("PG_QUERY_STATS_FLUSH_S", "300"))
+        self._query_stats_flushed_at = pytime.monotonic()
+        # Slow-query plan capture: 0 disables; sampled so a hot slow path is not explained on every call.
+        self.slow_query_ms = float(os.environ.get("PG_SLOW_QUERY_MS", "0"))
+        self.plan_sample_rate = min(1.0, max(0.0, float(os.environ.get("PG_PLAN_SAMPLE_RATE", "0.1"))))
+        # One background worker explains sampled queries; when it falls behind, further samples are dropped.
+        self._plan_queue: "queue.Queue[Tuple[str, Any, float]]" = queue.Queue(maxsize=self.PLAN_QUEUE_MAX)
+        self._plan_worker: Optional[threading.Thread] = None
+        self._plan_worker_lock = threading.Lock()
+        # Change notifications carry this id so a terminal can ignore its own writes.
+        self.instance_id = uuid.uuid4().hex
+        self.notify_enabled = os.environ.get("PG_LIVE_UPDATES", "1") != "0"
+        # Product catalog cache; bumping the version discards a load that raced an invalidation.
+        self._catalog_lock = threading.Lock()
+        self._catalog: Optional[Dict[str, Any]] = None
+        self._catalog_version = 0
+        self._directory_lock = threading.Lock()
+        self._directory: Dict[str, Dict[str, Any]] = {}
+        # Bumped by every local write and every change notification from another terminal, so
+        # caches of derived results (reports) can tell whether anything may have changed.
+        self._data_version = 0
+        self._data_version_lock = threading.Lock()
+        # Set by init_database once pg_trgm is known to be installed.
+        self.trigram_search = False
 
         self.pool = None
         if ConnectionPool is not None:
@@ -130,7 +201,183 @@ class DatabaseManager:
 
         return query
 
+    def _record_query(self, sql: str, elapsed_ms: float):
+        if not self.query_stats_enabled:
+            return
+        fingerprint = fingerprint_sql(sql)
+        with self._query_stats_lock:
+            stat = self.query_stats.get(fingerprint)
+            if stat is None:
+                stat = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+                self.query_stats[fingerprint] = stat
+            stat['calls'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            flush_due = (
+                self.query_stats_flush_s > 0
+                and pytime.monotonic() - self._query_stats_flushed_at >= self.query_stats_flush_s
+            )
+            if flush_due:
+                self._query_stats_flushed_at = pytime.monotonic()
+        if flush_due:
+            threading.Thread(target=self._flush_query_stats_quietly, daemon=True).start()
+
+    def _flush_query_stats_quietly(self):
+        try:
+            self.flush_query_stats()
+        except Exception:
+            pass
+
+    def get_query_stats(self) -> List[Dict[str, Any]]:
+        with self._query_stats_lock:
+            rows = [
+                {'fingerprint': fp, 'calls': st['calls'], 'total_ms': round(st['total_ms'], 3), 'max_ms': round(st['max_ms'], 3)}
+                for fp, st in self.query_stats.items()
+            ]
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def flush_query_stats(self) -> int:
+        """Merge in-process query fingerprints into query_fingerprints and reset the counters."""
+        with self._query_stats_lock:
+            pending = self.query_stats
+            self.query_stats = {}
+        if not pending:
+            return 0
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                for fp, st in pending.items():
+                    cur.execute(
+                        '''
+                        INSERT INTO query_fingerprints (fingerprint_hash, fingerprint, calls, total_ms, max_ms)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (fingerprint_hash) DO UPDATE
+                        SET calls = query_fingerprints.calls + EXCLUDED.calls,
+                            total_ms = query_fingerprints.total_ms + EXCLUDED.total_ms,
+                            max_ms = GREATEST(query_fingerprints.max_ms, EXCLUDED.max_ms),
+                            last_seen = CURRENT_TIMESTAMP
+                        ''',
+                        (hashlib.md5(fp.encode()).hexdigest(), fp, st['calls'], st['total_ms'], st['max_ms']),
+                    )
+        return len(pending)
+
+    def _maybe_capture_plan(self, sql: str, params, elapsed_ms: float):
+        if self.slow_query_ms <= 0 or elapsed_ms < self.slow_query_ms:
+            return
+        if random.random() >= self.plan_sample_rate:
+            return
+        words = sql.split(None, 1)
+        if not words or words[0].upper() not in ("SELECT", "WITH"):
+            return
+        if "query_plans" in sql:
+            return
+        try:
+            self._plan_queue.put_nowait((sql, params, elapsed_ms))
+        except queue.Full:
+            return
+        with self._plan_worker_lock:
+            if self._plan_worker is None or not self._plan_worker.is_alive():
+                self._plan_worker = threading.Thread(target=self._plan_capture_loop, name="plan-capture", daemon=True)
+                self._plan_worker.start()
+
+    def _plan_capture_loop(self):
+        while True:
+            sql, params, elapsed_ms = self._plan_queue.get()
+            try:
+                self._capture_plan(sql, params, elapsed_ms)
+            finally:
+                self._plan_queue.task_done()
+
+    def _capture_plan(self, sql: str, params, elapsed_ms: float):
+        """Re-run a slow read with EXPLAIN ANALYZE inside a read-only transaction and store the plan."""
+        plan = None
+        try:
+            with self._connection() as conn:
+                with conn.transaction():
+                    with conn.cursor(row_factory=dict_row) as cur:
+                        cur.execute("SET TRANSACTION READ ONLY")
+                        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+                        row = cur.fetchone()
+                        plan = row['QUERY PLAN'] if row else None
+                        # Nothing may persist from the analyzed run.
+                        raise psycopg.Rollback()
+        except Exception:
+            return
+        if plan is None:
+            return
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        execution_ms = None
+        try:
+            execution_ms = float(plan[0].get('Execution Time'))
+        except Exception:
+            pass
+        fingerprint = fingerprint_sql(sql)
+        try:
+            self.execute_update(
+                '''
+                INSERT INTO query_plans (fingerprint_hash, fingerprint, query_text, params_text, duration_ms, execution_ms, plan)
+                VALUES (?, ?, ?, ?, ?, ?, ?::jsonb)
+                ''',
+                (
+                    hashlib.md5(fingerprint.encode()).hexdigest(),
+                    fingerprint,
+                    sql,
+                    json.dumps(params if params is not None else [], default=str)[:2000],
+                    round(elapsed_ms, 3),
+                    execution_ms,
+                    json.dumps(plan),
+                ),
+            )
+        except Exception:
+            pass
+
+    def get_query_plans(self, limit: int = 200) -> List[Dict]:
+        return self.execute_query(f'''
+            SELECT id, captured_at, duration_ms, execution_ms, fingerprint
+            FROM query_plans
+            ORDER BY captured_at DESC
+            LIMIT {int(limit)}
+        ''')
+
+    def get_query_plan(self, plan_id: int) -> Optional[Dict]:
+        rows = self.execute_query('SELECT * FROM query_plans WHERE id = ?', (plan_id,))
+        return rows[0] if rows else None
+
+    def _notify(self, cur, event: str, client_id: Optional[int] = None, **payload):
+        """Queue a change notification on the caller's transaction; it is delivered on commit."""
+        if not self.notify_enabled:
+            return
+        message = json.dumps(
+            {'event': event, 'client_id': client_id, 'origin': self.instance_id, 'payload': payload},
+            default=str,
+        )
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, message))
+
+    @property
+    def data_version(self) -> int:
+        return self._data_version
+
+    def bump_data_version(self):
+        with self._data_version_lock:
+            self._data_version += 1
+
+    def publish_change(self, event: str, client_id: Optional[int] = None, **payload):
+        """Notify other terminals about a write that has already committed (best effort)."""
+        if not self.notify_enabled:
+            return
+        try:
+            with self.transaction(tracked=False) as conn:
+                with conn.cursor() as cur:
+                    self._notify(cur, event, client_id, **payload)
+        except Exception:
+            pass
+
     def close(self):
+        try:
+            self.flush_query_stats()
+        except Exception:
+            pass
         if self.pool is not None:
             try:
                 self.pool.close()
@@ -348,6 +595,16 @@ class DatabaseManager:
             )
             """,
             """
+            CREATE TABLE IF NOT EXISTS cylinder_stock_checkpoints (
+                gas_product_id BIGINT NOT NULL REFERENCES gas_products(id) ON DELETE CASCADE,
+                checkpoint_date DATE NOT NULL,
+                opening_count INTEGER NOT NULL DEFAULT 0,
+                sold_count INTEGER NOT NULL DEFAULT 0,
+                returned_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (gas_product_id, checkpoint_date)
+            )
+            """,
+            """
             CREATE TABLE IF NOT EXISTS lpg_refills (
                 id BIGSERIAL PRIMARY KEY,
                 client_id BIGINT NOT NULL REFERENCES clients(id),
@@ -373,13 +630,211 @@ class DatabaseManager:
                 created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
             )
             """,
+            """
+            CREATE TABLE IF NOT EXISTS period_closes (
+                id BIGSERIAL PRIMARY KEY,
+                cutoff_date DATE NOT NULL,
+                sales_archived INTEGER DEFAULT 0,
+                sale_items_archived INTEGER DEFAULT 0,
+                receipts_archived INTEGER DEFAULT 0,
+                weekly_invoices_archived INTEGER DEFAULT 0,
+                weekly_payments_archived INTEGER DEFAULT 0,
+                created_by BIGINT REFERENCES users(id),
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS client_period_openings (
+                id BIGSERIAL PRIMARY KEY,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                client_id BIGINT NOT NULL REFERENCES clients(id),
+                sale_count INTEGER DEFAULT 0,
+                total_purchases DECIMAL(12,2) DEFAULT 0,
+                total_paid DECIMAL(12,2) DEFAULT 0,
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS client_cylinder_openings (
+                id BIGSERIAL PRIMARY KEY,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                client_id BIGINT NOT NULL REFERENCES clients(id),
+                gas_type TEXT NOT NULL,
+                sub_type TEXT,
+                capacity TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sales_archive (
+                id BIGINT PRIMARY KEY,
+                client_id BIGINT NOT NULL,
+                gas_product_id BIGINT NOT NULL,
+                quantity INTEGER NOT NULL,
+                unit_price DECIMAL(10,2) NOT NULL,
+                subtotal DECIMAL(10,2) NOT NULL,
+                tax_amount DECIMAL(10,2) NOT NULL,
+                total_amount DECIMAL(10,2) NOT NULL,
+                amount_paid DECIMAL(10,2) DEFAULT 0,
+                balance DECIMAL(10,2) DEFAULT 0,
+                created_by BIGINT NOT NULL,
+                created_at TIMESTAMPTZ,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sale_items_archive (
+                id BIGINT PRIMARY KEY,
+                sale_id BIGINT NOT NULL,
+                gas_product_id BIGINT NOT NULL,
+                supplier_id BIGINT,
+                fill_unit_cost DECIMAL(10,2) DEFAULT 0,
+                fill_total DECIMAL(10,2) DEFAULT 0,
+                quantity INTEGER NOT NULL,
+                unit_price DECIMAL(10,2) NOT NULL,
+                subtotal DECIMAL(10,2) NOT NULL,
+                tax_amount DECIMAL(10,2) NOT NULL,
+                total_amount DECIMAL(10,2) NOT NULL,
+                created_at TIMESTAMPTZ,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS receipts_archive (
+                id BIGINT PRIMARY KEY,
+                receipt_number TEXT NOT NULL,
+                sale_id BIGINT NOT NULL,
+                client_id BIGINT NOT NULL,
+                total_amount DECIMAL(10,2) NOT NULL,
+                amount_paid DECIMAL(10,2) DEFAULT 0,
+                balance DECIMAL(10,2) DEFAULT 0,
+                created_by BIGINT NOT NULL,
+                created_at TIMESTAMPTZ,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS weekly_invoices_archive (
+                id BIGINT PRIMARY KEY,
+                invoice_number TEXT NOT NULL,
+                client_id BIGINT NOT NULL,
+                week_start DATE NOT NULL,
+                week_end DATE NOT NULL,
+                total_cylinders INTEGER DEFAULT 0,
+                subtotal DECIMAL(10,2) DEFAULT 0,
+                discount DECIMAL(10,2) DEFAULT 0,
+                tax_amount DECIMAL(10,2) DEFAULT 0,
+                total_payable DECIMAL(10,2) DEFAULT 0,
+                previous_balance DECIMAL(10,2) DEFAULT 0,
+                final_payable DECIMAL(10,2) DEFAULT 0,
+                amount_paid DECIMAL(10,2) DEFAULT 0,
+                status TEXT NOT NULL,
+                receipt_number TEXT,
+                created_by BIGINT,
+                created_at TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ,
+                paid_at TIMESTAMPTZ,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS weekly_payments_archive (
+                id BIGINT PRIMARY KEY,
+                weekly_invoice_id BIGINT NOT NULL,
+                client_id BIGINT NOT NULL,
+                amount DECIMAL(10,2) NOT NULL,
+                payment_date DATE NOT NULL,
+                payment_method TEXT,
+                created_by BIGINT,
+                created_at TIMESTAMPTZ,
+                period_close_id BIGINT NOT NULL REFERENCES period_closes(id),
+                archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS query_fingerprints (
+                fingerprint_hash TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                calls BIGINT NOT NULL DEFAULT 0,
+                total_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+                max_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+                first_seen TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS report_snapshots (
+                name TEXT NOT NULL,
+                params_key TEXT NOT NULL DEFAULT '',
+                change_seq BIGINT NOT NULL,
+                rows JSONB NOT NULL,
+                computed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (name, params_key)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS query_plans (
+                id BIGSERIAL PRIMARY KEY,
+                fingerprint_hash TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                query_text TEXT NOT NULL,
+                params_text TEXT,
+                duration_ms DOUBLE PRECISION NOT NULL,
+                execution_ms DOUBLE PRECISION,
+                plan JSONB NOT NULL,
+                captured_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE OR REPLACE FUNCTION billing_week_start(d DATE) RETURNS DATE
+            LANGUAGE sql IMMUTABLE AS $$ SELECT d - ((EXTRACT(ISODOW FROM d)::int + 1) % 7) $$
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS client_week_rollup (
+                client_id BIGINT NOT NULL REFERENCES clients(id),
+                week_start DATE NOT NULL,
+                sale_count INTEGER NOT NULL DEFAULT 0,
+                items_cylinders INTEGER NOT NULL DEFAULT 0,
+                items_gross DECIMAL(12,2) NOT NULL DEFAULT 0,
+                items_subtotal DECIMAL(12,2) NOT NULL DEFAULT 0,
+                items_tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+                items_total DECIMAL(12,2) NOT NULL DEFAULT 0,
+                sales_cylinders INTEGER NOT NULL DEFAULT 0,
+                sales_gross DECIMAL(12,2) NOT NULL DEFAULT 0,
+                sales_subtotal DECIMAL(12,2) NOT NULL DEFAULT 0,
+                sales_tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+                sales_total DECIMAL(12,2) NOT NULL DEFAULT 0,
+                outstanding DECIMAL(12,2) NOT NULL DEFAULT 0,
+                amount_paid DECIMAL(12,2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (client_id, week_start)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS product_daily_rollup (
+                day DATE NOT NULL,
+                gas_product_id BIGINT NOT NULL REFERENCES gas_products(id),
+                sale_count INTEGER NOT NULL DEFAULT 0,
+                line_count INTEGER NOT NULL DEFAULT 0,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                subtotal DECIMAL(12,2) NOT NULL DEFAULT 0,
+                tax_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+                total_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (day, gas_product_id)
+            )
+            """,
             "CREATE INDEX IF NOT EXISTS idx_clients_phone ON clients (phone)",
             "CREATE INDEX IF NOT EXISTS idx_suppliers_name ON suppliers (name)",
             "CREATE INDEX IF NOT EXISTS idx_sales_client_id ON sales (client_id)",
             "CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales (created_at)",
             "CREATE INDEX IF NOT EXISTS idx_receipts_receipt_number ON receipts (receipt_number)",
             "CREATE INDEX IF NOT EXISTS idx_receipts_created_at ON receipts (created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_weekly_invoices_client_week ON weekly_invoices (client_id, week_start, week_end)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_invoices_status ON weekly_invoices (status)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_payments_invoice ON weekly_payments (weekly_invoice_id)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_payments_payment_date ON weekly_payments (payment_date)",
@@ -404,7 +859,66 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_lpg_refills_product_created ON lpg_refills (gas_product_id, created_at)",
             "CREATE INDEX IF NOT EXISTS idx_supplier_fill_payments_supplier_date ON supplier_fill_payments (supplier_id, payment_date)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_invoices_receipt_number ON weekly_invoices (receipt_number)",
+            "CREATE INDEX IF NOT EXISTS idx_query_plans_captured_at ON query_plans (captured_at)",
+            "CREATE INDEX IF NOT EXISTS idx_query_plans_fingerprint ON query_plans (fingerprint_hash, captured_at)",
+            "CREATE INDEX IF NOT EXISTS idx_client_period_openings_client ON client_period_openings (client_id)",
+            "CREATE INDEX IF NOT EXISTS idx_client_cylinder_openings_client ON client_cylinder_openings (client_id)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_archive_client_created ON sales_archive (client_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_archive_created_at ON sales_archive (created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_archive_created_id ON sales_archive (created_at DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_sale_items_archive_sale_id ON sale_items_archive (sale_id)",
+            "CREATE INDEX IF NOT EXISTS idx_receipts_archive_receipt_number ON receipts_archive (receipt_number)",
+            "CREATE INDEX IF NOT EXISTS idx_receipts_archive_created_id ON receipts_archive (created_at DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_weekly_invoices_archive_client_week ON weekly_invoices_archive (client_id, week_start, week_end)",
+            "CREATE INDEX IF NOT EXISTS idx_weekly_payments_archive_invoice ON weekly_payments_archive (weekly_invoice_id)",
+            # FIFO allocation of weekly payments only walks a client's unpaid sales.
+            "CREATE INDEX IF NOT EXISTS idx_sales_client_unpaid_created ON sales (client_id, created_at) INCLUDE (total_amount, amount_paid) WHERE (total_amount - amount_paid) > 0",
+            "CREATE INDEX IF NOT EXISTS idx_clients_outstanding_balance ON clients (balance DESC) INCLUDE (name, phone, company, total_purchases, total_paid) WHERE balance > 0",
+            "CREATE INDEX IF NOT EXISTS idx_receipts_created_id ON receipts (created_at DESC, id DESC)",
+            # Keyset pages of the Sales Report, newest first.
+            "CREATE INDEX IF NOT EXISTS idx_sales_created_id ON sales (created_at DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_weekly_invoices_week ON weekly_invoices (week_start, week_end) INCLUDE (client_id, status)",
             "CREATE SEQUENCE IF NOT EXISTS receipt_number_seq START WITH 1 INCREMENT BY 1",
+            # Moved by every committed write to business data; report snapshots are only valid at the value they were computed at.
+            "CREATE SEQUENCE IF NOT EXISTS data_change_seq",
+            # One row per write to a closed day's sales or refills, so that day's snapshots survive
+            # today's writes. Today's rows are not logged, which keeps the table off the sale path.
+            """
+            CREATE TABLE IF NOT EXISTS day_changes (
+                day DATE NOT NULL,
+                change_seq BIGINT NOT NULL DEFAULT nextval('data_change_seq')
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_day_changes_day_seq ON day_changes (day, change_seq)",
+            """
+            CREATE OR REPLACE FUNCTION record_day_change() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' AND OLD.created_at < CURRENT_DATE THEN
+                    INSERT INTO day_changes (day) VALUES (OLD.created_at::date);
+                END IF;
+                IF TG_OP <> 'DELETE' AND NEW.created_at < CURRENT_DATE THEN
+                    IF TG_OP = 'INSERT' OR NEW.created_at::date IS DISTINCT FROM OLD.created_at::date THEN
+                        INSERT INTO day_changes (day) VALUES (NEW.created_at::date);
+                    END IF;
+                END IF;
+                RETURN NULL;
+            END $$
+            """,
+            """
+            DO $$
+            DECLARE t TEXT;
+            BEGIN
+                FOREACH t IN ARRAY ARRAY['sales', 'sales_archive', 'sale_items', 'sale_items_archive', 'lpg_refills'] LOOP
+                    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_record_day_change' AND tgrelid = t::regclass) THEN
+                        EXECUTE format(
+                            'CREATE TRIGGER trg_record_day_change AFTER INSERT OR UPDATE OR DELETE ON %I '
+                            'FOR EACH ROW EXECUTE FUNCTION record_day_change()', t
+                        );
+                    END IF;
+                END LOOP;
+            END $$
+            """,
             "CREATE SEQUENCE IF NOT EXISTS weekly_invoice_number_seq START WITH 1 INCREMENT BY 1",
             "CREATE SEQUENCE IF NOT EXISTS weekly_receipt_number_seq START WITH 1 INCREMENT BY 1",
         ]
@@ -414,6 +928,17 @@ class DatabaseManager:
                 with conn.cursor() as cur:
                     for ddl in ddl_statements:
                         cur.execute(ddl)
+                    # Client search ranks with pg_trgm when the role may install it; plain LIKE otherwise.
+                    try:
+                        with conn.transaction():
+                            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                            cur.execute(
+                                f"CREATE INDEX IF NOT EXISTS idx_clients_search_trgm ON clients "
+                                f"USING gin (({self._CLIENT_SEARCH_TEXT}) gin_trgm_ops)"
+                            )
+                        self.trigram_search = True
+                    except Exception as e:
+                        print(f"pg_trgm unavailable, client search falls back to LIKE: {str(e)}")
                     cur.execute("ALTER TABLE client_initial_outstanding ADD COLUMN IF NOT EXISTS sub_type TEXT")
                     cur.execute("ALTER TABLE suppliers ADD COLUMN IF NOT EXISTS notes TEXT")
                     cur.execute("ALTER TABLE suppliers ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE")
@@ -422,12 +947,65 @@ class DatabaseManager:
                     cur.execute("ALTER TABLE sale_items ADD COLUMN IF NOT EXISTS fill_unit_cost DECIMAL(10,2) DEFAULT 0")
                     cur.execute("ALTER TABLE sale_items ADD COLUMN IF NOT EXISTS fill_total DECIMAL(10,2) DEFAULT 0")
                     cur.execute("ALTER TABLE lpg_refills ADD COLUMN IF NOT EXISTS supplier_id BIGINT REFERENCES suppliers(id)")
+                    cur.execute("ALTER TABLE cylinder_inventory ADD COLUMN IF NOT EXISTS snapshot_opening INTEGER NOT NULL DEFAULT 0")
+                    cur.execute("ALTER TABLE cylinder_inventory ADD COLUMN IF NOT EXISTS snapshot_sold INTEGER NOT NULL DEFAULT 0")
+                    cur.execute("ALTER TABLE cylinder_inventory ADD COLUMN IF NOT EXISTS snapshot_returned INTEGER NOT NULL DEFAULT 0")
+                    cur.execute("ALTER TABLE cylinder_inventory ADD COLUMN IF NOT EXISTS snapshot_movement_id BIGINT NOT NULL DEFAULT 0")
+                    cur.execute("ALTER TABLE cylinder_inventory ADD COLUMN IF NOT EXISTS snapshot_at TIMESTAMPTZ")
                     cur.execute("ALTER TABLE lpg_refills ADD COLUMN IF NOT EXISTS unit_price DECIMAL(10,2) DEFAULT 0")
                     cur.execute("ALTER TABLE lpg_refills ADD COLUMN IF NOT EXISTS total_amount DECIMAL(10,2) DEFAULT 0")
                     cur.execute("ALTER TABLE lpg_refills ADD COLUMN IF NOT EXISTS notes TEXT")
                     cur.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_supplier_id ON sale_items (supplier_id)")
                     cur.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_fill_total ON sale_items (fill_total)")
                     cur.execute("CREATE INDEX IF NOT EXISTS idx_lpg_refills_supplier_created ON lpg_refills (supplier_id, created_at)")
+                    cur.execute("SELECT to_regclass('uq_weekly_invoices_client_week') IS NULL AS missing")
+                    if cur.fetchone()[0]:
+                        # Fold duplicate weekly invoices left by concurrent regenerations into the
+                        # oldest row so the unique index can be built.
+                        cur.execute('''
+                            WITH ranked AS (
+                                SELECT id, MIN(id) OVER (PARTITION BY client_id, week_start, week_end) AS keep_id
+                                FROM weekly_invoices
+                            )
+                            UPDATE weekly_payments wp
+                            SET weekly_invoice_id = r.keep_id
+                            FROM ranked r
+                            WHERE wp.weekly_invoice_id = r.id AND r.id <> r.keep_id
+                        ''')
+                        # The kept invoice now owns every payment of its group: recompute what it shows as paid.
+                        cur.execute('''
+                            WITH merged AS (
+                                SELECT MIN(id) AS keep_id, MAX(amount_paid) AS max_paid
+                                FROM weekly_invoices
+                                GROUP BY client_id, week_start, week_end
+                                HAVING COUNT(*) > 1
+                            ),
+                            paid AS (
+                                SELECT m.keep_id,
+                                       COALESCE((SELECT SUM(wp.amount) FROM weekly_payments wp
+                                                 WHERE wp.weekly_invoice_id = m.keep_id), m.max_paid) AS amount_paid
+                                FROM merged m
+                            )
+                            UPDATE weekly_invoices wi
+                            SET amount_paid = p.amount_paid,
+                                status = CASE WHEN wi.final_payable <= 0.01 OR p.amount_paid + 0.01 >= wi.final_payable
+                                              THEN 'PAID' ELSE 'UNPAID' END,
+                                paid_at = CASE WHEN wi.final_payable <= 0.01 OR p.amount_paid + 0.01 >= wi.final_payable
+                                               THEN COALESCE(wi.paid_at, CURRENT_TIMESTAMP) END,
+                                updated_at = CURRENT_TIMESTAMP
+                            FROM paid p
+                            WHERE wi.id = p.keep_id
+                        ''')
+                        cur.execute('''
+                            DELETE FROM weekly_invoices wi
+                            USING weekly_invoices keep
+                            WHERE keep.client_id = wi.client_id
+                              AND keep.week_start = wi.week_start
+                              AND keep.week_end = wi.week_end
+                              AND keep.id < wi.id
+                        ''')
+                        cur.execute("CREATE UNIQUE INDEX uq_weekly_invoices_client_week ON weekly_invoices (client_id, week_start, week_end)")
+                    cur.execute("DROP INDEX IF EXISTS idx_weekly_invoices_client_week")
                     cur.execute("DROP TABLE IF EXISTS gate_passes")
                     cur.execute("DROP TABLE IF EXISTS vehicle_expenses")
                     cur.execute('''
@@ -437,26 +1015,80 @@ class DatabaseManager:
                     ''')
                     cur.execute('''
                         SELECT COALESCE(MAX((regexp_match(receipt_number, '^(?:RCP)-\\d{4}-(\\d+)$'))[1]::BIGINT), 0) AS max_n
-                        FROM receipts
+                        FROM (
+                            SELECT receipt_number FROM receipts
+                            UNION ALL
+                            SELECT receipt_number FROM receipts_archive
+                        ) r
                     ''')
                     max_receipt = int((cur.fetchone() or [0])[0] or 0)
                     cur.execute("SELECT setval('receipt_number_seq', %s, true)", (max_receipt if max_receipt > 0 else 1,))
 
                     cur.execute('''
                         SELECT COALESCE(MAX((regexp_match(invoice_number, '^(?:WEEK)-\\d{4}-(\\d+)$'))[1]::BIGINT), 0) AS max_n
-                        FROM weekly_invoices
+                        FROM (
+                            SELECT invoice_number FROM weekly_invoices
+                            UNION ALL
+                            SELECT invoice_number FROM weekly_invoices_archive
+                        ) wi
                     ''')
                     max_week_invoice = int((cur.fetchone() or [0])[0] or 0)
                     cur.execute("SELECT setval('weekly_invoice_number_seq', %s, true)", (max_week_invoice if max_week_invoice > 0 else 1,))
 
                     cur.execute('''
                         SELECT COALESCE(MAX((regexp_match(receipt_number, '^(?:WRCP)-\\d{4}-(\\d+)$'))[1]::BIGINT), 0) AS max_n
-                        FROM weekly_invoices
+                        FROM (
+                            SELECT receipt_number FROM weekly_invoices
+                            UNION ALL
+                            SELECT receipt_number FROM weekly_invoices_archive
+                        ) wi
                         WHERE receipt_number IS NOT NULL
                     ''')
                     max_week_receipt = int((cur.fetchone() or [0])[0] or 0)
                     cur.execute("SELECT setval('weekly_receipt_number_seq', %s, true)", (max_week_receipt if max_week_receipt > 0 else 1,))
 
+                    # Rebuild the weekly rollup when it is missing or was bypassed (e.g. a bulk migration).
+                    # The check reads every sale, so it is skipped while nothing changed since it last passed.
+                    watermark = self._rollup_watermark(cur)
+                    if not self._rollup_verified(cur, 'client_week_rollup', watermark):
+                        cur.execute('''
+                            SELECT (SELECT ROW(COALESCE(SUM(sale_count), 0), COALESCE(SUM(sales_total), 0),
+                                               COALESCE(SUM(outstanding), 0), COALESCE(SUM(amount_paid), 0),
+                                               COALESCE(SUM(items_total), 0))
+                                    FROM client_week_rollup)
+                                   IS DISTINCT FROM
+                                   (SELECT ROW(COUNT(*), COALESCE(SUM(total_amount), 0),
+                                               COALESCE(SUM(balance), 0), COALESCE(SUM(amount_paid), 0),
+                                               (SELECT COALESCE(SUM(total_amount), 0) FROM sale_items))
+                                    FROM sales) AS stale
+                        ''')
+                        if cur.fetchone()[0]:
+                            self._refresh_week_rollup(cur)
+                        self._mark_rollup_verified(cur, 'client_week_rollup', watermark)
+
+                    # Same for the product rollup, which counts one line per item (or per item-less sale).
+                    if not self._rollup_verified(cur, 'product_daily_rollup', watermark):
+                        cur.execute(f'''
+                            SELECT (SELECT ROW(COALESCE(SUM(line_count), 0), COALESCE(SUM(quantity), 0),
+                                               COALESCE(SUM(total_amount), 0))
+                                    FROM product_daily_rollup)
+                                   IS DISTINCT FROM
+                                   (SELECT ROW(COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(total_amount), 0))
+                                    FROM ({self._product_lines_sql("")}) lines) AS stale
+                        ''')
+                        if cur.fetchone()[0]:
+                            self._refresh_product_rollup(cur)
+                        self._mark_rollup_verified(cur, 'product_daily_rollup', watermark)
+
+        # Startup is a snapshot point (the scheduler's nightly job is the other): replays then only read
+        # movements since the last run, and as-of lookups only read movements after the last closed day.
+        # Both are maintenance, so a failure is logged and must not keep the app from starting.
+        for maintain in (self.snapshot_cylinder_inventory, self.refresh_cylinder_stock_checkpoints):
+            try:
+                maintain()
+            except Exception as e:
+                print(f"Cylinder stock maintenance failed ({maintain.__name__}): {str(e)}")
+
         rows = self.execute_query("SELECT COUNT(*) AS n FROM users WHERE role = 'Admin'")
         if not rows or int(rows[0]["n"]) == 0:
             import hashlib
@@ -470,6 +1102,18 @@ class DatabaseManager:
                 ("admin", password_hash, "Admin", "System Administrator", "", ""),
             )
     
+    @staticmethod
+    def _normalize_row(row) -> Dict:
+        item = dict(row)
+        for key, value in list(item.items()):
+            if isinstance(value, datetime):
+                item[key] = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(value, date):
+                item[key] = value.isoformat()
+            elif isinstance(value, time):
+                item[key] = value.strftime("%H:%M:%S")
+        return item
+
     def execute_query(self, query: str, params: tuple = ()) -> List[Dict]:
         sql = self._translate_sql(query)
         retries = self.query_retries
@@ -477,20 +1121,14 @@ class DatabaseManager:
             try:
                 with self._connection() as conn:
                     with conn.cursor(row_factory=dict_row) as cur:
+                        started = pytime.perf_counter()
                         cur.execute(sql, params)
                         rows = list(cur.fetchall())
-                        normalized: List[Dict] = []
-                        for row in rows:
-                            item = dict(row)
-                            for key, value in list(item.items()):
-                                if isinstance(value, datetime):
-                                    item[key] = value.strftime("%Y-%m-%d %H:%M:%S")
-                                elif isinstance(value, date):
-                                    item[key] = value.isoformat()
-                                elif isinstance(value, time):
-                                    item[key] = value.strftime("%H:%M:%S")
-                            normalized.append(item)
-                        return normalized
+                        elapsed_ms = (pytime.perf_counter() - started) * 1000.0
+                        self._record_query(sql, elapsed_ms)
+                        normalized = [self._normalize_row(row) for row in rows]
+                self._maybe_capture_plan(sql, params, elapsed_ms)
+                return normalized
             except Exception as exc:
                 if attempt >= retries or not self._is_retryable_query_error(exc):
                     raise
@@ -509,11 +1147,22 @@ class DatabaseManager:
                 with self._connection() as conn:
                     with conn.transaction():
                         with conn.cursor(row_factory=dict_row) as cur:
+                            started = pytime.perf_counter()
                             cur.execute(sql, params)
+                            self._record_query(sql, (pytime.perf_counter() - started) * 1000.0)
                             if is_insert:
                                 row = cur.fetchone()
-                                return int(row["id"]) if row and "id" in row else 0
-                            return int(cur.rowcount or 0)
+                                result = int(row["id"]) if row and "id" in row else 0
+                            else:
+                                result = int(cur.rowcount or 0)
+                            target = _WRITE_TARGET.match(sql)
+                            tracked = not target or target.group(1).lower() not in UNTRACKED_TABLES
+                            if tracked:
+                                cur.execute("SELECT nextval('data_change_seq')")
+                # Only after commit: a report run in between must not be cached under the new version.
+                if tracked:
+                    self.bump_data_version()
+                return result
             except Exception as exc:
                 if attempt >= retries or not self._is_retryable_write_error(exc):
                     raise
@@ -521,11 +1170,158 @@ class DatabaseManager:
                 pytime.sleep(sleep_ms / 1000.0)
 
     @contextmanager
-    def transaction(self):
+    def transaction(self, tracked: bool = True):
+        """A pooled connection in one transaction.
+
+        tracked=False is for writes of derived data only (weekly invoice refreshes, rollups,
+        stock snapshots) and bookkeeping, which invalidate neither report snapshots nor
+        cached reports. Rollups refreshed after a sale follow its tracked commit on the same
+        thread, so no report can be cached in between.
+        """
         with self._connection() as conn:
             with conn.transaction():
                 yield conn
+                if tracked:
+                    conn.execute("SELECT nextval('data_change_seq')")
+        if tracked:
+            self.bump_data_version()
+
+    def stream_query(self, query: str, params: tuple = (), chunk_size: int = 2000) -> Iterator[Dict]:
+        """Yield rows of a read-only query chunk by chunk through a server-side cursor.
+
+        Only chunk_size rows are in memory at a time, so exports of any size run in
+        bounded memory. The pooled connection is held until the iterator is exhausted
+        or closed.
+        """
+        sql = self._translate_sql(query)
+        # Not self.transaction(): a read must not bump the data version.
+        with self._connection() as conn, conn.transaction():
+            with conn.cursor() as setup:
+                setup.execute("SET TRANSACTION READ ONLY")
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}", row_factory=dict_row) as cur:
+                cur.itersize = chunk_size
+                started = pytime.perf_counter()
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield self._normalize_row(row)
+                self._record_query(sql, (pytime.perf_counter() - started) * 1000.0)
     
+    def fetch_columns(self, query: str, params: tuple = (), chunk_size: int = 10000) -> Dict[str, list]:
+        """Run a read-only query and return its result column by column: {name: [values]}.
+
+        Rows come through a server-side cursor in binary format and each chunk is
+        transposed into the column lists straight away, so no per-row dicts are built.
+        Values keep their database types (no date formatting as in execute_query()).
+        """
+        sql = self._translate_sql(query)
+        with self._connection() as conn, conn.transaction():
+            with conn.cursor() as setup:
+                setup.execute("SET TRANSACTION READ ONLY")
+            # Tuples whatever the connection's row factory, since chunks are transposed by position.
+            with conn.cursor(name=f"columns_{uuid.uuid4().hex}", row_factory=tuple_row) as cur:
+                cur.itersize = chunk_size
+                started = pytime.perf_counter()
+                cur.execute(sql, params, binary=True)
+                names = [column.name for column in cur.description]
+                columns: Dict[str, list] = {name: [] for name in names}
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for name, values in zip(names, zip(*rows)):
+                        columns[name].extend(values)
+                self._record_query(sql, (pytime.perf_counter() - started) * 1000.0)
+        return columns
+
+    def data_change_seq(self) -> int:
+        rows = self.execute_query(f"SELECT ({_CHANGE_SEQ_SQL}) AS change_seq")
+        return int(rows[0]['change_seq'])
+
+    @staticmethod
+    def _snapshot_seq_sql(name: str, params_key: str) -> Tuple[str, tuple]:
+        """The query a snapshot's change_seq is compared with, and its parameters."""
+        if name in _DAY_SNAPSHOTS:
+            return _DAY_CHANGE_SEQ_SQL, (params_key, params_key)
+        return _CHANGE_SEQ_SQL, ()
+
+    def get_report_snapshot(self, name: str, params_key: str = '') -> Optional[List[Dict]]:
+        """Rows precomputed by the scheduler, or None if there are none or data changed since."""
+        seq_sql, seq_params = self._snapshot_seq_sql(name, params_key)
+        rows = self.execute_query(
+            f'''
+            SELECT rows FROM report_snapshots
+            WHERE name = ? AND params_key = ?
+              AND change_seq = ({seq_sql})
+            ''',
+            (name, params_key) + seq_params,
+        )
+        return rows[0]['rows'] if rows else None
+
+    def save_report_snapshot(self, name: str, params_key: str, change_seq: int, rows: List[Dict]):
+        """Store rows computed while data_change_seq was change_seq.
+
+        Written outside transaction() so saving a snapshot does not itself invalidate it.
+        """
+        with self._connection() as conn:
+            with conn.transaction():
+                conn.execute(
+                    '''
+                    INSERT INTO report_snapshots (name, params_key, change_seq, rows)
+                    VALUES (%s, %s, %s, %s::jsonb)
+                    ON CONFLICT (name, params_key) DO UPDATE
+                    SET change_seq = EXCLUDED.change_seq, rows = EXCLUDED.rows, computed_at = CURRENT_TIMESTAMP
+                    ''',
+                    # Decimals are stored as numbers; dates are already strings after _normalize_row.
+                    (name, params_key, int(change_seq), json.dumps(rows, default=float)),
+                )
+
+    def precompute_snapshot(self, name: str, params_key: str, compute: Callable[[], List[Dict]]) -> int:
+        """Run compute() and store its rows as a snapshot; returns the row count.
+
+        A write moves the sequence before it commits, so nothing is computed while any
+        write is in flight, and the rows are discarded when the sequence moved while
+        compute() ran, since they may then mix data from before and after the write.
+        """
+        seq_sql, seq_params = self._snapshot_seq_sql(name, params_key)
+        state = self.execute_query(
+            f'''
+            SELECT ({seq_sql}) AS change_seq,
+                   EXISTS (SELECT 1 FROM pg_snapshot_xip(pg_current_snapshot())) AS writing
+            ''',
+            seq_params,
+        )[0]
+        if state['writing']:
+            return 0
+        rows = compute()
+        if self.execute_query(f"SELECT ({seq_sql}) AS change_seq", seq_params)[0]['change_seq'] == state['change_seq']:
+            self.save_report_snapshot(name, params_key, state['change_seq'], rows)
+        return len(rows)
+
+    def prune_report_snapshots(self, max_age_days: int = 14) -> int:
+        # Only a day's latest change is ever compared with; older rows for the same day can go.
+        self.execute_update(
+            '''
+            DELETE FROM day_changes d
+            USING day_changes newer
+            WHERE newer.day = d.day AND newer.change_seq > d.change_seq
+            '''
+        )
+        return self.execute_update(
+            "DELETE FROM report_snapshots WHERE computed_at < CURRENT_TIMESTAMP - (? * INTERVAL '1 day')",
+            (int(max_age_days),),
+        )
+
+    def _snapshot_or(self, name: str, params_key: str, compute: Callable[[], List[Dict]]) -> List[Dict]:
+        try:
+            rows = self.get_report_snapshot(name, params_key)
+        except Exception:
+            rows = None
+        return rows if rows is not None else compute()
+
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
         import hashlib
         password_hash = hashlib.sha256(password.encode()).hexdigest()
@@ -545,6 +1341,80 @@ class DatabaseManager:
         query = 'INSERT INTO activity_logs (user_id, activity_type, description) VALUES (?, ?, ?)'
         self.execute_update(query, (user_id, activity_type, description))
     
+    # Client/supplier pickers. Only the columns the combo boxes need; updated_at drives incremental refresh.
+    _DIRECTORY_SQL = {
+        'clients': 'SELECT id, name, phone, company, updated_at FROM clients',
+        'suppliers': 'SELECT id, name, phone, is_active, updated_at FROM suppliers',
+    }
+    # Seconds a directory is trusted without a change notification before it re-checks updated_at.
+    DIRECTORY_MAX_AGE_S = 60.0
+
+    def get_directory(self, kind: str) -> Tuple[int, List[Dict]]:
+        """(version, rows sorted by name) of the cached client or supplier directory.
+
+        The first call loads the table; later calls only fetch rows whose updated_at moved
+        since the last refresh, and only once the directory is marked stale or has aged out.
+        The version changes whenever the rows do.
+        """
+        if kind not in self._DIRECTORY_SQL:
+            raise ValueError(f"Unknown directory: {kind}")
+        with self._directory_lock:
+            entry = self._directory.get(kind)
+            if entry is not None and not entry['stale'] and pytime.monotonic() - entry['checked_at'] < self.DIRECTORY_MAX_AGE_S:
+                return entry['version'], entry['rows']
+
+        sql = self._DIRECTORY_SQL[kind]
+        checked_at = pytime.monotonic()
+        if entry is None:
+            by_id = {int(r['id']): r for r in self.execute_query(sql)}
+            changed = True
+        else:
+            by_id = dict(entry['by_id'])
+            # updated_at is the writer's transaction start, so re-read a short window before the watermark
+            # to pick up rows from transactions that committed after the last refresh.
+            rows = self.execute_query(
+                f"{sql} WHERE updated_at >= %(since)s::timestamptz - INTERVAL '1 minute'",
+                {'since': entry['watermark']},
+            )
+            changed = False
+            for row in rows:
+                old = by_id.get(int(row['id']))
+                by_id[int(row['id'])] = row
+                # Balance updates touch clients.updated_at on every sale; only picker columns count as a change.
+                if old is None or any(old.get(k) != v for k, v in row.items() if k != 'updated_at'):
+                    changed = True
+            total = self.execute_query(f"SELECT COUNT(*) AS n FROM {kind}")
+            if int(total[0]['n']) != len(by_id):
+                # Deleted rows leave no updated_at behind; fall back to a full load.
+                by_id = {int(r['id']): r for r in self.execute_query(sql)}
+                changed = True
+
+        with self._directory_lock:
+            current = self._directory.get(kind)
+            version = (current['version'] if current else 0) + (1 if changed or current is None else 0)
+            entry = {
+                'version': version,
+                'by_id': by_id,
+                'rows': (
+                    sorted(by_id.values(), key=lambda r: ((r.get('name') or '').lower(), int(r['id'])))
+                    if changed or current is None else current['rows']
+                ),
+                'watermark': max((str(r['updated_at']) for r in by_id.values() if r.get('updated_at')), default='-infinity'),
+                'checked_at': checked_at,
+                # A change notification that arrived during the refresh keeps the entry stale.
+                'stale': bool(current and current['stale'] and current['stale_at'] > checked_at),
+                'stale_at': current['stale_at'] if current else 0.0,
+            }
+            self._directory[kind] = entry
+            return entry['version'], entry['rows']
+
+    def invalidate_directory(self, kind: str):
+        with self._directory_lock:
+            entry = self._directory.get(kind)
+            if entry is not None:
+                entry['stale'] = True
+                entry['stale_at'] = pytime.monotonic()
+
     def get_clients(self, search_term: str = "") -> List[Dict]:
         if search_term:
             query = '''
@@ -560,6 +1430,60 @@ class DatabaseManager:
             query = 'SELECT * FROM clients ORDER BY name'
             return self.execute_query(query)
     
+    # Text the client search matches against; idx_clients_search_trgm is built on exactly this expression.
+    _CLIENT_SEARCH_TEXT = "LOWER(COALESCE(name, '') || ' ' || COALESCE(phone, '') || ' ' || COALESCE(company, ''))"
+
+    @staticmethod
+    def client_search_text(client: Dict[str, Any]) -> str:
+        """Python mirror of _CLIENT_SEARCH_TEXT, for narrowing earlier results in memory."""
+        return f"{client.get('name') or ''} {client.get('phone') or ''} {client.get('company') or ''}".lower()
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        """pg_trgm's trigrams: each alphanumeric word padded with two spaces before and one after."""
+        grams = set()
+        for word in re.findall(r"[^\W_]+", text.lower()):
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+
+    def client_search_rank(self, client: Dict[str, Any], term: str) -> tuple:
+        """Python mirror of search_clients' ORDER BY, for re-ranking narrowed results; sort ascending."""
+        name = (client.get('name') or '').lower()
+        prefix = name.startswith(term) or (client.get('phone') or '').startswith(term)
+        similarity = 0.0
+        if self.trigram_search:
+            text, wanted = self._trigrams(self.client_search_text(client)), self._trigrams(term)
+            union = text | wanted
+            similarity = len(text & wanted) / len(union) if union else 0.0
+        return (not prefix, -similarity, client.get('name') or '', client.get('id') or 0)
+
+    def search_clients(self, term: str, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Top clients whose name, phone or company contains term, best matches first.
+
+        Name and phone prefix matches rank first, then trigram similarity when pg_trgm is
+        installed, then name. offset skips that many matches, for reading further pages.
+        """
+        term = (term or '').strip().lower()
+        if not term:
+            return []
+        like = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        prefix = like[1:]
+        similarity = f"similarity({self._CLIENT_SEARCH_TEXT}, %(term)s)" if self.trigram_search else "0"
+        return self.execute_query(
+            f'''
+            SELECT *
+            FROM clients
+            WHERE {self._CLIENT_SEARCH_TEXT} LIKE %(like)s
+            ORDER BY (LOWER(COALESCE(name, '')) LIKE %(prefix)s OR COALESCE(phone, '') LIKE %(prefix)s) DESC,
+                     {similarity} DESC,
+                     name,
+                     id
+            LIMIT %(limit)s OFFSET %(offset)s
+            ''',
+            {'term': term, 'like': like, 'prefix': prefix, 'limit': int(limit), 'offset': int(offset)},
+        )
+
     def get_client_by_id(self, client_id: int) -> Optional[Dict]:
         query = 'SELECT * FROM clients WHERE id = ?'
         clients = self.execute_query(query, (client_id,))
@@ -592,13 +1516,15 @@ class DatabaseManager:
         return rows[0] if rows else None
 
     def add_supplier(self, name: str, phone: str = "", address: str = "", notes: str = "") -> int:
-        return self.execute_update(
+        supplier_id = self.execute_update(
             '''
             INSERT INTO suppliers (name, phone, address, notes)
             VALUES (?, ?, ?, ?)
             ''',
             (name.strip(), phone.strip(), address.strip(), notes.strip()),
         )
+        self._supplier_changed(supplier_id)
+        return supplier_id
 
     def update_supplier(self, supplier_id: int, name: str, phone: str = "", address: str = "", notes: str = "", is_active: bool = True) -> bool:
         updated = self.execute_update(
@@ -609,6 +1535,7 @@ class DatabaseManager:
             ''',
             (name.strip(), phone.strip(), address.strip(), notes.strip(), bool(is_active), supplier_id),
         )
+        self._supplier_changed(supplier_id)
         return updated > 0
 
     def deactivate_supplier(self, supplier_id: int) -> bool:
@@ -620,7 +1547,16 @@ class DatabaseManager:
             ''',
             (supplier_id,),
         )
+        self._supplier_changed(supplier_id)
         return updated > 0
+
+    def _supplier_changed(self, supplier_id: Optional[int] = None):
+        self.invalidate_directory('suppliers')
+        self.publish_change('SupplierChanged', supplier_id=supplier_id)
+
+    def _client_changed(self, client_id: Optional[int] = None):
+        self.invalidate_directory('clients')
+        self.publish_change('ClientChanged', client_id)
     
     def add_client(self, name: str, phone: str, address: str = "", company: str = "", initial_previous_balance: float = 0.0) -> int:
         query = '''
@@ -628,7 +1564,9 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?, COALESCE(?,0), 0, 0, COALESCE(?,0))
         '''
         val = float(initial_previous_balance or 0.0)
-        return self.execute_update(query, (name, phone, address, company, val, val))
+        client_id = self.execute_update(query, (name, phone, address, company, val, val))
+        self._client_changed(client_id)
+        return client_id
     
     def update_client(self, client_id: int, name: str, phone: str, address: str = "", company: str = "", initial_previous_balance: Optional[float] = None) -> bool:
         rows = self.execute_query('SELECT id FROM clients WHERE id = ?', (client_id,))
@@ -643,34 +1581,92 @@ class DatabaseManager:
         '''
         self.execute_update(query, (name, phone, address, company, initial_previous_balance, client_id))
         self.update_client_balance(client_id)
+        self._client_changed(client_id)
         return True
+
+    def delete_client(self, client_id: int) -> bool:
+        deleted = self.execute_update('DELETE FROM clients WHERE id = ?', (client_id,))
+        self._client_changed(client_id)
+        return deleted > 0
     
     def update_client_balance(self, client_id: int):
         query = '''
             UPDATE clients 
-            SET total_purchases = COALESCE((SELECT SUM(total_amount) FROM sales WHERE client_id = ?), 0),
-                total_paid = COALESCE((SELECT SUM(amount_paid) FROM sales WHERE client_id = ?), 0),
+            SET total_purchases = COALESCE((SELECT SUM(total_amount) FROM sales WHERE client_id = ?), 0)
+                                  + COALESCE((SELECT SUM(total_purchases) FROM client_period_openings WHERE client_id = ?), 0),
+                total_paid = COALESCE((SELECT SUM(amount_paid) FROM sales WHERE client_id = ?), 0)
+                             + COALESCE((SELECT SUM(total_paid) FROM client_period_openings WHERE client_id = ?), 0),
                 balance = COALESCE((SELECT SUM(balance) FROM sales WHERE client_id = ?), 0) + COALESCE(initial_previous_balance, 0),
                 updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         '''
-        self.execute_update(query, (client_id, client_id, client_id, client_id))
+        self.execute_update(query, (client_id, client_id, client_id, client_id, client_id, client_id))
     
+    @staticmethod
+    def _product_key(gas_type: Any, sub_type: Any, capacity: Any) -> tuple:
+        return (gas_type or '', sub_type or '', capacity or '')
+
+    def _product_catalog(self) -> Dict[str, Any]:
+        """The gas product catalog, loaded once and indexed by id and by (gas_type, sub_type, capacity)."""
+        with self._catalog_lock:
+            if self._catalog is not None:
+                return self._catalog
+            version = self._catalog_version
+        rows = self.execute_query('SELECT * FROM gas_products ORDER BY gas_type, sub_type, capacity, id')
+        by_id: Dict[int, Dict] = {}
+        by_key: Dict[tuple, List[Dict]] = {}
+        by_type_capacity: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            by_id[int(row['id'])] = row
+            by_key.setdefault(self._product_key(row['gas_type'], row.get('sub_type'), row['capacity']), []).append(row)
+            by_type_capacity.setdefault((row['gas_type'], row['capacity']), []).append(row)
+        for bucket in list(by_key.values()) + list(by_type_capacity.values()):
+            bucket.sort(key=lambda r: int(r['id']))
+        catalog = {
+            'version': version,
+            'products': rows,
+            'by_id': by_id,
+            'by_key': by_key,
+            'by_type_capacity': by_type_capacity,
+        }
+        with self._catalog_lock:
+            # A product write during the load bumped the version; keep serving this load but do not cache it.
+            if self._catalog_version == version:
+                self._catalog = catalog
+        return catalog
+
+    def invalidate_product_catalog(self):
+        with self._catalog_lock:
+            self._catalog_version += 1
+            self._catalog = None
+
+    def _find_product_id(self, gas_type: str, capacity: str, sub_type: Optional[str] = None,
+                         active_only: bool = True, any_sub_type: bool = True) -> Optional[int]:
+        """Lowest product id matching exactly, else (when any_sub_type) any sub type of gas_type/capacity."""
+        catalog = self._product_catalog()
+        candidates = [catalog['by_key'].get(self._product_key(gas_type, sub_type, capacity), [])]
+        if any_sub_type:
+            candidates.append(catalog['by_type_capacity'].get((gas_type, capacity), []))
+        for bucket in candidates:
+            for row in bucket:
+                if not active_only or row.get('is_active'):
+                    return int(row['id'])
+        return None
+
     def get_gas_products(self) -> List[Dict]:
-        query = 'SELECT * FROM gas_products WHERE is_active = 1 ORDER BY gas_type, sub_type, capacity'
-        return self.execute_query(query)
-    
+        return [dict(p) for p in self._product_catalog()['products'] if p.get('is_active')]
+
     def get_gas_product_by_id(self, product_id: int) -> Optional[Dict]:
-        query = 'SELECT * FROM gas_products WHERE id = ? AND is_active = 1'
-        products = self.execute_query(query, (product_id,))
-        return products[0] if products else None
-    
+        product = self._product_catalog()['by_id'].get(int(product_id))
+        return dict(product) if product and product.get('is_active') else None
+
     def add_gas_product(self, gas_type: str, sub_type: str, capacity: str, unit_price: float, description: str = "") -> int:
         query = '''
             INSERT INTO gas_products (gas_type, sub_type, capacity, unit_price, description)
             VALUES (?, ?, ?, ?, ?)
         '''
         product_id = self.execute_update(query, (gas_type, sub_type, capacity, unit_price, description))
+        self.invalidate_product_catalog()
         try:
             self.execute_update('''
                 INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
@@ -678,8 +1674,37 @@ class DatabaseManager:
             ''', (product_id,))
         except Exception:
             pass
+        self.publish_change('ProductChanged', gas_product_id=product_id)
         return product_id
-    
+
+    def update_gas_product(self, product_id: int, gas_type: str, sub_type: str, capacity: str,
+                           unit_price: float, description: str = "") -> bool:
+        query = '''
+            UPDATE gas_products
+            SET gas_type = ?, sub_type = ?, capacity = ?, unit_price = ?, description = ?
+            WHERE id = ?
+        '''
+        self.execute_update(query, (gas_type, sub_type, capacity, unit_price, description, product_id))
+        self.invalidate_product_catalog()
+        self.publish_change('ProductChanged', gas_product_id=product_id)
+        return True
+
+    def delete_gas_product(self, product_id: int) -> bool:
+        self.execute_update('DELETE FROM gas_products WHERE id = ?', (product_id,))
+        self.invalidate_product_catalog()
+        self.publish_change('ProductChanged', gas_product_id=product_id)
+        return True
+
+    def apply_remote_change(self, event: str):
+        """Drop in-process caches made stale by another terminal's write (listener thread)."""
+        self.bump_data_version()
+        if event == 'ProductChanged':
+            self.invalidate_product_catalog()
+        elif event == 'ClientChanged':
+            self.invalidate_directory('clients')
+        elif event == 'SupplierChanged':
+            self.invalidate_directory('suppliers')
+
     def create_sale(self, client_id: int, gas_product_id: int, quantity: int, unit_price: float,
                    subtotal: float, tax_amount: float, total_amount: float, amount_paid: float,
                    balance: float, created_by: int) -> int:
@@ -691,6 +1716,8 @@ class DatabaseManager:
         sale_id = self.execute_update(query, (client_id, gas_product_id, quantity, unit_price,
                                             subtotal, tax_amount, total_amount, amount_paid, balance, created_by))
         self.update_client_balance(client_id)
+        self._refresh_sale_week_rollup([sale_id])
+        self._refresh_sale_product_rollup([sale_id], [gas_product_id])
         return sale_id
 
     def create_sale_with_receipt(
@@ -708,113 +1735,210 @@ class DatabaseManager:
         if not items:
             raise ValueError("At least one sale item is required.")
 
-        header_item = items[0]
         with self.transaction() as conn:
             with conn.cursor(row_factory=dict_row) as cur:
+                result = self._write_sale(cur, client_id, items, total_subtotal, total_tax, total_amount,
+                                          amount_paid, balance, created_by, receipt_number)
+        return {
+            'sale_id': result['sale_id'],
+            'receipt_id': result['receipt_id'],
+            'receipt_number': receipt_number,
+        }
+
+    def commit_sale(
+        self,
+        client_id: int,
+        items: List[Dict[str, Any]],
+        total_subtotal: float,
+        total_tax: float,
+        total_amount: float,
+        amount_paid: float,
+        balance: float,
+        created_by: int,
+    ) -> Dict[str, Any]:
+        """Record a counter sale end to end in one transaction.
+
+        Allocates the receipt number, writes the sale, logs the activity and refreshes
+        the client's billing-week rollup and weekly invoice. Returns what the sales
+        screen needs to confirm the sale without further queries; weekly_invoice_error is
+        set when the sale was kept but its weekly invoice could not be refreshed.
+        """
+        if not items:
+            raise ValueError("At least one sale item is required.")
+
+        with self.transaction() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                receipt_number = self._next_receipt_number(cur)
+                result = self._write_sale(cur, client_id, items, total_subtotal, total_tax, total_amount,
+                                          amount_paid, balance, created_by, receipt_number)
                 cur.execute(
-                    '''
-                    INSERT INTO sales (client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount, amount_paid, balance, created_by)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    ''',
-                    (
-                        client_id,
-                        header_item['gas_product_id'],
-                        int(header_item['quantity']),
-                        float(header_item['unit_price']),
-                        float(total_subtotal),
-                        float(total_tax),
-                        float(total_amount),
-                        float(amount_paid),
-                        float(balance),
-                        created_by,
-                    ),
+                    """
+                    INSERT INTO activity_logs (user_id, activity_type, description)
+                    SELECT %s, 'CREATE_SALE', 'Created sale for client: ' || name || ', Receipt: ' || %s
+                    FROM clients WHERE id = %s
+                    """,
+                    (created_by, receipt_number, client_id),
                 )
-                sale_row = cur.fetchone()
-                sale_id = int(sale_row['id'])
-
-                for item in items:
+                week_start = result['week_start']
+                week_end = week_start + timedelta(days=6)
+                weekly_invoice_id = None
+                weekly_invoice_error = None
+                try:
+                    # Savepoint: a weekly invoice problem must not roll back the sale itself.
+                    with conn.transaction():
+                        weekly_invoice_id = self._upsert_weekly_invoice(cur, client_id, week_start, week_end, created_by)
+                except Exception as e:
+                    weekly_invoice_error = str(e)
                     cur.execute(
-                        '''
-                        INSERT INTO sale_items (sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price, subtotal, tax_amount, total_amount)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ''',
-                        (
-                            sale_id,
-                            item['gas_product_id'],
-                            item.get('supplier_id'),
-                            float(item.get('fill_unit_cost') or 0),
-                            float(item.get('fill_total') or 0),
-                            int(item['quantity']),
-                            float(item['unit_price']),
-                            float(item['subtotal']),
-                            float(item['tax_amount']),
-                            float(item['total_amount']),
-                        ),
+                        "INSERT INTO activity_logs (user_id, activity_type, description) VALUES (%s, %s, %s)",
+                        (created_by, 'WEEKLY_INVOICE_ERROR',
+                         f"Weekly invoice {week_start:%Y-%m-%d} for client {client_id} not refreshed after receipt "
+                         f"{receipt_number}: {weekly_invoice_error}"),
                     )
-                    qty = int(item['quantity'])
-                    gas_product_id = int(item['gas_product_id'])
-                    if qty > 0:
-                        cur.execute(
-                            '''
-                            INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
-                            VALUES (%s, 0, 0, 0, 0)
-                            ON CONFLICT (gas_product_id) DO NOTHING
-                            ''',
-                            (gas_product_id,),
-                        )
-                        cur.execute(
-                            '''
-                            UPDATE cylinder_inventory
-                            SET sold_count = sold_count + %s,
-                                available_count = available_count - %s,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE gas_product_id = %s
-                            ''',
-                            (qty, qty, gas_product_id),
-                        )
-                        cur.execute(
-                            '''
-                            INSERT INTO cylinder_stock_movements
-                                (gas_product_id, movement_type, quantity, reference_type, reference_id, client_id, created_by)
-                            VALUES (%s, 'SALE_OUT', %s, 'SALE', %s, %s, %s)
-                            ''',
-                            (gas_product_id, qty, sale_id, client_id, created_by),
-                        )
+        return {
+            'sale_id': result['sale_id'],
+            'receipt_id': result['receipt_id'],
+            'receipt_number': receipt_number,
+            'client_balance': result['client_balance'],
+            'week_start': week_start.strftime('%Y-%m-%d'),
+            'week_end': week_end.strftime('%Y-%m-%d'),
+            'weekly_invoice_id': weekly_invoice_id,
+            'weekly_invoice_error': weekly_invoice_error,
+        }
 
-                cur.execute(
-                    '''
-                    INSERT INTO receipts (receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    ''',
-                    (
-                        receipt_number,
-                        sale_id,
-                        client_id,
-                        float(total_amount),
-                        float(amount_paid),
-                        float(balance),
-                        created_by,
-                    ),
-                )
-                receipt_row = cur.fetchone()
+    def _write_sale(
+        self,
+        cur,
+        client_id: int,
+        items: List[Dict[str, Any]],
+        total_subtotal: float,
+        total_tax: float,
+        total_amount: float,
+        amount_paid: float,
+        balance: float,
+        created_by: int,
+        receipt_number: str,
+    ) -> Dict[str, Any]:
+        """Insert sale, items, stock movements and receipt on the caller's cursor."""
+        header_item = items[0]
+        cur.execute(
+            '''
+            INSERT INTO sales (client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount, amount_paid, balance, created_by)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, created_at::date AS day, billing_week_start(created_at::date) AS week_start
+            ''',
+            (
+                client_id,
+                header_item['gas_product_id'],
+                int(header_item['quantity']),
+                float(header_item['unit_price']),
+                float(total_subtotal),
+                float(total_tax),
+                float(total_amount),
+                float(amount_paid),
+                float(balance),
+                created_by,
+            ),
+        )
+        sale_row = cur.fetchone()
+        sale_id = int(sale_row['id'])
 
-                cur.execute(
-                    '''
-                    UPDATE clients
-                    SET total_purchases = COALESCE((SELECT SUM(total_amount) FROM sales WHERE client_id = %s), 0),
-                        total_paid = COALESCE((SELECT SUM(amount_paid) FROM sales WHERE client_id = %s), 0),
-                        balance = COALESCE((SELECT SUM(balance) FROM sales WHERE client_id = %s), 0) + COALESCE(initial_previous_balance, 0),
+        # The whole cart goes in with a fixed number of statements, however many lines it has.
+        product_ids = [int(item['gas_product_id']) for item in items]
+        quantities = [int(item['quantity']) for item in items]
+        cur.execute(
+            '''
+            INSERT INTO sale_items (sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price, subtotal, tax_amount, total_amount)
+            SELECT %s, t.*
+            FROM unnest(%s::bigint[], %s::bigint[], %s::numeric[], %s::numeric[], %s::int[],
+                        %s::numeric[], %s::numeric[], %s::numeric[], %s::numeric[])
+                 AS t(gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price, subtotal, tax_amount, total_amount)
+            ''',
+            (
+                sale_id,
+                product_ids,
+                [item.get('supplier_id') for item in items],
+                [float(item.get('fill_unit_cost') or 0) for item in items],
+                [float(item.get('fill_total') or 0) for item in items],
+                quantities,
+                [float(item['unit_price']) for item in items],
+                [float(item['subtotal']) for item in items],
+                [float(item['tax_amount']) for item in items],
+                [float(item['total_amount']) for item in items],
+            ),
+        )
+        if any(qty > 0 for qty in quantities):
+            # Counters and ledger in one statement, so they cannot be written apart.
+            # Counter rows are upserted one per product, ordered so concurrent sales lock them in the same order.
+            cur.execute(
+                '''
+                WITH lines AS (
+                    SELECT t.gas_product_id, t.quantity, t.line_no
+                    FROM unnest(%s::bigint[], %s::int[]) WITH ORDINALITY AS t(gas_product_id, quantity, line_no)
+                    WHERE t.quantity > 0
+                ),
+                counters AS (
+                    INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
+                    SELECT gas_product_id, 0, SUM(quantity), 0, -SUM(quantity)
+                    FROM lines
+                    GROUP BY gas_product_id
+                    ORDER BY gas_product_id
+                    ON CONFLICT (gas_product_id) DO UPDATE
+                    SET sold_count = cylinder_inventory.sold_count + EXCLUDED.sold_count,
+                        available_count = cylinder_inventory.available_count - EXCLUDED.sold_count,
                         updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    ''',
-                    (client_id, client_id, client_id, client_id),
                 )
+                INSERT INTO cylinder_stock_movements
+                    (gas_product_id, movement_type, quantity, reference_type, reference_id, client_id, created_by)
+                SELECT gas_product_id, 'SALE_OUT', quantity, 'SALE', %s, %s, %s::bigint
+                FROM lines
+                ORDER BY line_no
+                ''',
+                (product_ids, quantities, sale_id, client_id, created_by),
+            )
+
+        cur.execute(
+            '''
+            INSERT INTO receipts (receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+            ''',
+            (
+                receipt_number,
+                sale_id,
+                client_id,
+                float(total_amount),
+                float(amount_paid),
+                float(balance),
+                created_by,
+            ),
+        )
+        receipt_row = cur.fetchone()
+
+        cur.execute(
+            '''
+            UPDATE clients
+            SET total_purchases = COALESCE((SELECT SUM(total_amount) FROM sales WHERE client_id = %s), 0)
+                                  + COALESCE((SELECT SUM(total_purchases) FROM client_period_openings WHERE client_id = %s), 0),
+                total_paid = COALESCE((SELECT SUM(amount_paid) FROM sales WHERE client_id = %s), 0)
+                             + COALESCE((SELECT SUM(total_paid) FROM client_period_openings WHERE client_id = %s), 0),
+                balance = COALESCE((SELECT SUM(balance) FROM sales WHERE client_id = %s), 0) + COALESCE(initial_previous_balance, 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            RETURNING balance
+            ''',
+            (client_id, client_id, client_id, client_id, client_id, client_id),
+        )
+        client_row = cur.fetchone()
+        self._refresh_week_rollup(cur, [client_id], [sale_row['week_start']])
+        self._refresh_product_rollup(cur, [sale_row['day']], product_ids)
+        self._notify(cur, 'SaleCreated', client_id, sale_id=sale_id, receipt_number=receipt_number)
         return {
             'sale_id': sale_id,
             'receipt_id': int(receipt_row['id']),
             'receipt_number': receipt_number,
+            'week_start': sale_row['week_start'],
+            'client_balance': float(client_row['balance'] or 0) if client_row else 0.0,
         }
 
     def get_product_available_count(self, gas_product_id: int) -> int:
@@ -832,71 +1956,321 @@ class DatabaseManager:
         ''', (gas_product_id,))
         return 0
 
-    def _decrease_inventory_for_sale(self, gas_product_id: int, quantity: int, sale_id: Optional[int] = None,
-                                     client_id: Optional[int] = None, created_by: Optional[int] = None):
-        qty = int(quantity or 0)
-        if qty <= 0:
-            return
-        self.execute_update('''
-            INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
-            VALUES (?, 0, 0, 0, 0)
-            ON CONFLICT (gas_product_id) DO NOTHING
-        ''', (gas_product_id,))
-        self.execute_update('''
-            UPDATE cylinder_inventory
-            SET sold_count = sold_count + ?,
-                available_count = available_count - ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE gas_product_id = ?
-        ''', (qty, qty, gas_product_id))
-        self.execute_update('''
+    # cylinder_stock_movements is the stock ledger. Each movement row and its effect on the
+    # cylinder_inventory counters are written by one statement, so the two cannot diverge.
+    _STOCK_MOVEMENT_SQL = '''
+        WITH mv AS (
             INSERT INTO cylinder_stock_movements
                 (gas_product_id, movement_type, quantity, reference_type, reference_id, client_id, created_by)
-            VALUES (?, 'SALE_OUT', ?, 'SALE', ?, ?, ?)
-        ''', (gas_product_id, qty, sale_id, client_id, created_by))
+            VALUES (%(gas_product_id)s, %(movement_type)s, %(quantity)s, %(reference_type)s,
+                    %(reference_id)s, %(client_id)s, %(created_by)s)
+            RETURNING gas_product_id, movement_type, quantity
+        )
+        INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
+        SELECT gas_product_id,
+               CASE WHEN movement_type = 'OPENING' THEN quantity ELSE 0 END,
+               CASE WHEN movement_type = 'SALE_OUT' THEN quantity ELSE 0 END,
+               CASE WHEN movement_type = 'RETURN_IN' THEN quantity ELSE 0 END,
+               CASE WHEN movement_type = 'SALE_OUT' THEN -quantity ELSE quantity END
+        FROM mv
+        ON CONFLICT (gas_product_id) DO UPDATE
+        SET opening_count = cylinder_inventory.opening_count + EXCLUDED.opening_count,
+            sold_count = cylinder_inventory.sold_count + EXCLUDED.sold_count,
+            returned_count = cylinder_inventory.returned_count + EXCLUDED.returned_count,
+            available_count = cylinder_inventory.available_count + EXCLUDED.available_count,
+            updated_at = CURRENT_TIMESTAMP
+    '''
 
-    def _increase_inventory_for_return(self, gas_product_id: int, quantity: int, return_id: Optional[int] = None,
-                                       client_id: Optional[int] = None, created_by: Optional[int] = None):
+    # Current stock per product replayed from the ledger: the snapshot stored on cylinder_inventory
+    # plus the movements recorded after it.
+    _STOCK_REPLAY_SQL = '''
+        SELECT r.gas_product_id,
+               r.opening_count,
+               r.sold_count,
+               r.returned_count,
+               r.opening_count - r.sold_count + r.returned_count AS available_count
+        FROM (
+            SELECT ci.gas_product_id,
+                   ci.snapshot_opening + COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'OPENING'), 0) AS opening_count,
+                   ci.snapshot_sold + COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'SALE_OUT'), 0) AS sold_count,
+                   ci.snapshot_returned + COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'RETURN_IN'), 0) AS returned_count
+            FROM cylinder_inventory ci
+            LEFT JOIN cylinder_stock_movements m
+              ON m.gas_product_id = ci.gas_product_id
+             AND m.id > ci.snapshot_movement_id
+            WHERE %(gas_product_id)s::bigint IS NULL OR ci.gas_product_id = %(gas_product_id)s::bigint
+            GROUP BY ci.gas_product_id, ci.snapshot_opening, ci.snapshot_sold, ci.snapshot_returned
+        ) r
+    '''
+
+    def _record_stock_movement(self, cur, gas_product_id: int, movement_type: str, quantity: int,
+                               reference_type: Optional[str] = None, reference_id: Optional[int] = None,
+                               client_id: Optional[int] = None, created_by: Optional[int] = None):
         qty = int(quantity or 0)
         if qty <= 0:
             return
-        self.execute_update('''
-            INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
-            VALUES (?, 0, 0, 0, 0)
-            ON CONFLICT (gas_product_id) DO NOTHING
-        ''', (gas_product_id,))
-        self.execute_update('''
-            UPDATE cylinder_inventory
-            SET returned_count = returned_count + ?,
-                available_count = available_count + ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE gas_product_id = ?
-        ''', (qty, qty, gas_product_id))
-        self.execute_update('''
-            INSERT INTO cylinder_stock_movements
-                (gas_product_id, movement_type, quantity, reference_type, reference_id, client_id, created_by)
-            VALUES (?, 'RETURN_IN', ?, 'CYLINDER_RETURN', ?, ?, ?)
-        ''', (gas_product_id, qty, return_id, client_id, created_by))
+        cur.execute(self._STOCK_MOVEMENT_SQL, {
+            'gas_product_id': gas_product_id,
+            'movement_type': movement_type,
+            'quantity': qty,
+            'reference_type': reference_type,
+            'reference_id': reference_id,
+            'client_id': client_id,
+            'created_by': created_by,
+        })
+
+    def _decrease_inventory_for_sale(self, gas_product_id: int, quantity: int, sale_id: Optional[int] = None,
+                                     client_id: Optional[int] = None, created_by: Optional[int] = None):
+        with self.transaction() as conn:
+            with conn.cursor() as cur:
+                self._record_stock_movement(cur, gas_product_id, 'SALE_OUT', quantity, 'SALE', sale_id, client_id, created_by)
+
+    def _increase_inventory_for_return(self, gas_product_id: int, quantity: int, return_id: Optional[int] = None,
+                                       client_id: Optional[int] = None, created_by: Optional[int] = None):
+        with self.transaction() as conn:
+            with conn.cursor() as cur:
+                self._record_stock_movement(cur, gas_product_id, 'RETURN_IN', quantity, 'CYLINDER_RETURN',
+                                            return_id, client_id, created_by)
 
     def set_cylinder_opening_count(self, gas_product_id: int, opening_count: int, created_by: Optional[int] = None) -> bool:
         opening = max(0, int(opening_count or 0))
         if opening <= 0:
             return True
-        self.execute_update('''
-            INSERT INTO cylinder_inventory (gas_product_id, opening_count, sold_count, returned_count, available_count)
-            VALUES (?, ?, 0, 0, ?)
-            ON CONFLICT (gas_product_id) DO UPDATE
-            SET opening_count = cylinder_inventory.opening_count + EXCLUDED.opening_count,
-                available_count = cylinder_inventory.available_count + EXCLUDED.available_count,
-                updated_at = CURRENT_TIMESTAMP
-        ''', (gas_product_id, opening, opening))
-        self.execute_update('''
-            INSERT INTO cylinder_stock_movements
-                (gas_product_id, movement_type, quantity, reference_type, reference_id, client_id, created_by)
-            VALUES (?, 'OPENING', ?, 'OPENING_ADD', NULL, NULL, ?)
-        ''', (gas_product_id, opening, created_by))
+        with self.transaction() as conn:
+            with conn.cursor() as cur:
+                self._record_stock_movement(cur, gas_product_id, 'OPENING', opening, 'OPENING_ADD', None, None, created_by)
+        self.publish_change('StockChanged', gas_product_id=gas_product_id)
         return True
 
+    def snapshot_cylinder_inventory(self) -> Optional[int]:
+        """Fold the movements recorded since the last snapshot into each product's snapshot.
+
+        Reads movements up to the newest id visible in a REPEATABLE READ snapshot instead
+        of locking stock writes out. Movement ids are allocated before commit, so while
+        any write is in flight a lower id could still appear below that high-water mark;
+        the fold is then skipped. Returns the products updated, or None when skipped.
+        """
+        try:
+            return self._fold_cylinder_snapshot()
+        except psycopg.errors.SerializationFailure:
+            # A stock write updated an inventory row after the snapshot was taken.
+            return None
+
+    def _fold_cylinder_snapshot(self) -> Optional[int]:
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cur.execute("SELECT EXISTS (SELECT 1 FROM pg_snapshot_xip(pg_current_snapshot()))")
+                if cur.fetchone()[0]:
+                    return None
+                cur.execute('''
+                    WITH hw AS (
+                        SELECT COALESCE(MAX(id), 0) AS max_id FROM cylinder_stock_movements
+                    ),
+                    delta AS (
+                        SELECT ci.gas_product_id,
+                               COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'OPENING'), 0) AS opening,
+                               COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'SALE_OUT'), 0) AS sold,
+                               COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'RETURN_IN'), 0) AS returned
+                        FROM cylinder_inventory ci
+                        CROSS JOIN hw
+                        LEFT JOIN cylinder_stock_movements m
+                          ON m.gas_product_id = ci.gas_product_id
+                         AND m.id > ci.snapshot_movement_id
+                         AND m.id <= hw.max_id
+                        GROUP BY ci.gas_product_id
+                    )
+                    UPDATE cylinder_inventory ci
+                    SET snapshot_opening = ci.snapshot_opening + d.opening,
+                        snapshot_sold = ci.snapshot_sold + d.sold,
+                        snapshot_returned = ci.snapshot_returned + d.returned,
+                        snapshot_movement_id = hw.max_id,
+                        snapshot_at = CURRENT_TIMESTAMP
+                    FROM delta d, hw
+                    WHERE d.gas_product_id = ci.gas_product_id
+                ''')
+                return cur.rowcount
+
+    def replay_cylinder_stock(self, as_of: Optional[Any] = None, gas_product_id: Optional[int] = None) -> List[Dict]:
+        """Stock counts per product from the movement ledger, now or as of a timestamp."""
+        if as_of is not None:
+            # Historical replays start from the daily checkpoints instead of the current snapshot.
+            return [
+                {k: row[k] for k in ('gas_product_id', 'opening_count', 'sold_count', 'returned_count', 'available_count')}
+                for row in sorted(self.get_cylinder_availability_as_of(as_of), key=lambda r: r['gas_product_id'])
+                if gas_product_id is None or int(row['gas_product_id']) == int(gas_product_id)
+            ]
+        return self.execute_query(
+            f"SELECT * FROM ({self._STOCK_REPLAY_SQL}) s ORDER BY gas_product_id",
+            {'gas_product_id': gas_product_id},
+        )
+
+    def get_cylinder_inventory_drift(self) -> List[Dict]:
+        """Products whose cylinder_inventory counters disagree with the movement ledger."""
+        return self.execute_query(
+            f'''
+            SELECT gp.id AS gas_product_id,
+                   gp.gas_type,
+                   gp.sub_type,
+                   gp.capacity,
+                   ci.opening_count, l.opening_count AS ledger_opening_count,
+                   ci.sold_count, l.sold_count AS ledger_sold_count,
+                   ci.returned_count, l.returned_count AS ledger_returned_count,
+                   ci.available_count, l.available_count AS ledger_available_count
+            FROM cylinder_inventory ci
+            JOIN gas_products gp ON gp.id = ci.gas_product_id
+            JOIN ({self._STOCK_REPLAY_SQL}) l ON l.gas_product_id = ci.gas_product_id
+            WHERE (ci.opening_count, ci.sold_count, ci.returned_count, ci.available_count)
+                  IS DISTINCT FROM (l.opening_count, l.sold_count, l.returned_count, l.available_count)
+            ORDER BY gp.gas_type, gp.sub_type, gp.capacity
+            ''',
+            {'gas_product_id': None},
+        )
+
+    def reconcile_cylinder_inventory(self, created_by: Optional[int] = None) -> int:
+        """Reset drifted cylinder_inventory counters to the movement ledger; returns products fixed."""
+        with self.transaction() as conn:
+            with conn.cursor() as cur:
+                cur.execute("LOCK TABLE cylinder_stock_movements IN SHARE MODE")
+                cur.execute(
+                    f'''
+                    UPDATE cylinder_inventory ci
+                    SET opening_count = l.opening_count,
+                        sold_count = l.sold_count,
+                        returned_count = l.returned_count,
+                        available_count = l.available_count,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM ({self._STOCK_REPLAY_SQL}) l
+                    WHERE l.gas_product_id = ci.gas_product_id
+                      AND (ci.opening_count, ci.sold_count, ci.returned_count, ci.available_count)
+                          IS DISTINCT FROM (l.opening_count, l.sold_count, l.returned_count, l.available_count)
+                    ''',
+                    {'gas_product_id': None},
+                )
+                fixed = cur.rowcount
+                if fixed:
+                    cur.execute(
+                        '''
+                        INSERT INTO activity_logs (user_id, activity_type, description)
+                        VALUES (%s, 'RECONCILE_INVENTORY', %s)
+                        ''',
+                        (created_by, f"Cylinder inventory reset to stock ledger for {fixed} product(s)"),
+                    )
+                    self._notify(cur, 'StockChanged')
+        return fixed
+
+    def refresh_cylinder_stock_checkpoints(self) -> int:
+        """Write cumulative per-product stock totals for each closed day with movements.
+
+        The last checkpointed day is recomputed as well, since a movement stamped late on
+        that day may have committed after it was written. Refreshes are serialized by an
+        advisory lock, so terminals starting together do not insert the same rows.
+        """
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext('cylinder_stock_checkpoints'))")
+                cur.execute("SELECT MAX(checkpoint_date) FROM cylinder_stock_checkpoints")
+                start = cur.fetchone()[0]
+                if start is not None:
+                    cur.execute("DELETE FROM cylinder_stock_checkpoints WHERE checkpoint_date >= %s", (start,))
+                cur.execute(
+                    '''
+                    INSERT INTO cylinder_stock_checkpoints
+                        (gas_product_id, checkpoint_date, opening_count, sold_count, returned_count)
+                    SELECT d.gas_product_id,
+                           d.day,
+                           COALESCE(b.opening_count, 0) + SUM(d.opening) OVER w,
+                           COALESCE(b.sold_count, 0) + SUM(d.sold) OVER w,
+                           COALESCE(b.returned_count, 0) + SUM(d.returned) OVER w
+                    FROM (
+                        SELECT gas_product_id,
+                               created_at::date AS day,
+                               COALESCE(SUM(quantity) FILTER (WHERE movement_type = 'OPENING'), 0) AS opening,
+                               COALESCE(SUM(quantity) FILTER (WHERE movement_type = 'SALE_OUT'), 0) AS sold,
+                               COALESCE(SUM(quantity) FILTER (WHERE movement_type = 'RETURN_IN'), 0) AS returned
+                        FROM cylinder_stock_movements
+                        WHERE created_at < CURRENT_DATE
+                          AND (%(start)s::date IS NULL OR created_at >= %(start)s::date)
+                        GROUP BY gas_product_id, created_at::date
+                    ) d
+                    LEFT JOIN LATERAL (
+                        SELECT c.opening_count, c.sold_count, c.returned_count
+                        FROM cylinder_stock_checkpoints c
+                        WHERE c.gas_product_id = d.gas_product_id
+                          AND c.checkpoint_date < d.day
+                        ORDER BY c.checkpoint_date DESC
+                        LIMIT 1
+                    ) b ON TRUE
+                    WINDOW w AS (PARTITION BY d.gas_product_id ORDER BY d.day)
+                    ''',
+                    {'start': start},
+                )
+                return cur.rowcount
+
+    def get_cylinder_availability_as_of(self, ts: Any, search_term: str = "") -> List[Dict]:
+        """Cylinder availability per product as it stood at ts.
+
+        A date means the end of that day. Each product starts from its latest daily
+        checkpoint before ts and adds only the movements after it, read through
+        idx_stock_movements_product_type_time.
+        """
+        if isinstance(ts, datetime):
+            until = ts + timedelta(microseconds=1)
+        elif isinstance(ts, date):
+            until = datetime.combine(ts + timedelta(days=1), time.min)
+        else:
+            text = str(ts).strip()
+            if len(text) <= 10:
+                until = datetime.combine(date.fromisoformat(text) + timedelta(days=1), time.min)
+            else:
+                until = datetime.fromisoformat(text) + timedelta(microseconds=1)
+
+        params: Dict[str, Any] = {'until': until.isoformat(sep=' ')}
+        where = ""
+        if search_term:
+            params['like'] = f"%{search_term.strip().lower()}%"
+            where = '''
+                WHERE LOWER(COALESCE(gp.gas_type, '')) LIKE %(like)s
+                   OR LOWER(COALESCE(gp.sub_type, '')) LIKE %(like)s
+                   OR LOWER(COALESCE(gp.capacity, '')) LIKE %(like)s
+            '''
+        return self.execute_query(f'''
+            SELECT x.*,
+                   x.opening_count - x.sold_count + x.returned_count AS available_count
+            FROM (
+                SELECT gp.id AS gas_product_id,
+                       gp.gas_type,
+                       gp.sub_type,
+                       gp.capacity,
+                       gp.is_active,
+                       COALESCE(cp.opening_count, 0) + t.opening AS opening_count,
+                       COALESCE(cp.returned_count, 0) + t.returned AS returned_count,
+                       COALESCE(cp.sold_count, 0) + t.sold AS sold_count,
+                       cp.checkpoint_date
+                FROM gas_products gp
+                LEFT JOIN LATERAL (
+                    SELECT c.checkpoint_date, c.opening_count, c.sold_count, c.returned_count
+                    FROM cylinder_stock_checkpoints c
+                    WHERE c.gas_product_id = gp.id
+                      AND c.checkpoint_date < %(until)s::timestamptz::date
+                    ORDER BY c.checkpoint_date DESC
+                    LIMIT 1
+                ) cp ON TRUE
+                CROSS JOIN LATERAL (
+                    SELECT COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'OPENING'), 0) AS opening,
+                           COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'SALE_OUT'), 0) AS sold,
+                           COALESCE(SUM(m.quantity) FILTER (WHERE m.movement_type = 'RETURN_IN'), 0) AS returned
+                    FROM cylinder_stock_movements m
+                    WHERE m.gas_product_id = gp.id
+                      AND m.movement_type IN ('OPENING', 'SALE_OUT', 'RETURN_IN')
+                      AND m.created_at >= COALESCE(cp.checkpoint_date + 1, '-infinity'::date)
+                      AND m.created_at < %(until)s::timestamptz
+                ) t
+                {where}
+            ) x
+            ORDER BY x.gas_type, x.sub_type, x.capacity
+        ''', params)
+
     def get_cylinder_availability_rows(self, search_term: str = "") -> List[Dict]:
         params: tuple = ()
         where = ""
@@ -949,10 +2323,14 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
         item_id = self.execute_update(query, (sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price, subtotal, tax_amount, total_amount))
-        sale_rows = self.execute_query('SELECT client_id, created_by FROM sales WHERE id = ?', (sale_id,))
+        sale_rows = self.execute_query('SELECT client_id, created_by, gas_product_id FROM sales WHERE id = ?', (sale_id,))
         client_id = sale_rows[0]['client_id'] if sale_rows else None
         created_by = sale_rows[0].get('created_by') if sale_rows else None
         self._decrease_inventory_for_sale(gas_product_id, int(quantity), sale_id=sale_id, client_id=client_id, created_by=created_by)
+        self._refresh_sale_week_rollup([sale_id])
+        # Only this line's product and the header product (whose item-less line this may replace) change.
+        header_product_id = sale_rows[0]['gas_product_id'] if sale_rows else gas_product_id
+        self._refresh_sale_product_rollup([sale_id], [gas_product_id, header_product_id])
         return item_id
 
     def update_sale_payment(self, sale_id: int, amount_paid: float) -> bool:
@@ -961,6 +2339,7 @@ class DatabaseManager:
         client_rows = self.execute_query('SELECT client_id FROM sales WHERE id = ?', (sale_id,))
         if client_rows:
             self.update_client_balance(client_rows[0]['client_id'])
+        self._refresh_sale_week_rollup([sale_id])
         return updated > 0
     
     def create_receipt(self, receipt_number: str, sale_id: int, client_id: int, total_amount: float,
@@ -983,6 +2362,25 @@ class DatabaseManager:
         fallback = datetime.now().strftime("%Y%m%d%H%M%S")
         return f"RCP-{year}-{fallback[-6:]}"
 
+    def _next_receipt_number(self, cur) -> str:
+        """Draw the next free receipt number inside the caller's transaction."""
+        for _ in range(50):
+            cur.execute(
+                """
+                SELECT c.receipt_number,
+                       NOT EXISTS (SELECT 1 FROM receipts r WHERE r.receipt_number = c.receipt_number) AS is_free
+                FROM (
+                    SELECT 'RCP-' || to_char(CURRENT_DATE, 'YYYY') || '-' || lpad(n::text, GREATEST(6, length(n::text)), '0') AS receipt_number
+                    FROM (SELECT nextval('receipt_number_seq') AS n) seq
+                ) c
+                """
+            )
+            row = cur.fetchone()
+            if row['is_free']:
+                return row['receipt_number']
+        fallback = datetime.now().strftime("%Y%m%d%H%M%S")
+        return f"RCP-{datetime.now().year}-{fallback[-6:]}"
+
     def get_next_weekly_invoice_number(self) -> str:
         year = datetime.now().year
         for _ in range(50):
@@ -1008,13 +2406,13 @@ class DatabaseManager:
         return f"WRCP-{year}-{fallback[-6:]}"
 
     def get_sale_items(self, sale_id: int) -> List[Dict]:
-        items = self.execute_query('''
+        items = self.execute_query(f'''
             SELECT si.created_at, si.quantity, si.unit_price, si.total_amount, si.subtotal, si.tax_amount,
                    COALESCE(si.fill_unit_cost, 0) AS fill_unit_cost,
                    COALESCE(si.fill_total, 0) AS fill_total,
                    gp.gas_type, gp.sub_type, gp.capacity,
                    COALESCE(sp.name, 'Company Stock') AS supplier_name
-            FROM sale_items si
+            FROM ({self._ALL_SALE_ITEMS_SQL}) si
             JOIN gas_products gp ON si.gas_product_id = gp.id
             LEFT JOIN suppliers sp ON si.supplier_id = sp.id
             WHERE si.sale_id = ?
@@ -1023,19 +2421,19 @@ class DatabaseManager:
         if items:
             return items
         # Fallback to single-line sale if no sale_items exist
-        return self.execute_query('''
+        return self.execute_query(f'''
             SELECT s.created_at, s.quantity, s.unit_price, s.total_amount, s.subtotal, s.tax_amount,
                    0 AS fill_unit_cost,
                    0 AS fill_total,
                    gp.gas_type, gp.sub_type, gp.capacity,
                    'Company Stock' AS supplier_name
-            FROM sales s
+            FROM ({self._ALL_SALES_SQL}) s
             JOIN gas_products gp ON s.gas_product_id = gp.id
             WHERE s.id = ?
         ''', (sale_id,))
 
     def get_sale_item_summaries(self, sale_id: int) -> Dict:
-        row = self.execute_query('''
+        row = self.execute_query(f'''
             SELECT 
                 (
                     SELECT string_agg(
@@ -1044,35 +2442,48 @@ class DatabaseManager:
                         ' ' || COALESCE(gp.capacity,'')
                         , ', ' ORDER BY si2.id
                     )
-                    FROM sale_items si2
+                    FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                     JOIN gas_products gp ON si2.gas_product_id = gp.id
                     WHERE si2.sale_id = s.id
                 ) AS product_summary,
                 (
                     SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                    FROM sale_items si2
+                    FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                     WHERE si2.sale_id = s.id
                 ) AS quantities_summary,
                 (
                     SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                    FROM sale_items si2
+                    FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                     LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                     WHERE si2.sale_id = s.id
                 ) AS source_summary
-            FROM sales s
+            FROM ({self._ALL_SALES_SQL}) s
             WHERE s.id = ?
         ''', (sale_id,))
         return row[0] if row else {'product_summary': '', 'quantities_summary': '', 'source_summary': ''}
 
-    def get_receipts_with_summaries(self, limit: int = 100, search: Optional[str] = None) -> List[Dict]:
-        params: tuple = ()
-        where = ''
+    def get_receipts_with_summaries(self, limit: int = 100, search: Optional[str] = None,
+                                    after: Optional[Dict] = None) -> List[Dict]:
+        """Newest receipts first; pass the last row of a page as after to read the next page.
+
+        Archived receipts are included. Pages follow idx_receipts_created_id and its archive
+        twin on (created_at, id) rather than OFFSET, so a deep page costs the same as the
+        first. page_key is created_at at full precision, which the normalized created_at
+        string is not.
+        """
+        conditions = []
+        params: list = []
         if search:
-            where = 'WHERE LOWER(r.receipt_number) LIKE ? OR LOWER(c.name) LIKE ?'
+            conditions.append('(LOWER(r.receipt_number) LIKE ? OR LOWER(c.name) LIKE ?)')
             like = f"%{search.lower()}%"
-            params = (like, like)
+            params.extend([like, like])
+        if after:
+            conditions.append('(r.created_at, r.id) < (?::timestamptz, ?)')
+            params.extend([after['page_key'], int(after['id'])])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         query = f'''
-            SELECT r.*, c.name as client_name, c.phone as client_phone, c.company as client_company,
+            SELECT r.*, r.created_at::text AS page_key,
+                   c.name as client_name, c.phone as client_phone, c.company as client_company,
                    s.quantity, s.unit_price, s.subtotal, s.tax_amount, s.total_amount,
                    (
                        SELECT string_agg(
@@ -1081,32 +2492,32 @@ class DatabaseManager:
                            ' ' || COALESCE(gp.capacity,'')
                            , ', ' ORDER BY si2.id
                        )
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        JOIN gas_products gp ON si2.gas_product_id = gp.id
                        WHERE si2.sale_id = r.sale_id
                    ) AS product_summary,
                    (
                        SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        WHERE si2.sale_id = r.sale_id
                    ) AS quantities_summary,
                    (
                        SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                        WHERE si2.sale_id = r.sale_id
                    ) AS source_summary
-            FROM receipts r
+            FROM ({self._ALL_RECEIPTS_SQL}) r
             JOIN clients c ON r.client_id = c.id
-            JOIN sales s ON r.sale_id = s.id
+            JOIN ({self._ALL_SALES_SQL}) s ON r.sale_id = s.id
             {where}
-            ORDER BY r.created_at DESC
+            ORDER BY r.created_at DESC, r.id DESC
             LIMIT {int(limit)}
         '''
-        return self.execute_query(query, params)
+        return self.execute_query(query, tuple(params))
 
     def get_receipt_with_summaries_by_number(self, receipt_number: str) -> Optional[Dict]:
-        query = '''
+        query = f'''
             SELECT r.*, c.name as client_name, c.phone as client_phone, c.company as client_company,
                    s.quantity, s.unit_price, s.subtotal, s.tax_amount, s.total_amount,
                    (
@@ -1116,136 +2527,498 @@ class DatabaseManager:
                            ' ' || COALESCE(gp.capacity,'')
                            , ', ' ORDER BY si2.id
                        )
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        JOIN gas_products gp ON si2.gas_product_id = gp.id
                        WHERE si2.sale_id = r.sale_id
                    ) AS product_summary,
                    (
                        SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        WHERE si2.sale_id = r.sale_id
                    ) AS quantities_summary,
                    (
                        SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                        WHERE si2.sale_id = r.sale_id
                    ) AS source_summary
-            FROM receipts r
+            FROM ({self._ALL_RECEIPTS_SQL}) r
             JOIN clients c ON r.client_id = c.id
-            JOIN sales s ON r.sale_id = s.id
+            JOIN ({self._ALL_SALES_SQL}) s ON r.sale_id = s.id
             WHERE r.receipt_number = ?
             LIMIT 1
         '''
-        rows = self.execute_query(query, (receipt_number,))
-        return rows[0] if rows else None
+        rows = self.execute_query(query, (receipt_number,))
+        return rows[0] if rows else None
+
+    # Summary of one client week. Full Saturday-Friday weeks are read from client_week_rollup and
+    # previous balances are prefix sums over its buckets; any other range falls back to raw rows.
+    _WEEKLY_SUMMARY_CTES = '''
+        existing AS (
+            SELECT invoice_number, receipt_number
+            FROM weekly_invoices
+            WHERE client_id = %(client_id)s AND week_start = %(week_start)s::date AND week_end = %(week_end)s::date
+        ),
+        items AS (
+            SELECT COALESCE(SUM(x.total_cylinders), 0) AS total_cylinders,
+                   COALESCE(SUM(x.gross_total), 0) AS gross_total,
+                   COALESCE(SUM(x.subtotal), 0) AS subtotal,
+                   COALESCE(SUM(x.tax_amount), 0) AS tax_amount,
+                   COALESCE(SUM(x.items_total), 0) AS items_total
+            FROM (
+                SELECT r.items_cylinders AS total_cylinders, r.items_gross AS gross_total, r.items_subtotal AS subtotal,
+                       r.items_tax AS tax_amount, r.items_total AS items_total
+                FROM client_week_rollup r
+                WHERE %(use_rollup)s AND r.client_id = %(client_id)s AND r.week_start = %(week_start)s::date
+                UNION ALL
+                SELECT si.quantity, si.quantity * si.unit_price, si.subtotal, si.tax_amount, si.total_amount
+                FROM sale_items si
+                JOIN sales s ON si.sale_id = s.id
+                WHERE NOT %(use_rollup)s
+                  AND s.client_id = %(client_id)s
+                  AND s.created_at >= (%(week_start)s::date)
+                  AND s.created_at < (%(week_end)s::date + INTERVAL '1 day')
+            ) x
+        ),
+        sal AS (
+            SELECT COALESCE(SUM(x.total_cylinders), 0) AS total_cylinders,
+                   COALESCE(SUM(x.gross_total), 0) AS gross_total,
+                   COALESCE(SUM(x.subtotal), 0) AS subtotal,
+                   COALESCE(SUM(x.tax_amount), 0) AS tax_amount,
+                   COALESCE(SUM(x.week_sales_total), 0) AS week_sales_total,
+                   COALESCE(SUM(x.week_outstanding), 0) AS week_outstanding
+            FROM (
+                SELECT r.sales_cylinders AS total_cylinders, r.sales_gross AS gross_total, r.sales_subtotal AS subtotal,
+                       r.sales_tax AS tax_amount, r.sales_total AS week_sales_total, r.outstanding AS week_outstanding
+                FROM client_week_rollup r
+                WHERE %(use_rollup)s AND r.client_id = %(client_id)s AND r.week_start = %(week_start)s::date
+                UNION ALL
+                SELECT s.quantity, s.quantity * s.unit_price, s.subtotal, s.tax_amount, s.total_amount, s.balance
+                FROM sales s
+                WHERE NOT %(use_rollup)s
+                  AND s.client_id = %(client_id)s
+                  AND s.created_at >= (%(week_start)s::date)
+                  AND s.created_at < (%(week_end)s::date + INTERVAL '1 day')
+            ) x
+        ),
+        prev AS (
+            SELECT COALESCE((SELECT initial_previous_balance FROM clients WHERE id = %(client_id)s), 0)
+                 + CASE WHEN %(rollup_prev)s
+                        THEN COALESCE((SELECT SUM(outstanding) FROM client_week_rollup
+                                       WHERE client_id = %(client_id)s AND week_start < %(week_start)s::date), 0)
+                        ELSE COALESCE((SELECT SUM(balance) FROM sales
+                                       WHERE client_id = %(client_id)s AND created_at < (%(week_start)s::date)), 0)
+                   END AS previous_balance
+        ),
+        paid AS (
+            SELECT COALESCE(SUM(wp.amount), 0) AS amount_paid
+            FROM weekly_payments wp
+            JOIN weekly_invoices wi ON wi.id = wp.weekly_invoice_id
+            WHERE wi.client_id = %(client_id)s AND wi.week_start = %(week_start)s::date AND wi.week_end = %(week_end)s::date
+        ),
+        summary AS (
+            SELECT CASE WHEN f.use_items THEN i.total_cylinders ELSE s.total_cylinders END AS total_cylinders,
+                   ROUND(CASE WHEN f.use_items THEN i.subtotal ELSE s.subtotal END, 2) AS subtotal,
+                   ROUND(GREATEST(0, CASE WHEN f.use_items THEN i.gross_total + i.tax_amount
+                                          ELSE s.gross_total + s.tax_amount END - s.week_sales_total), 2) AS discount,
+                   ROUND(CASE WHEN f.use_items THEN i.tax_amount ELSE s.tax_amount END, 2) AS tax_amount,
+                   ROUND(s.week_outstanding, 2) AS total_payable,
+                   ROUND(p.previous_balance, 2) AS previous_balance,
+                   ROUND(p.previous_balance + s.week_outstanding, 2) AS final_payable,
+                   ROUND(pd.amount_paid, 2) AS amount_paid
+            FROM items i
+            CROSS JOIN sal s
+            CROSS JOIN prev p
+            CROSS JOIN paid pd
+            CROSS JOIN LATERAL (
+                SELECT (i.total_cylinders <> 0 OR i.subtotal <> 0 OR i.items_total <> 0) AS use_items
+            ) f
+        )
+    '''
+
+    @staticmethod
+    def _weekly_summary_params(client_id: int, week_start, week_end) -> Dict[str, Any]:
+        ws = date.fromisoformat(str(week_start)[:10])
+        we = date.fromisoformat(str(week_end)[:10])
+        # Rollup buckets start on Saturday (billing week), so prefix sums are exact only from a Saturday.
+        rollup_prev = ws.weekday() == 5
+        return {
+            'client_id': client_id,
+            'week_start': ws.isoformat(),
+            'week_end': we.isoformat(),
+            'use_rollup': rollup_prev and (we - ws).days == 6,
+            'rollup_prev': rollup_prev,
+        }
+
+    def _rollup_watermark(self, cur) -> str:
+        """What the startup rollup checks last saw: data_change_seq and the newest sale and item ids."""
+        cur.execute(f'''
+            SELECT concat_ws(':', ({_CHANGE_SEQ_SQL}), (SELECT MAX(id) FROM sales),
+                             (SELECT MAX(id) FROM sales_archive), (SELECT MAX(id) FROM sale_items))
+        ''')
+        return cur.fetchone()[0]
+
+    def _rollup_verified(self, cur, rollup: str, watermark: str) -> bool:
+        """Whether rollup last matched the sales history at this watermark."""
+        cur.execute(
+            "SELECT 1 FROM report_snapshots WHERE name = 'rollup_verified' AND params_key = %s AND rows = to_jsonb(%s::text)",
+            (rollup, watermark),
+        )
+        return cur.fetchone() is not None
+
+    def _mark_rollup_verified(self, cur, rollup: str, watermark: str):
+        cur.execute(
+            f'''
+            INSERT INTO report_snapshots (name, params_key, change_seq, rows)
+            VALUES ('rollup_verified', %s, ({_CHANGE_SEQ_SQL}), to_jsonb(%s::text))
+            ON CONFLICT (name, params_key) DO UPDATE
+            SET change_seq = EXCLUDED.change_seq, rows = EXCLUDED.rows, computed_at = CURRENT_TIMESTAMP
+            ''',
+            (rollup, watermark),
+        )
+
+    def _refresh_week_rollup(self, cur, client_ids: Optional[List[int]] = None, week_starts: Optional[List[Any]] = None):
+        """Recompute client_week_rollup buckets from sales/sale_items.
+
+        Scoped to client_ids and/or week_starts (billing-week Saturdays) when given;
+        with neither, the whole rollup is rebuilt.
+        """
+        rollup_filters: List[str] = []
+        source_filters: List[str] = []
+        params: Dict[str, Any] = {}
+        if client_ids is not None:
+            params['client_ids'] = [int(c) for c in client_ids]
+            rollup_filters.append("client_id = ANY(%(client_ids)s::bigint[])")
+            source_filters.append("s.client_id = ANY(%(client_ids)s::bigint[])")
+        if week_starts is not None:
+            weeks = sorted({date.fromisoformat(str(w)[:10]) for w in week_starts})
+            if not weeks:
+                return
+            params['weeks'] = [w.isoformat() for w in weeks]
+            params['lo'] = weeks[0].isoformat()
+            params['hi'] = weeks[-1].isoformat()
+            rollup_filters.append("week_start = ANY(%(weeks)s::date[])")
+            source_filters.extend([
+                "s.created_at >= (%(lo)s::date)",
+                "s.created_at < (%(hi)s::date + 7)",
+                "billing_week_start(s.created_at::date) = ANY(%(weeks)s::date[])",
+            ])
+        where_rollup = ("WHERE " + " AND ".join(rollup_filters)) if rollup_filters else ""
+        where_source = ("WHERE " + " AND ".join(source_filters)) if source_filters else ""
+
+        cur.execute(f"DELETE FROM client_week_rollup {where_rollup}", params)
+        cur.execute(
+            f'''
+            INSERT INTO client_week_rollup (
+                client_id, week_start, sale_count,
+                items_cylinders, items_gross, items_subtotal, items_tax, items_total,
+                sales_cylinders, sales_gross, sales_subtotal, sales_tax, sales_total,
+                outstanding, amount_paid, updated_at
+            )
+            SELECT s.client_id,
+                   billing_week_start(s.created_at::date) AS week_start,
+                   COUNT(*),
+                   COALESCE(SUM(it.quantity), 0),
+                   COALESCE(SUM(it.gross), 0),
+                   COALESCE(SUM(it.subtotal), 0),
+                   COALESCE(SUM(it.tax_amount), 0),
+                   COALESCE(SUM(it.total_amount), 0),
+                   COALESCE(SUM(s.quantity), 0),
+                   COALESCE(SUM(s.quantity * s.unit_price), 0),
+                   COALESCE(SUM(s.subtotal), 0),
+                   COALESCE(SUM(s.tax_amount), 0),
+                   COALESCE(SUM(s.total_amount), 0),
+                   COALESCE(SUM(s.balance), 0),
+                   COALESCE(SUM(s.amount_paid), 0),
+                   CURRENT_TIMESTAMP
+            FROM sales s
+            LEFT JOIN LATERAL (
+                SELECT SUM(si.quantity) AS quantity,
+                       SUM(si.quantity * si.unit_price) AS gross,
+                       SUM(si.subtotal) AS subtotal,
+                       SUM(si.tax_amount) AS tax_amount,
+                       SUM(si.total_amount) AS total_amount
+                FROM sale_items si
+                WHERE si.sale_id = s.id
+            ) it ON TRUE
+            {where_source}
+            GROUP BY s.client_id, billing_week_start(s.created_at::date)
+            ''',
+            params,
+        )
+
+    def _refresh_sale_week_rollup(self, sale_ids: List[int]):
+        """Refresh the rollup buckets touched by the given sales."""
+        if not sale_ids:
+            return
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    '''
+                    SELECT DISTINCT client_id, billing_week_start(created_at::date) AS week_start
+                    FROM sales
+                    WHERE id = ANY(%s::bigint[])
+                    ''',
+                    ([int(s) for s in sale_ids],),
+                )
+                buckets: Dict[int, List[Any]] = {}
+                for row in cur.fetchall():
+                    buckets.setdefault(int(row['client_id']), []).append(row['week_start'])
+                for client_id, weeks in buckets.items():
+                    self._refresh_week_rollup(cur, [client_id], weeks)
+
+    def _product_lines_sql(self, where_sales: str) -> str:
+        """One row per product line sold, live and archived; sales without items count as their header product."""
+        parts = []
+        for sales, items in (('sales', 'sale_items'), ('sales_archive', 'sale_items_archive')):
+            parts.append(f'''
+                SELECT s.created_at::date AS day, si.gas_product_id, s.id AS sale_id,
+                       si.quantity, si.subtotal, si.tax_amount, si.total_amount
+                FROM {sales} s
+                JOIN {items} si ON si.sale_id = s.id
+                {where_sales}
+            ''')
+            parts.append(f'''
+                SELECT s.created_at::date, s.gas_product_id, s.id, s.quantity, s.subtotal, s.tax_amount, s.total_amount
+                FROM {sales} s
+                {where_sales} {'AND' if where_sales else 'WHERE'} NOT EXISTS (SELECT 1 FROM {items} si WHERE si.sale_id = s.id)
+            ''')
+        return " UNION ALL ".join(parts)
+
+    def _refresh_product_rollup(self, cur, days: Optional[List[Any]] = None,
+                                product_ids: Optional[List[int]] = None):
+        """Recompute product_daily_rollup for the given days, or rebuild it when days is None.
+
+        product_ids narrows a day refresh to those products' buckets; include the header
+        product of any sale whose items changed, since an item-less sale counts as its
+        header product. Day refreshes lock their days (in date order, so two refreshes
+        cannot deadlock) and only wait for a refresh of the same day; a full rebuild locks
+        out every day refresh.
+        """
+        params: Dict[str, Any] = {}
+        where_rollup = where_sales = where_lines = ""
+        if days is None:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('product_daily_rollup'))")
+        else:
+            days = sorted({date.fromisoformat(str(d)[:10]) for d in days})
+            if not days:
+                return
+            params = {'days': [d.isoformat() for d in days], 'lo': days[0].isoformat(), 'hi': days[-1].isoformat()}
+            where_rollup = "WHERE day = ANY(%(days)s::date[])"
+            where_sales = '''
+                WHERE s.created_at >= (%(lo)s::date) AND s.created_at < (%(hi)s::date + 1)
+                  AND s.created_at::date = ANY(%(days)s::date[])
+            '''
+            if product_ids is not None:
+                params['products'] = sorted({int(p) for p in product_ids})
+                where_rollup += " AND gas_product_id = ANY(%(products)s::bigint[])"
+                where_lines = "WHERE gas_product_id = ANY(%(products)s::bigint[])"
+            cur.execute("SELECT pg_advisory_xact_lock_shared(hashtext('product_daily_rollup'))")
+            cur.execute(
+                '''
+                SELECT pg_advisory_xact_lock(hashtext('product_daily_rollup:' || d))
+                FROM (SELECT d FROM unnest(%(days)s::date[]) AS d ORDER BY d) days
+                ''',
+                params,
+            )
+        cur.execute(f"DELETE FROM product_daily_rollup {where_rollup}", params)
+        cur.execute(
+            f'''
+            INSERT INTO product_daily_rollup (
+                day, gas_product_id, sale_count, line_count, quantity, subtotal, tax_amount, total_amount, updated_at
+            )
+            SELECT day, gas_product_id, COUNT(DISTINCT sale_id), COUNT(*),
+                   COALESCE(SUM(quantity), 0), COALESCE(SUM(subtotal), 0),
+                   COALESCE(SUM(tax_amount), 0), COALESCE(SUM(total_amount), 0), CURRENT_TIMESTAMP
+            FROM ({self._product_lines_sql(where_sales)}) lines
+            {where_lines}
+            GROUP BY day, gas_product_id
+            ''',
+            params,
+        )
+
+    def _refresh_sale_product_rollup(self, sale_ids: List[int], product_ids: Optional[List[int]] = None):
+        """Refresh the product rollup days touched by the given sales, or only product_ids' buckets on them."""
+        if not sale_ids:
+            return
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT DISTINCT created_at::date FROM sales WHERE id = ANY(%s::bigint[])",
+                    ([int(s) for s in sale_ids],),
+                )
+                days = [row[0] for row in cur.fetchall()]
+                if days:
+                    self._refresh_product_rollup(cur, days, product_ids)
+
+    def refresh_product_rollup(self):
+        """Rebuild product_daily_rollup from the whole sales history."""
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                self._refresh_product_rollup(cur)
+
+    def product_mix_query(self, start_date: date, end_date: date) -> Tuple[str, tuple]:
+        """Sales per product (gas type, sub type, capacity) in the period, from product_daily_rollup.
+
+        Multi-line sales count toward every product they contain; transaction_count is the
+        number of sales that included the product, so it does not add up across products
+        (line_count does). Archived sales are included.
+        """
+        query = '''
+            SELECT gp.gas_type, gp.sub_type, gp.capacity,
+                   SUM(r.sale_count) AS transaction_count,
+                   SUM(r.line_count) AS line_count,
+                   SUM(r.quantity) AS total_quantity,
+                   SUM(r.subtotal) AS subtotal,
+                   SUM(r.total_amount) AS total_amount,
+                   SUM(r.tax_amount) AS total_tax
+            FROM product_daily_rollup r
+            JOIN gas_products gp ON r.gas_product_id = gp.id
+            WHERE r.day >= (?::date) AND r.day <= (?::date)
+            GROUP BY gp.gas_type, gp.sub_type, gp.capacity
+            ORDER BY gp.gas_type, gp.sub_type, gp.capacity
+        '''
+        return query, (start_date, end_date)
+
+    def get_product_mix(self, start_date: date, end_date: date) -> List[Dict]:
+        return self.execute_query(*self.product_mix_query(start_date, end_date))
+
+    def refresh_client_week_rollup(self, client_id: Optional[int] = None):
+        """Rebuild the weekly rollup for one client, or for everyone when client_id is None."""
+        with self.transaction(tracked=False) as conn:
+            with conn.cursor() as cur:
+                self._refresh_week_rollup(cur, [client_id] if client_id is not None else None)
 
     def compute_weekly_summary_for_client(self, client_id: int, week_start: str, week_end: str) -> Dict[str, Any]:
-        params = (client_id, week_start, week_end)
-        items_rows = self.execute_query('''
-            SELECT 
-                COALESCE(SUM(si.quantity),0) AS total_cylinders,
-                COALESCE(SUM(si.quantity * si.unit_price),0) AS gross_total,
-                COALESCE(SUM(si.subtotal),0) AS subtotal,
-                COALESCE(SUM(si.tax_amount),0) AS tax_amount,
-                COALESCE(SUM(si.total_amount),0) AS items_total
-            FROM sale_items si
-            JOIN sales s ON si.sale_id = s.id
-            WHERE s.client_id = ?
-              AND s.created_at >= (?::date)
-              AND s.created_at < (?::date + INTERVAL '1 day')
-        ''', params)
-        sales_rows = self.execute_query('''
-            SELECT 
-                COALESCE(SUM(s.quantity),0) AS total_cylinders,
-                COALESCE(SUM(s.quantity * s.unit_price),0) AS gross_total,
-                COALESCE(SUM(s.subtotal),0) AS subtotal,
-                COALESCE(SUM(s.tax_amount),0) AS tax_amount,
-                COALESCE(SUM(s.total_amount),0) AS week_sales_total,
-                COALESCE(SUM(s.balance),0) AS week_outstanding
-            FROM sales s
-            WHERE s.client_id = ?
-              AND s.created_at >= (?::date)
-              AND s.created_at < (?::date + INTERVAL '1 day')
-        ''', params)
-        items_has_data = bool(items_rows and (items_rows[0]['total_cylinders'] or items_rows[0]['subtotal'] or items_rows[0]['items_total']))
-        total_cylinders = int(items_rows[0]['total_cylinders']) if items_has_data else (int(sales_rows[0]['total_cylinders']) if sales_rows else 0)
-        gross_total = float(items_rows[0]['gross_total']) if items_has_data else (float(sales_rows[0]['gross_total']) if sales_rows else 0.0)
-        subtotal = float(items_rows[0]['subtotal']) if items_has_data else (float(sales_rows[0]['subtotal']) if sales_rows else 0.0)
-        tax_amount = float(items_rows[0]['tax_amount']) if items_has_data else (float(sales_rows[0]['tax_amount']) if sales_rows else 0.0)
-        week_sales_total = float(sales_rows[0]['week_sales_total']) if sales_rows else (float(items_rows[0]['items_total']) if items_has_data else 0.0)
-        # Weekly payable should represent unpaid amount only, not gross sale amount.
-        total_payable = float(sales_rows[0]['week_outstanding']) if sales_rows else 0.0
-        discount = max(0.0, gross_total + tax_amount - week_sales_total)
-        prev_rows = self.execute_query('''
-            SELECT COALESCE(SUM(balance),0) AS prev_balance
-            FROM sales
-            WHERE client_id = ? AND created_at < (?::date)
-        ''', (client_id, week_start))
-        init_rows = self.execute_query('SELECT COALESCE(initial_previous_balance,0) AS init_prev FROM clients WHERE id = ?', (client_id,))
-        init_prev = float(init_rows[0]['init_prev']) if init_rows else 0.0
-        previous_balance = init_prev + (float(prev_rows[0]['prev_balance']) if prev_rows else 0.0)
-        final_payable = previous_balance + total_payable
-        pay_rows = self.execute_query('''
-            SELECT COALESCE(SUM(amount),0) AS paid
-            FROM weekly_payments
-            WHERE client_id = ? AND weekly_invoice_id IN (
-                SELECT id FROM weekly_invoices WHERE client_id = ? AND week_start = ? AND week_end = ?
-            )
-        ''', (client_id, client_id, week_start, week_end))
-        amount_paid = float(pay_rows[0]['paid']) if pay_rows else 0.0
+        rows = self.execute_query(
+            f"WITH {self._WEEKLY_SUMMARY_CTES} SELECT * FROM summary",
+            self._weekly_summary_params(client_id, week_start, week_end),
+        )
+        row = rows[0]
+        final_payable = float(row['final_payable'])
+        amount_paid = float(row['amount_paid'])
         eps = 0.01
         status = 'PAID' if (final_payable <= eps) or (amount_paid + eps >= final_payable) else 'UNPAID'
         return {
-            'total_cylinders': total_cylinders,
-            'subtotal': round(subtotal, 2),
-            'discount': round(discount, 2),
-            'tax_amount': round(tax_amount, 2),
-            'total_payable': round(total_payable, 2),
-            'previous_balance': round(previous_balance, 2),
-            'final_payable': round(final_payable, 2),
-            'amount_paid': round(amount_paid, 2),
+            'total_cylinders': int(row['total_cylinders']),
+            'subtotal': float(row['subtotal']),
+            'discount': float(row['discount']),
+            'tax_amount': float(row['tax_amount']),
+            'total_payable': float(row['total_payable']),
+            'previous_balance': float(row['previous_balance']),
+            'final_payable': final_payable,
+            'amount_paid': amount_paid,
             'status': status
         }
 
     def upsert_weekly_invoice(self, client_id: int, week_start: str, week_end: str, created_by: Optional[int] = None) -> int:
-        summary = self.compute_weekly_summary_for_client(client_id, week_start, week_end)
-        rows = self.execute_query('''
-            SELECT id, previous_balance, amount_paid FROM weekly_invoices WHERE client_id = ? AND week_start = ? AND week_end = ?
-        ''', (client_id, week_start, week_end))
-        receipt_number = None
-        if summary['final_payable'] > 0:
-            existing = self.execute_query('''
-                SELECT receipt_number FROM weekly_invoices WHERE client_id = ? AND week_start = ? AND week_end = ? AND receipt_number IS NOT NULL
-            ''', (client_id, week_start, week_end))
-            receipt_number = existing[0]['receipt_number'] if existing else self.get_next_weekly_receipt_number()
-        if rows:
-            prev_snapshot = float(rows[0]['previous_balance'])
-            weekly_total = float(summary['total_payable'])
-            final_payable_calc = round(prev_snapshot + weekly_total, 2)
-            amount_paid_calc = float(summary['amount_paid'])
-            eps = 0.01
-            status_calc = 'PAID' if (final_payable_calc <= eps) or (amount_paid_calc + eps >= final_payable_calc) else 'UNPAID'
-            self.execute_update('''
-                UPDATE weekly_invoices
-                SET total_cylinders = ?, subtotal = ?, discount = ?, tax_amount = ?, total_payable = ?, final_payable = ?, updated_at = CURRENT_TIMESTAMP, amount_paid = ?, status = ?, receipt_number = COALESCE(receipt_number, ?)
-                WHERE id = ?
-            ''', (
-                summary['total_cylinders'], summary['subtotal'], summary['discount'], summary['tax_amount'], summary['total_payable'], final_payable_calc, amount_paid_calc, status_calc, receipt_number, rows[0]['id']
-            ))
-            return rows[0]['id']
-        invoice_number = self.get_next_weekly_invoice_number()
-        nid = self.execute_update('''
-            INSERT INTO weekly_invoices (invoice_number, client_id, week_start, week_end, total_cylinders, subtotal, discount, tax_amount, total_payable, previous_balance, final_payable, amount_paid, status, receipt_number, created_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            invoice_number, client_id, week_start, week_end, summary['total_cylinders'], summary['subtotal'], summary['discount'], summary['tax_amount'], summary['total_payable'], summary['previous_balance'], summary['final_payable'], summary['amount_paid'], summary['status'], receipt_number, created_by
-        ))
-        try:
-            self.log_activity('WeeklyInvoiceGenerated', f"Weekly invoice {invoice_number} for client {client_id} {week_start} to {week_end}", created_by)
-        except Exception:
-            pass
-        return nid
+        with self.transaction() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                return self._upsert_weekly_invoice(cur, client_id, week_start, week_end, created_by)
+
+    def _upsert_weekly_invoice(self, cur, client_id: int, week_start: str, week_end: str, created_by: Optional[int] = None) -> int:
+        """Create or refresh one weekly invoice in a single statement on the caller's cursor.
+
+        Uses the same summary as compute_weekly_summary_for_client. An existing invoice keeps its
+        previous_balance snapshot, invoice number and receipt number; sequence values
+        are only drawn for rows that actually need a new number. A drawn number that was
+        already taken (e.g. entered by hand) is retried with the next one.
+        """
+        for attempt in range(self.WEEKLY_NUMBER_RETRIES):
+            try:
+                # Savepoint, so a number collision does not abort the caller's transaction.
+                with cur.connection.transaction():
+                    return self._execute_weekly_invoice_upsert(cur, client_id, week_start, week_end, created_by)
+            except psycopg.errors.UniqueViolation as e:
+                constraint = getattr(e.diag, 'constraint_name', None) or ''
+                if attempt + 1 >= self.WEEKLY_NUMBER_RETRIES or 'invoice_number' not in constraint:
+                    raise
+        raise RuntimeError("Could not allocate a weekly invoice number")
+
+    def _execute_weekly_invoice_upsert(self, cur, client_id: int, week_start: str, week_end: str,
+                                       created_by: Optional[int]) -> int:
+        cur.execute(
+            f'''
+            WITH {self._WEEKLY_SUMMARY_CTES},
+            numbered AS (
+                SELECT sm.*,
+                       COALESCE(
+                           (SELECT invoice_number FROM existing),
+                           (SELECT 'WEEK-' || to_char(CURRENT_DATE, 'YYYY') || '-' || lpad(n::text, GREATEST(6, length(n::text)), '0')
+                            FROM (SELECT nextval('weekly_invoice_number_seq') AS n) seq)
+                       ) AS invoice_number,
+                       COALESCE(
+                           (SELECT receipt_number FROM existing),
+                           CASE WHEN sm.final_payable > 0 THEN
+                               (SELECT 'WRCP-' || to_char(CURRENT_DATE, 'YYYY') || '-' || lpad(n::text, GREATEST(6, length(n::text)), '0')
+                                FROM (SELECT nextval('weekly_receipt_number_seq') AS n) seq)
+                           END
+                       ) AS receipt_number
+                FROM summary sm
+            ),
+            upserted AS (
+                INSERT INTO weekly_invoices (invoice_number, client_id, week_start, week_end, total_cylinders, subtotal, discount,
+                                             tax_amount, total_payable, previous_balance, final_payable, amount_paid, status,
+                                             receipt_number, created_by)
+                SELECT n.invoice_number, %(client_id)s, %(week_start)s::date, %(week_end)s::date, n.total_cylinders, n.subtotal, n.discount,
+                       n.tax_amount, n.total_payable, n.previous_balance, n.final_payable, n.amount_paid,
+                       CASE WHEN n.final_payable <= 0.01 OR n.amount_paid + 0.01 >= n.final_payable THEN 'PAID' ELSE 'UNPAID' END,
+                       n.receipt_number, %(created_by)s::bigint
+                FROM numbered n
+                ON CONFLICT (client_id, week_start, week_end) DO UPDATE
+                SET total_cylinders = EXCLUDED.total_cylinders,
+                    subtotal = EXCLUDED.subtotal,
+                    discount = EXCLUDED.discount,
+                    tax_amount = EXCLUDED.tax_amount,
+                    total_payable = EXCLUDED.total_payable,
+                    final_payable = ROUND(weekly_invoices.previous_balance + EXCLUDED.total_payable, 2),
+                    amount_paid = EXCLUDED.amount_paid,
+                    status = CASE
+                        WHEN ROUND(weekly_invoices.previous_balance + EXCLUDED.total_payable, 2) <= 0.01
+                          OR EXCLUDED.amount_paid + 0.01 >= ROUND(weekly_invoices.previous_balance + EXCLUDED.total_payable, 2)
+                        THEN 'PAID' ELSE 'UNPAID' END,
+                    receipt_number = COALESCE(weekly_invoices.receipt_number, EXCLUDED.receipt_number),
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING id, invoice_number, (xmax = 0) AS inserted
+            ),
+            logged AS (
+                INSERT INTO activity_logs (user_id, activity_type, description)
+                SELECT %(created_by)s::bigint, 'WeeklyInvoiceGenerated',
+                       'Weekly invoice ' || u.invoice_number || ' for client ' || %(client_id)s::text
+                       || ' ' || to_char(%(week_start)s::date, 'YYYY-MM-DD') || ' to ' || to_char(%(week_end)s::date, 'YYYY-MM-DD')
+                FROM upserted u
+                WHERE u.inserted
+            )
+            SELECT id FROM upserted
+            ''',
+            {**self._weekly_summary_params(client_id, week_start, week_end), 'created_by': created_by},
+        )
+        return int(cur.fetchone()['id'])
+
+    def refresh_weekly_invoices(self, week_start: str, week_end: str, created_by: Optional[int] = None,
+                                force: bool = False) -> int:
+        """Upsert every client's invoice for the week; returns how many were refreshed.
+
+        Invoices are derived data, so the upserts do not move data_change_seq. When no
+        other write happened during a refresh, a marker snapshot records that the week is
+        current and later calls skip the work until something changes.
+        """
+        marker = f"{week_start}:{week_end}"
+        if not force and self.get_report_snapshot('weekly_invoices', marker) is not None:
+            return 0
+        change_seq = self.data_change_seq()
+        refreshed = 0
+        for client in self.get_clients():
+            try:
+                with self.transaction(tracked=False) as conn:
+                    with conn.cursor(row_factory=dict_row) as cur:
+                        self._upsert_weekly_invoice(cur, client['id'], week_start, week_end, created_by)
+                refreshed += 1
+            except Exception:
+                continue
+        if self.data_change_seq() == change_seq:
+            self.save_report_snapshot('weekly_invoices', marker, change_seq, [])
+        return refreshed
 
     def get_weekly_invoices(self, week_start: str, week_end: str) -> List[Dict]:
         return self.execute_query('''
@@ -1280,6 +3053,7 @@ class DatabaseManager:
             self.log_activity('WeeklyPaymentRecorded', f"Weekly payment Rs.{float(amount):.2f} for invoice {weekly_invoice_id}", created_by)
         except Exception:
             pass
+        self.publish_change('PaymentRecorded', inv['client_id'], weekly_invoice_id=weekly_invoice_id)
         return pid
 
     def apply_weekly_payment_to_sales(self, weekly_invoice_id: int, amount: float, created_by: Optional[int]):
@@ -1346,10 +3120,12 @@ class DatabaseManager:
         self.execute_update('UPDATE clients SET initial_previous_balance = 0, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (client_id,))
         self.execute_update('UPDATE sales SET amount_paid = total_amount, balance = 0 WHERE client_id = ? AND balance != 0', (client_id,))
         self.update_client_balance(client_id)
+        self.refresh_client_week_rollup(client_id)
         try:
             self.log_activity('WeeklyInvoiceMarkedPaid', f"Weekly invoice {weekly_invoice_id} marked PAID", None)
         except Exception:
             pass
+        self.publish_change('PaymentRecorded', client_id, weekly_invoice_id=weekly_invoice_id)
         return updated > 0
 
     def get_client_weekly_items(self, client_id: int, week_start: str, week_end: str) -> List[Dict]:
@@ -1453,30 +3229,32 @@ class DatabaseManager:
                            ' ' || COALESCE(gp.capacity,'')
                            , ', ' ORDER BY si2.id
                        )
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        JOIN gas_products gp ON si2.gas_product_id = gp.id
                        WHERE si2.sale_id = s.id
                    ) AS product_summary,
                    (
                        SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        WHERE si2.sale_id = s.id
                    ) AS quantities_summary,
                    (
                        SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                        WHERE si2.sale_id = s.id
                    ) AS source_summary
-            FROM sales s
+            FROM ({self._ALL_SALES_SQL}) s
             WHERE s.client_id = ?
             ORDER BY s.created_at DESC
             LIMIT {int(limit)}
         '''
         return self.execute_query(query, (client_id,))
 
-    def get_sales_for_date_with_summaries(self, day: str) -> List[Dict]:
-        query = '''
+    def get_sales_for_date_with_summaries(self, day: str, cached: bool = True) -> List[Dict]:
+        if cached:
+            return self._snapshot_or('daily_sales', str(day), lambda: self.get_sales_for_date_with_summaries(day, False))
+        query = f'''
             SELECT s.*, c.name as client_name, u.full_name as cashier_name,
                    (
                        SELECT string_agg(
@@ -1485,22 +3263,22 @@ class DatabaseManager:
                            ' ' || COALESCE(gp.capacity,'')
                            , ', ' ORDER BY si2.id
                        )
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        JOIN gas_products gp ON si2.gas_product_id = gp.id
                        WHERE si2.sale_id = s.id
                    ) AS product_summary,
                    (
                        SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        WHERE si2.sale_id = s.id
                    ) AS quantities_summary,
                    (
                        SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                        WHERE si2.sale_id = s.id
                    ) AS source_summary
-            FROM sales s
+            FROM ({self._ALL_SALES_SQL}) s
             JOIN clients c ON s.client_id = c.id
             JOIN users u ON s.created_by = u.id
             WHERE s.created_at >= (?::date)
@@ -1573,9 +3351,242 @@ class DatabaseManager:
                         ),
                     )
 
+    def close_financial_period(self, cutoff_date: str, created_by: Optional[int] = None) -> Dict[str, Any]:
+        """Move fully settled history dated before cutoff_date into the archive tables.
+
+        Billing weeks are archived whole: a week's sales and weekly invoice move together,
+        and only when the week ended before cutoff_date, every sale in it is paid and its
+        invoice (if any) is PAID. Historical reports read live and archived rows alike.
+        Archived sales are folded into per-client opening rows (money and cylinders) so
+        client totals, balances and cylinder status stay exactly as before the close.
+        Sales carrying supplier fill costs stay live because supplier balances are
+        computed from them.
+        """
+        with self.transaction() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                # Block concurrent sale/payment writes while the snapshot is taken.
+                cur.execute("LOCK TABLE sales, sale_items, receipts, weekly_invoices, weekly_payments IN SHARE ROW EXCLUSIVE MODE")
+                cur.execute(
+                    "INSERT INTO period_closes (cutoff_date, created_by) VALUES (%s, %s) RETURNING id",
+                    (cutoff_date, created_by),
+                )
+                close_id = int(cur.fetchone()['id'])
+
+                cur.execute(
+                    '''
+                    CREATE TEMP TABLE closing_sales ON COMMIT DROP AS
+                    WITH candidates AS (
+                        SELECT s.id, s.client_id, billing_week_start(s.created_at::date) AS week_start,
+                               ABS(COALESCE(s.balance, 0)) < 0.005
+                               AND s.total_amount - COALESCE(s.amount_paid, 0) < 0.005
+                               AND NOT EXISTS (
+                                   SELECT 1 FROM sale_items si
+                                   WHERE si.sale_id = s.id AND si.supplier_id IS NOT NULL
+                               ) AS settled
+                        FROM sales s
+                        WHERE s.created_at < billing_week_start(%s::date)
+                    )
+                    -- Whole billing weeks only: a week with any unsettled sale or unpaid invoice stays live.
+                    SELECT c.id, c.client_id
+                    FROM candidates c
+                    WHERE c.settled
+                      AND NOT EXISTS (
+                          SELECT 1 FROM candidates o
+                          WHERE o.client_id = c.client_id AND o.week_start = c.week_start AND NOT o.settled
+                      )
+                      AND NOT EXISTS (
+                          SELECT 1 FROM weekly_invoices wi
+                          WHERE wi.client_id = c.client_id AND wi.week_start = c.week_start AND wi.status <> 'PAID'
+                      )
+                    ''',
+                    (cutoff_date,),
+                )
+                cur.execute(
+                    '''
+                    CREATE TEMP TABLE closing_invoices ON COMMIT DROP AS
+                    SELECT wi.id
+                    FROM weekly_invoices wi
+                    WHERE wi.week_end < (%s::date) AND wi.status = 'PAID'
+                      -- Only weeks archived whole: an invoice stays live beside any of its sales that do.
+                      AND NOT EXISTS (
+                          SELECT 1 FROM sales s
+                          WHERE s.client_id = wi.client_id
+                            AND s.created_at >= wi.week_start
+                            AND s.created_at < wi.week_end + 1
+                            AND NOT EXISTS (SELECT 1 FROM closing_sales cs WHERE cs.id = s.id)
+                      )
+                    ''',
+                    (cutoff_date,),
+                )
+
+                cur.execute(
+                    '''
+                    INSERT INTO client_period_openings (period_close_id, client_id, sale_count, total_purchases, total_paid)
+                    SELECT %s, s.client_id, COUNT(*), COALESCE(SUM(s.total_amount), 0), COALESCE(SUM(s.amount_paid), 0)
+                    FROM closing_sales cs
+                    JOIN sales s ON s.id = cs.id
+                    GROUP BY s.client_id
+                    ''',
+                    (close_id,),
+                )
+                cur.execute(
+                    '''
+                    INSERT INTO client_cylinder_openings (period_close_id, client_id, gas_type, sub_type, capacity, quantity)
+                    SELECT %s, d.client_id, gp.gas_type, gp.sub_type, gp.capacity, SUM(d.quantity)
+                    FROM (
+                        SELECT cs.client_id, si.gas_product_id, si.quantity
+                        FROM closing_sales cs
+                        JOIN sale_items si ON si.sale_id = cs.id
+                        UNION ALL
+                        SELECT cs.client_id, s.gas_product_id, s.quantity
+                        FROM closing_sales cs
+                        JOIN sales s ON s.id = cs.id
+                        WHERE NOT EXISTS (SELECT 1 FROM sale_items si_chk WHERE si_chk.sale_id = s.id)
+                    ) d
+                    JOIN gas_products gp ON gp.id = d.gas_product_id
+                    GROUP BY d.client_id, gp.gas_type, gp.sub_type, gp.capacity
+                    HAVING SUM(d.quantity) <> 0
+                    ''',
+                    (close_id,),
+                )
+
+                cur.execute(
+                    '''
+                    WITH moved AS (
+                        DELETE FROM receipts r
+                        USING closing_sales cs
+                        WHERE r.sale_id = cs.id
+                        RETURNING r.*
+                    )
+                    INSERT INTO receipts_archive
+                        (id, receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by, created_at, period_close_id)
+                    SELECT id, receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by, created_at, %s
+                    FROM moved
+                    ''',
+                    (close_id,),
+                )
+                receipts_archived = int(cur.rowcount or 0)
+                cur.execute(
+                    '''
+                    WITH moved AS (
+                        DELETE FROM sale_items si
+                        USING closing_sales cs
+                        WHERE si.sale_id = cs.id
+                        RETURNING si.*
+                    )
+                    INSERT INTO sale_items_archive
+                        (id, sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price,
+                         subtotal, tax_amount, total_amount, created_at, period_close_id)
+                    SELECT id, sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price,
+                           subtotal, tax_amount, total_amount, created_at, %s
+                    FROM moved
+                    ''',
+                    (close_id,),
+                )
+                sale_items_archived = int(cur.rowcount or 0)
+                cur.execute(
+                    '''
+                    WITH moved AS (
+                        DELETE FROM sales s
+                        USING closing_sales cs
+                        WHERE s.id = cs.id
+                        RETURNING s.*
+                    )
+                    INSERT INTO sales_archive
+                        (id, client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount,
+                         amount_paid, balance, created_by, created_at, period_close_id)
+                    SELECT id, client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount,
+                           amount_paid, balance, created_by, created_at, %s
+                    FROM moved
+                    ''',
+                    (close_id,),
+                )
+                sales_archived = int(cur.rowcount or 0)
+
+                cur.execute(
+                    '''
+                    WITH moved AS (
+                        DELETE FROM weekly_payments wp
+                        USING closing_invoices ci
+                        WHERE wp.weekly_invoice_id = ci.id
+                        RETURNING wp.*
+                    )
+                    INSERT INTO weekly_payments_archive
+                        (id, weekly_invoice_id, client_id, amount, payment_date, payment_method, created_by, created_at, period_close_id)
+                    SELECT id, weekly_invoice_id, client_id, amount, payment_date, payment_method, created_by, created_at, %s
+                    FROM moved
+                    ''',
+                    (close_id,),
+                )
+                weekly_payments_archived = int(cur.rowcount or 0)
+                cur.execute(
+                    '''
+                    WITH moved AS (
+                        DELETE FROM weekly_invoices wi
+                        USING closing_invoices ci
+                        WHERE wi.id = ci.id
+                        RETURNING wi.*
+                    )
+                    INSERT INTO weekly_invoices_archive
+                        (id, invoice_number, client_id, week_start, week_end, total_cylinders, subtotal, discount, tax_amount,
+                         total_payable, previous_balance, final_payable, amount_paid, status, receipt_number, created_by,
+                         created_at, updated_at, paid_at, period_close_id)
+                    SELECT id, invoice_number, client_id, week_start, week_end, total_cylinders, subtotal, discount, tax_amount,
+                           total_payable, previous_balance, final_payable, amount_paid, status, receipt_number, created_by,
+                           created_at, updated_at, paid_at, %s
+                    FROM moved
+                    ''',
+                    (close_id,),
+                )
+                weekly_invoices_archived = int(cur.rowcount or 0)
+
+                cur.execute("SELECT DISTINCT client_id FROM closing_sales")
+                closed_clients = [int(r['client_id']) for r in cur.fetchall()]
+                if closed_clients:
+                    self._refresh_week_rollup(cur, closed_clients)
+
+                cur.execute(
+                    '''
+                    UPDATE period_closes
+                    SET sales_archived = %s, sale_items_archived = %s, receipts_archived = %s,
+                        weekly_invoices_archived = %s, weekly_payments_archived = %s
+                    WHERE id = %s
+                    ''',
+                    (sales_archived, sale_items_archived, receipts_archived,
+                     weekly_invoices_archived, weekly_payments_archived, close_id),
+                )
+                cur.execute(
+                    "INSERT INTO activity_logs (user_id, activity_type, description) VALUES (%s, %s, %s)",
+                    (
+                        created_by,
+                        'PERIOD_CLOSED',
+                        f"Closed period before {cutoff_date}: {sales_archived} sales, {receipts_archived} receipts, "
+                        f"{weekly_invoices_archived} weekly invoices archived",
+                    ),
+                )
+        return {
+            'period_close_id': close_id,
+            'cutoff_date': cutoff_date,
+            'sales_archived': sales_archived,
+            'sale_items_archived': sale_items_archived,
+            'receipts_archived': receipts_archived,
+            'weekly_invoices_archived': weekly_invoices_archived,
+            'weekly_payments_archived': weekly_payments_archived,
+        }
+
+    def get_period_closes(self) -> List[Dict]:
+        return self.execute_query('''
+            SELECT pc.*, u.full_name AS closed_by
+            FROM period_closes pc
+            LEFT JOIN users u ON pc.created_by = u.id
+            ORDER BY pc.created_at DESC
+        ''')
+
+    def employees_query(self) -> Tuple[str, tuple]:
+        return 'SELECT * FROM employees WHERE is_active = 1 ORDER BY name', ()
+
     def get_employees(self) -> List[Dict]:
-        query = 'SELECT * FROM employees WHERE is_active = 1 ORDER BY name'
-        return self.execute_query(query)
+        return self.execute_query(*self.employees_query())
     
     def add_employee(self, name: str, role: str, salary: float, contact: str, joining_date: date) -> int:
         query = '''
@@ -1584,8 +3595,73 @@ class DatabaseManager:
         '''
         return self.execute_update(query, (name, role, salary, contact, joining_date))
     
-    def get_sales_report(self, start_date: date, end_date: date) -> List[Dict]:
-        query = '''
+    def sale_item_facts_query(self, start_date: date, end_date: date) -> Tuple[str, tuple]:
+        """One row per item sold in the period, archived sales included, for the analytics reports.
+
+        Sales recorded before sale_items existed count as one company-stock item. Money
+        comes back as float8 and the sale time as its date, ready for columnar use.
+        """
+        sales = '''
+            SELECT id, client_id, gas_product_id, quantity, total_amount, created_at FROM sales
+            WHERE created_at >= (?::date) AND created_at < (?::date + INTERVAL '1 day')
+            UNION ALL
+            SELECT id, client_id, gas_product_id, quantity, total_amount, created_at FROM sales_archive
+            WHERE created_at >= (?::date) AND created_at < (?::date + INTERVAL '1 day')
+        '''
+        items = '''
+            SELECT sale_id, gas_product_id, supplier_id, quantity, total_amount, fill_total FROM sale_items
+            UNION ALL
+            SELECT sale_id, gas_product_id, supplier_id, quantity, total_amount, fill_total FROM sale_items_archive
+        '''
+        query = f'''
+            SELECT s.created_at::date AS day, s.client_id, c.name AS client_name,
+                   gp.gas_type, COALESCE(sp.name, 'Company Stock') AS supplier_name, si.quantity,
+                   si.total_amount::float8 AS revenue, COALESCE(si.fill_total, 0)::float8 AS fill_cost
+            FROM ({sales}) s
+            JOIN ({items}) si ON si.sale_id = s.id
+            JOIN clients c ON c.id = s.client_id
+            JOIN gas_products gp ON gp.id = si.gas_product_id
+            LEFT JOIN suppliers sp ON sp.id = si.supplier_id
+            UNION ALL
+            SELECT s.created_at::date, s.client_id, c.name, gp.gas_type, 'Company Stock', s.quantity,
+                   s.total_amount::float8, 0::float8
+            FROM ({sales}) s
+            JOIN clients c ON c.id = s.client_id
+            JOIN gas_products gp ON gp.id = s.gas_product_id
+            WHERE NOT EXISTS (SELECT 1 FROM ({items}) si WHERE si.sale_id = s.id)
+        '''
+        return query, (start_date, end_date) * 4
+
+    # Live and archived sales as one relation. Reports over history read these, so a period
+    # close changes where rows are stored but not what any report shows.
+    _ALL_SALES_SQL = '''
+        SELECT id, client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount,
+               amount_paid, balance, created_by, created_at
+        FROM sales
+        UNION ALL
+        SELECT id, client_id, gas_product_id, quantity, unit_price, subtotal, tax_amount, total_amount,
+               amount_paid, balance, created_by, created_at
+        FROM sales_archive
+    '''
+    _ALL_RECEIPTS_SQL = '''
+        SELECT id, receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by, created_at
+        FROM receipts
+        UNION ALL
+        SELECT id, receipt_number, sale_id, client_id, total_amount, amount_paid, balance, created_by, created_at
+        FROM receipts_archive
+    '''
+    _ALL_SALE_ITEMS_SQL = '''
+        SELECT id, sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price,
+               subtotal, tax_amount, total_amount, created_at
+        FROM sale_items
+        UNION ALL
+        SELECT id, sale_id, gas_product_id, supplier_id, fill_unit_cost, fill_total, quantity, unit_price,
+               subtotal, tax_amount, total_amount, created_at
+        FROM sale_items_archive
+    '''
+
+    def sales_report_query(self, start_date: date, end_date: date) -> Tuple[str, tuple]:
+        query = f'''
             SELECT s.*, c.name as client_name, c.phone as client_phone,
                    (
                        SELECT string_agg(
@@ -1594,46 +3670,56 @@ class DatabaseManager:
                            ' ' || COALESCE(gp.capacity,'')
                            , ', ' ORDER BY si2.id
                        )
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        JOIN gas_products gp ON si2.gas_product_id = gp.id
                        WHERE si2.sale_id = s.id
                    ) AS product_summary,
                    (
                        SELECT string_agg(si2.quantity::text, ', ' ORDER BY si2.id)
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        WHERE si2.sale_id = s.id
                    ) AS quantities_summary,
                    (
                        SELECT string_agg(DISTINCT COALESCE(sp.name, 'Company Stock'), ', ' ORDER BY COALESCE(sp.name, 'Company Stock'))
-                       FROM sale_items si2
+                       FROM ({self._ALL_SALE_ITEMS_SQL}) si2
                        LEFT JOIN suppliers sp ON si2.supplier_id = sp.id
                        WHERE si2.sale_id = s.id
                    ) AS source_summary
-            FROM sales s
+            FROM ({self._ALL_SALES_SQL}) s
             JOIN clients c ON s.client_id = c.id
                         WHERE s.created_at >= (?::date)
                             AND s.created_at < (?::date + INTERVAL '1 day')
             ORDER BY s.created_at DESC
         '''
-        return self.execute_query(query, (start_date, end_date))
+        return query, (start_date, end_date)
+
+    def get_sales_report(self, start_date: date, end_date: date) -> List[Dict]:
+        return self.execute_query(*self.sales_report_query(start_date, end_date))
     
-    def get_outstanding_balances(self) -> List[Dict]:
+    def outstanding_balances_query(self) -> Tuple[str, tuple]:
         query = '''
             SELECT id, name, phone, company, balance, total_purchases, total_paid
             FROM clients 
             WHERE balance > 0
             ORDER BY balance DESC
         '''
-        return self.execute_query(query)
+        return query, ()
 
-    def get_supplier_sales_summary(self, start_date: date, end_date: date, supplier_id: Optional[int] = None) -> List[Dict]:
+    def get_outstanding_balances(self) -> List[Dict]:
+        return self.execute_query(*self.outstanding_balances_query())
+
+    def client_summary_query(self) -> Tuple[str, tuple]:
+        """Every client, largest outstanding balance first."""
+        return 'SELECT * FROM clients ORDER BY COALESCE(balance, 0) DESC, name', ()
+
+    def supplier_sales_summary_query(self, start_date: date, end_date: date,
+                                     supplier_id: Optional[int] = None) -> Tuple[str, tuple]:
         params: List[Any] = [start_date, end_date, start_date, end_date]
         supplier_where = ""
         if supplier_id is not None:
             supplier_where = "WHERE supplier_key = ?"
             params.append(int(supplier_id))
-        return self.execute_query(
-            f'''
+        query = f'''
             WITH itemized AS (
                 SELECT
                     s.id AS sale_id,
@@ -1645,8 +3731,8 @@ class DatabaseManager:
                     si.subtotal AS subtotal,
                     si.tax_amount AS tax_amount,
                     si.total_amount AS total_amount
-                FROM sales s
-                JOIN sale_items si ON si.sale_id = s.id
+                FROM ({self._ALL_SALES_SQL}) s
+                JOIN ({self._ALL_SALE_ITEMS_SQL}) si ON si.sale_id = s.id
                 LEFT JOIN suppliers sp ON si.supplier_id = sp.id
                 WHERE s.created_at >= (?::date)
                   AND s.created_at < (?::date + INTERVAL '1 day')
@@ -1661,8 +3747,8 @@ class DatabaseManager:
                     s.subtotal AS subtotal,
                     s.tax_amount AS tax_amount,
                     s.total_amount AS total_amount
-                FROM sales s
-                LEFT JOIN sale_items si_chk ON si_chk.sale_id = s.id
+                FROM ({self._ALL_SALES_SQL}) s
+                LEFT JOIN ({self._ALL_SALE_ITEMS_SQL}) si_chk ON si_chk.sale_id = s.id
                 WHERE si_chk.id IS NULL
                   AND s.created_at >= (?::date)
                   AND s.created_at < (?::date + INTERVAL '1 day')
@@ -1688,9 +3774,11 @@ class DatabaseManager:
             {supplier_where}
             GROUP BY supplier_key, supplier_name
             ORDER BY supplier_name
-            ''',
-            tuple(params),
-        )
+            '''
+        return query, tuple(params)
+
+    def get_supplier_sales_summary(self, start_date: date, end_date: date, supplier_id: Optional[int] = None) -> List[Dict]:
+        return self.execute_query(*self.supplier_sales_summary_query(start_date, end_date, supplier_id))
 
     def get_supplier_fill_entries(self, supplier_id: Optional[int] = None, start_date: Optional[date] = None,
                                   end_date: Optional[date] = None) -> List[Dict]:
@@ -1908,10 +3996,16 @@ class DatabaseManager:
         return pid
 
     def get_weekly_supplier_breakdown(self, client_id: int, week_start: str, week_end: str) -> List[Dict]:
-        return self.execute_query(
+        return self.get_weekly_supplier_breakdowns([client_id], week_start, week_end).get(int(client_id), [])
+
+    def get_weekly_supplier_breakdowns(self, client_ids: List[int], week_start: str, week_end: str) -> Dict[int, List[Dict]]:
+        """Per-source totals for each client's week, keyed by client id (clients without sales are absent)."""
+        ids = [int(c) for c in client_ids]
+        rows = self.execute_query(
             '''
             WITH itemized AS (
                 SELECT
+                    s.client_id,
                     COALESCE(si.supplier_id, 0) AS supplier_key,
                     COALESCE(sp.name, 'Company Stock') AS supplier_name,
                     si.quantity AS quantity,
@@ -1921,11 +4015,12 @@ class DatabaseManager:
                 FROM sale_items si
                 JOIN sales s ON si.sale_id = s.id
                 LEFT JOIN suppliers sp ON si.supplier_id = sp.id
-                WHERE s.client_id = ?
+                WHERE s.client_id = ANY(?::bigint[])
                   AND s.created_at >= (?::date)
                   AND s.created_at < (?::date + INTERVAL '1 day')
                 UNION ALL
                 SELECT
+                    s.client_id,
                     0 AS supplier_key,
                     'Company Stock' AS supplier_name,
                     s.quantity AS quantity,
@@ -1935,11 +4030,12 @@ class DatabaseManager:
                 FROM sales s
                 LEFT JOIN sale_items si_chk ON si_chk.sale_id = s.id
                 WHERE si_chk.id IS NULL
-                  AND s.client_id = ?
+                  AND s.client_id = ANY(?::bigint[])
                   AND s.created_at >= (?::date)
                   AND s.created_at < (?::date + INTERVAL '1 day')
             )
             SELECT
+                client_id,
                 supplier_key,
                 supplier_name,
                 COALESCE(SUM(quantity), 0) AS total_quantity,
@@ -1947,14 +4043,21 @@ class DatabaseManager:
                 COALESCE(SUM(tax_amount), 0) AS tax_amount,
                 COALESCE(SUM(total_amount), 0) AS total_amount
             FROM itemized
-            GROUP BY supplier_key, supplier_name
-            ORDER BY supplier_name
+            GROUP BY client_id, supplier_key, supplier_name
+            ORDER BY client_id, supplier_name
             ''',
-            (client_id, week_start, week_end, client_id, week_start, week_end),
+            (ids, week_start, week_end, ids, week_start, week_end),
         )
+        by_client: Dict[int, List[Dict]] = {}
+        for row in rows:
+            by_client.setdefault(int(row['client_id']), []).append(row)
+        return by_client
 
     def get_weekly_supplier_breakdown_text(self, client_id: int, week_start: str, week_end: str) -> str:
-        rows = self.get_weekly_supplier_breakdown(client_id, week_start, week_end)
+        return self.supplier_breakdown_text(self.get_weekly_supplier_breakdown(client_id, week_start, week_end))
+
+    @staticmethod
+    def supplier_breakdown_text(rows: List[Dict]) -> str:
         if not rows:
             return "0"
         return ", ".join(
@@ -1985,7 +4088,9 @@ class DatabaseManager:
         )
         return rows[0]['result'] if rows and rows[0]['result'] else "0"
 
-    def get_lpg_refills_for_date(self, day: str) -> List[Dict]:
+    def get_lpg_refills_for_date(self, day: str, cached: bool = True) -> List[Dict]:
+        if cached:
+            return self._snapshot_or('daily_lpg_refills', str(day), lambda: self.get_lpg_refills_for_date(day, False))
         return self.execute_query(
             '''
             SELECT
@@ -2009,6 +4114,45 @@ class DatabaseManager:
             (day, day),
         )
 
+    def daily_totals_query(self, day: str) -> Tuple[str, tuple]:
+        query = f'''
+            SELECT s.transaction_count, s.total_sales, s.total_paid, s.total_balance,
+                   r.refill_count, r.refill_quantity, r.refill_amount
+            FROM (
+                SELECT COUNT(*) AS transaction_count,
+                       COALESCE(SUM(total_amount), 0) AS total_sales,
+                       COALESCE(SUM(amount_paid), 0) AS total_paid,
+                       COALESCE(SUM(balance), 0) AS total_balance
+                FROM ({self._ALL_SALES_SQL}) sales
+                WHERE created_at >= (?::date) AND created_at < (?::date + INTERVAL '1 day')
+            ) s
+            CROSS JOIN (
+                SELECT COUNT(*) AS refill_count,
+                       COALESCE(SUM(quantity), 0) AS refill_quantity,
+                       COALESCE(SUM(total_amount), 0) AS refill_amount
+                FROM lpg_refills
+                WHERE created_at >= (?::date) AND created_at < (?::date + INTERVAL '1 day')
+            ) r
+        '''
+        return query, (day, day, day, day)
+
+    def get_daily_summary(self, day: str, cached: bool = True) -> Dict:
+        """A day's sales and LPG refills with their totals, as shown and printed on Daily Transactions.
+
+        Returns {'day', 'sales', 'refills', 'totals'}; the totals are summed in SQL.
+        """
+        day = str(day)
+        if cached:
+            totals = self._snapshot_or('daily_totals', day, lambda: self.execute_query(*self.daily_totals_query(day)))
+        else:
+            totals = self.execute_query(*self.daily_totals_query(day))
+        return {
+            'day': day,
+            'sales': self.get_sales_for_date_with_summaries(day, cached),
+            'refills': self.get_lpg_refills_for_date(day, cached),
+            'totals': totals[0],
+        }
+
     def get_lpg_refill_report(self, start_date: date, end_date: date) -> List[Dict]:
         return self.execute_query(
             '''
@@ -2034,69 +4178,83 @@ class DatabaseManager:
 
     def resolve_tracking_product_id(self, gas_type: str, capacity: str, sub_type: Optional[str] = None) -> Optional[int]:
         if gas_type == 'LPG' and capacity == '12/15kg':
-            rows = self.execute_query(
-                '''
-                SELECT id
-                FROM gas_products
-                WHERE gas_type = 'LPG' AND capacity IN ('12kg', '15kg') AND is_active = TRUE
-                ORDER BY capacity, id
-                LIMIT 1
-                '''
+            rows = [
+                p for p in self._product_catalog()['products']
+                if p['gas_type'] == 'LPG' and p['capacity'] in ('12kg', '15kg') and p.get('is_active')
+            ]
+            best = min(rows, key=lambda p: (p['capacity'], int(p['id'])), default=None)
+            return int(best['id']) if best else None
+        return self._find_product_id(gas_type, capacity, sub_type)
+
+    def lpg_khata_query(self) -> Tuple[str, tuple]:
+        """LPG rows of get_client_cylinder_status() for every client, as one query.
+
+        Each client gets a row per active LPG capacity group plus any group it has
+        movements in, with the same delivered / returned / refilled arithmetic.
+        """
+        cap_group = "CASE WHEN capacity IN ('12kg','15kg') THEN '12/15kg' ELSE capacity END"
+        query = f'''
+            WITH movements AS (
+                SELECT client_id, capacity, quantity AS delivered, 0 AS returned, 0 AS refilled
+                FROM client_initial_outstanding WHERE gas_type = 'LPG'
+                UNION ALL
+                SELECT client_id, capacity, quantity, 0, 0
+                FROM client_cylinder_openings WHERE gas_type = 'LPG'
+                UNION ALL
+                SELECT s.client_id, gp.capacity, si.quantity, 0, 0
+                FROM sale_items si
+                JOIN sales s ON si.sale_id = s.id
+                JOIN gas_products gp ON si.gas_product_id = gp.id
+                WHERE gp.gas_type = 'LPG'
+                UNION ALL
+                SELECT s.client_id, gp.capacity, s.quantity, 0, 0
+                FROM sales s
+                JOIN gas_products gp ON s.gas_product_id = gp.id
+                WHERE gp.gas_type = 'LPG'
+                  AND NOT EXISTS (SELECT 1 FROM sale_items si WHERE si.sale_id = s.id)
+                UNION ALL
+                SELECT client_id, capacity, 0, quantity, 0
+                FROM cylinder_returns WHERE gas_type = 'LPG'
+                UNION ALL
+                SELECT lr.client_id, gp.capacity, 0, 0, lr.quantity
+                FROM lpg_refills lr
+                JOIN gas_products gp ON lr.gas_product_id = gp.id
+                WHERE gp.gas_type = 'LPG'
+            ),
+            grouped AS (
+                SELECT client_id, {cap_group} AS capacity,
+                       COALESCE(SUM(delivered), 0) AS delivered,
+                       COALESCE(SUM(returned), 0) AS returned,
+                       COALESCE(SUM(refilled), 0) AS refilled
+                FROM movements
+                GROUP BY client_id, {cap_group}
+            ),
+            khata_keys AS (
+                SELECT c.id AS client_id, caps.capacity
+                FROM clients c
+                CROSS JOIN (SELECT DISTINCT {cap_group} AS capacity
+                            FROM gas_products WHERE gas_type = 'LPG' AND is_active) caps
+                UNION
+                SELECT client_id, capacity FROM grouped
             )
-            return int(rows[0]['id']) if rows else None
-        rows = self.execute_query(
-            '''
-            SELECT id
-            FROM gas_products
-            WHERE gas_type = ?
-              AND capacity = ?
-              AND COALESCE(sub_type, '') = COALESCE(?, '')
-              AND is_active = TRUE
-            ORDER BY id
-            LIMIT 1
-            ''',
-            (gas_type, capacity, sub_type or ''),
-        )
-        if rows:
-            return int(rows[0]['id'])
-        rows = self.execute_query(
-            '''
-            SELECT id
-            FROM gas_products
-            WHERE gas_type = ?
-              AND capacity = ?
-              AND is_active = TRUE
-            ORDER BY id
-            LIMIT 1
-            ''',
-            (gas_type, capacity),
-        )
-        return int(rows[0]['id']) if rows else None
+            SELECT c.name AS client_name, c.phone, COALESCE(c.company, '') AS company,
+                   k.capacity,
+                   COALESCE(g.delivered, 0) AS delivered,
+                   COALESCE(g.returned, 0) AS returned,
+                   GREATEST(0, COALESCE(g.delivered, 0) - COALESCE(g.returned, 0)) AS pending_client,
+                   COALESCE(g.refilled, 0) AS refilled,
+                   GREATEST(0, COALESCE(g.returned, 0) - COALESCE(g.refilled, 0)) AS empty_balance
+            FROM khata_keys k
+            JOIN clients c ON c.id = k.client_id
+            LEFT JOIN grouped g ON g.client_id = k.client_id AND g.capacity = k.capacity
+            ORDER BY c.name, k.capacity
+        '''
+        return query, ()
 
-    def get_lpg_khata_summary(self) -> List[Dict]:
-        rows: List[Dict[str, Any]] = []
-        for client in self.get_clients():
-            statuses = self.get_client_cylinder_status(int(client['id']))
-            for status in statuses:
-                if status.get('gas_type') != 'LPG':
-                    continue
-                returned = int(status.get('returned') or 0)
-                refilled = int(status.get('refilled') or 0)
-                rows.append(
-                    {
-                        'client_name': client['name'],
-                        'phone': client['phone'],
-                        'company': client.get('company') or '',
-                        'capacity': status.get('capacity') or '',
-                        'delivered': int(status.get('delivered') or 0),
-                        'returned': returned,
-                        'pending_client': int(status.get('pending') or 0),
-                        'refilled': refilled,
-                        'empty_balance': max(0, returned - refilled),
-                    }
-                )
-        rows.sort(key=lambda row: (row['client_name'], row['capacity']))
-        return rows
+    def get_lpg_khata_summary(self, cached: bool = True) -> List[Dict]:
+        if cached:
+            return self._snapshot_or('lpg_khata', '', lambda: self.get_lpg_khata_summary(False))
+        return self.execute_query(*self.lpg_khata_query())
 
     def get_gate_activity_report(self, start_date: date, end_date: date) -> List[Dict]:
         return []
@@ -2104,19 +4262,16 @@ class DatabaseManager:
 
     def get_all_company_products(self):
         """Return all gas products with type, sub_type, capacity."""
-        return self.execute_query(
-            '''
-            SELECT gas_type, sub_type, capacity
-            FROM gas_products
-            WHERE is_active = 1
-            ORDER BY gas_type, sub_type, capacity
-            '''
-        )
+        return [
+            {'gas_type': p['gas_type'], 'sub_type': p.get('sub_type'), 'capacity': p['capacity']}
+            for p in self._product_catalog()['products']
+            if p.get('is_active')
+        ]
 
     def get_client_cylinder_status(self, client_id: int):
         """
         List all company products with delivered, returned, and pending counts for this client.
-        Delivered = initial outstanding + sum of sales quantities for the product
+        Delivered = initial outstanding + archived opening positions + sum of sales quantities for the product
         Returned = sum of cylinder_returns quantities
         Pending = Delivered - Returned
         Returns: list of dict with gas_type, sub_type, capacity, delivered, returned, pending.
@@ -2134,11 +4289,14 @@ class DatabaseManager:
             SELECT gas_type,
                    CASE WHEN gas_type = 'LPG' AND capacity IN ('12kg','15kg') THEN '12/15kg' ELSE capacity END AS cap_group,
                    COALESCE(SUM(quantity), 0) AS qty
-            FROM client_initial_outstanding
-            WHERE client_id = ?
+            FROM (
+                SELECT gas_type, capacity, quantity FROM client_initial_outstanding WHERE client_id = ?
+                UNION ALL
+                SELECT gas_type, capacity, quantity FROM client_cylinder_openings WHERE client_id = ?
+            ) openings
             GROUP BY gas_type, cap_group
             ''',
-            (client_id,)
+            (client_id, client_id)
         )
         init_map = {(r['gas_type'], r['cap_group']): int(r['qty']) for r in init_rows}
 
@@ -2258,39 +4416,34 @@ class DatabaseManager:
             )
         except Exception:
             pass
+        self.publish_change('RefillRecorded', client_id, gas_product_id=gas_product_id)
         return refill_id
 
     def add_cylinder_return(self, client_id: int, gas_type: str, sub_type: str, capacity: str, quantity: int):
-        query = '''
-            INSERT INTO cylinder_returns (client_id, gas_type, sub_type, capacity, quantity)
-            VALUES (?, ?, ?, ?, ?)
-        '''
-        return_id = self.execute_update(query, (client_id, gas_type, sub_type, capacity, int(quantity)))
-        try:
-            product_rows = self.execute_query('''
-                SELECT id
-                FROM gas_products
-                WHERE gas_type = ?
-                  AND COALESCE(sub_type, '') = COALESCE(?, '')
-                  AND capacity = ?
-                LIMIT 1
-            ''', (gas_type, sub_type, capacity))
-            if not product_rows and sub_type:
-                product_rows = self.execute_query('''
-                    SELECT id
-                    FROM gas_products
-                    WHERE gas_type = ? AND capacity = ?
-                    ORDER BY id
-                    LIMIT 1
-                ''', (gas_type, capacity))
-            if product_rows:
-                self._increase_inventory_for_return(int(product_rows[0]['id']), int(quantity), return_id=return_id, client_id=client_id)
-        except Exception:
-            pass
+        # Exact product first; a return recorded with a sub type falls back to the plain product.
+        product_id = self._find_product_id(gas_type, capacity, sub_type, active_only=False, any_sub_type=bool(sub_type))
+        with self.transaction() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    '''
+                    INSERT INTO cylinder_returns (client_id, gas_type, sub_type, capacity, quantity)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id
+                    ''',
+                    (client_id, gas_type, sub_type, capacity, int(quantity)),
+                )
+                return_id = int(cur.fetchone()['id'])
+                if product_id is not None:
+                    self._record_stock_movement(cur, product_id, 'RETURN_IN', int(quantity),
+                                                'CYLINDER_RETURN', return_id, client_id)
+        self.publish_change('ReturnRecorded', client_id, gas_type=gas_type, capacity=capacity, quantity=int(quantity))
         return return_id
 
     def get_total_cylinder_stats(self) -> Dict[str, int]:
-        init_total_rows = self.execute_query('SELECT COALESCE(SUM(quantity),0) AS total FROM client_initial_outstanding')
+        init_total_rows = self.execute_query('''
+            SELECT COALESCE((SELECT SUM(quantity) FROM client_initial_outstanding), 0)
+                 + COALESCE((SELECT SUM(quantity) FROM client_cylinder_openings), 0) AS total
+        ''')
         init_total = int(init_total_rows[0]['total']) if init_total_rows else 0
         delivered_items_rows = self.execute_query('SELECT COALESCE(SUM(quantity),0) AS total FROM sale_items')
         delivered_items_total = int(delivered_items_rows[0]['total']) if delivered_items_rows else 0
@@ -2325,7 +4478,9 @@ class DatabaseManager:
             'total_pending': pending_total
         }
 
-    def get_pending_cylinder_summary_by_client(self) -> List[Dict]:
+    def get_pending_cylinder_summary_by_client(self, cached: bool = True) -> List[Dict]:
+        if cached:
+            return self._snapshot_or('pending_cylinders', '', lambda: self.get_pending_cylinder_summary_by_client(False))
         clients = self.get_clients()
         result: List[Dict] = []
         for c in clients:
@@ -2342,9 +4497,14 @@ class DatabaseManager:
         return result
 
     def get_weekly_returns_breakdown(self, client_id: int, week_start: str, week_end: str) -> str:
+        return self.get_weekly_returns_breakdowns([client_id], week_start, week_end).get(int(client_id), "0")
+
+    def get_weekly_returns_breakdowns(self, client_ids: List[int], week_start: str, week_end: str) -> Dict[int, str]:
+        """Empty cylinders returned in the week as short text, keyed by client id."""
         query = '''
-            SELECT string_agg(summary, ', ') as result FROM (
+            SELECT client_id, string_agg(summary, ', ') as result FROM (
                 SELECT 
+                    client_id,
                     CASE 
                         WHEN gas_type = 'LPG' THEN 'L'
                         WHEN gas_type = 'Oxygen' THEN 'O2'
@@ -2367,25 +4527,32 @@ class DatabaseManager:
                     END || ' ' || SUM(qty)::text as summary
                 FROM (
                     SELECT 
+                        client_id,
                         gas_type,
                         sub_type,
                         CASE WHEN gas_type='LPG' AND capacity IN ('12kg','15kg') THEN '12/15kg' ELSE capacity END AS cap_group,
                         quantity as qty
                     FROM cylinder_returns
-                                        WHERE client_id = ?
+                                        WHERE client_id = ANY(?::bigint[])
                                             AND created_at >= (?::date)
                                             AND created_at < (?::date + INTERVAL '1 day')
                 ) t
-                GROUP BY gas_type, sub_type, cap_group
-            )
+                GROUP BY client_id, gas_type, sub_type, cap_group
+            ) s
+            GROUP BY client_id
         '''
-        rows = self.execute_query(query, (client_id, week_start, week_end))
-        return rows[0]['result'] if rows and rows[0]['result'] else "0"
+        rows = self.execute_query(query, ([int(c) for c in client_ids], week_start, week_end))
+        return {int(r['client_id']): r['result'] or "0" for r in rows}
 
     def get_weekly_sales_breakdown(self, client_id: int, week_start: str, week_end: str) -> str:
+        return self.get_weekly_sales_breakdowns([client_id], week_start, week_end).get(int(client_id), "0")
+
+    def get_weekly_sales_breakdowns(self, client_ids: List[int], week_start: str, week_end: str) -> Dict[int, str]:
+        """Cylinders sold in the week as short text, keyed by client id."""
         query = '''
-            SELECT string_agg(summary, ', ') as result FROM (
+            SELECT client_id, string_agg(summary, ', ') as result FROM (
                 SELECT 
+                    t.client_id,
                     CASE 
                         WHEN gp.gas_type = 'LPG' THEN 'L'
                         WHEN gp.gas_type = 'Oxygen' THEN 'O2'
@@ -2408,31 +4575,35 @@ class DatabaseManager:
                     END || ' ' || SUM(qty)::text as summary
                 FROM (
                     SELECT 
+                        s.client_id,
                         si.gas_product_id,
                         si.quantity as qty,
                         CASE WHEN gp.gas_type='LPG' AND gp.capacity IN ('12kg','15kg') THEN '12/15kg' ELSE gp.capacity END AS cap_group
                     FROM sale_items si
                     JOIN sales s ON si.sale_id = s.id
                     JOIN gas_products gp ON si.gas_product_id = gp.id
-                                        WHERE s.client_id = ?
+                                        WHERE s.client_id = ANY(?::bigint[])
                                             AND s.created_at >= (?::date)
                                             AND s.created_at < (?::date + INTERVAL '1 day')
                     UNION ALL
                     SELECT 
+                        s.client_id,
                         s.gas_product_id,
                         s.quantity as qty,
                         CASE WHEN gp.gas_type='LPG' AND gp.capacity IN ('12kg','15kg') THEN '12/15kg' ELSE gp.capacity END AS cap_group
                     FROM sales s
                     LEFT JOIN sale_items si ON si.sale_id = s.id
                     JOIN gas_products gp ON s.gas_product_id = gp.id
-                                        WHERE s.client_id = ?
+                                        WHERE s.client_id = ANY(?::bigint[])
                                             AND si.id IS NULL
                                             AND s.created_at >= (?::date)
                                             AND s.created_at < (?::date + INTERVAL '1 day')
                 ) t
                 JOIN gas_products gp ON t.gas_product_id = gp.id
-                GROUP BY gp.gas_type, gp.sub_type, cap_group
-            )
+                GROUP BY t.client_id, gp.gas_type, gp.sub_type, cap_group
+            ) s
+            GROUP BY client_id
         '''
-        rows = self.execute_query(query, (client_id, week_start, week_end, client_id, week_start, week_end))
-        return rows[0]['result'] if rows and rows[0]['result'] else "0"
+        ids = [int(c) for c in client_ids]
+        rows = self.execute_query(query, (ids, week_start, week_end, ids, week_start, week_end))
+        return {int(r['client_id']): r['result'] or "0" for r in rows}
@@ -0,0 +1,206 @@
+"""Index review: turn captured query fingerprints into index proposals.
+
+Fingerprints come from DatabaseManager's query instrumentation (in-process stats
+plus whatever has been flushed into the query_fingerprints table). Each fingerprint
+is parsed for equality filters, range filters and ORDER BY columns per table; a
+proposal is emitted when no existing index starts with the same columns.
+
+Run with:  python -m src.database_module.index_review [--min-calls N] [--limit N]
+"""
+import argparse
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database_manager import DatabaseManager
+
+_SQL_KEYWORDS = {
+    "where", "join", "left", "right", "inner", "outer", "on", "group", "order", "limit",
+    "union", "select", "as", "using", "lateral", "cross", "full", "having", "and", "or",
+}
+
+_TABLE_REF = re.compile(r"\b(?:from|join)\s+([a-z_][a-z0-9_]*)(?:\s+(?:as\s+)?([a-z_][a-z0-9_]*))?", re.IGNORECASE)
+_EQUALITY = re.compile(r"(?:\b([a-z_][a-z0-9_]*)\.)?\b([a-z_][a-z0-9_]*)\s*=\s*\(?\?", re.IGNORECASE)
+_RANGE = re.compile(r"(?:\b([a-z_][a-z0-9_]*)\.)?\b([a-z_][a-z0-9_]*)\s*(?:>=|<=|<|>)\s*\(?\?", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\border\s+by\s+(.+?)(?:\blimit\b|\)|$)", re.IGNORECASE)
+_INDEX_COLUMNS = re.compile(r"\((.+?)\)(?:\s+INCLUDE|\s+WHERE|$)", re.IGNORECASE)
+
+
+def _table_aliases(fingerprint: str) -> Dict[str, str]:
+    aliases: Dict[str, str] = {}
+    for table, alias in _TABLE_REF.findall(fingerprint):
+        table = table.lower()
+        aliases[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def _resolve(aliases: Dict[str, str], qualifier: str, column: str, columns_by_table: Dict[str, set]) -> Optional[str]:
+    if qualifier:
+        table = aliases.get(qualifier.lower())
+        return table if table and column in columns_by_table.get(table, set()) else None
+    owners = {t for t in set(aliases.values()) if column in columns_by_table.get(t, set())}
+    return owners.pop() if len(owners) == 1 else None
+
+
+def extract_access_paths(fingerprint: str, columns_by_table: Dict[str, set]) -> Dict[str, Dict[str, List[str]]]:
+    """Return {table: {'equality': [...], 'range': [...], 'order': [...]}} for one fingerprint."""
+    aliases = _table_aliases(fingerprint)
+    paths: Dict[str, Dict[str, List[str]]] = {}
+
+    def add(kind: str, qualifier: str, column: str):
+        column = column.lower()
+        table = _resolve(aliases, qualifier, column, columns_by_table)
+        if not table:
+            return
+        bucket = paths.setdefault(table, {'equality': [], 'range': [], 'order': []})
+        if column not in bucket[kind]:
+            bucket[kind].append(column)
+
+    for qualifier, column in _EQUALITY.findall(fingerprint):
+        add('equality', qualifier, column)
+    for qualifier, column in _RANGE.findall(fingerprint):
+        add('range', qualifier, column)
+    for clause in _ORDER_BY.findall(fingerprint):
+        for part in clause.split(","):
+            m = re.match(r"\s*(?:([a-z_][a-z0-9_]*)\.)?([a-z_][a-z0-9_]*)", part, re.IGNORECASE)
+            if m:
+                add('order', m.group(1) or "", m.group(2))
+    return paths
+
+
+def _candidate_columns(path: Dict[str, List[str]]) -> List[str]:
+    columns = list(path['equality'])
+    for column in path['range'][:1] + path['order'][:1]:
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _index_leading_columns(indexdef: str) -> List[str]:
+    m = _INDEX_COLUMNS.search(indexdef)
+    if not m:
+        return []
+    columns = []
+    for part in m.group(1).split(","):
+        token = part.strip().split(" ")[0].strip('"').lower()
+        if token:
+            columns.append(token)
+    return columns
+
+
+def _is_covered(candidate: List[str], existing: List[List[str]], equality_count: int = 0) -> bool:
+    """True if an index starts with the candidate's columns.
+
+    The first equality_count columns are equality filters and may appear in any order;
+    the range and sort columns after them must follow in the same order.
+    """
+    head, tail = candidate[:equality_count], candidate[equality_count:]
+    for index_columns in existing:
+        if len(index_columns) < len(candidate):
+            continue
+        if set(index_columns[:len(head)]) == set(head) and index_columns[len(head):len(candidate)] == tail:
+            return True
+    return False
+
+
+class IndexReview:
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    def _schema_columns(self) -> Dict[str, set]:
+        rows = self.db_manager.execute_query('''
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+        ''')
+        columns: Dict[str, set] = {}
+        for row in rows:
+            columns.setdefault(row['table_name'], set()).add(row['column_name'])
+        return columns
+
+    def _existing_indexes(self) -> Dict[str, List[List[str]]]:
+        rows = self.db_manager.execute_query('''
+            SELECT tablename, indexdef
+            FROM pg_indexes
+            WHERE schemaname = current_schema()
+        ''')
+        indexes: Dict[str, List[List[str]]] = {}
+        for row in rows:
+            indexes.setdefault(row['tablename'], []).append(_index_leading_columns(row['indexdef']))
+        return indexes
+
+    def fingerprints(self) -> List[Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        try:
+            stored = self.db_manager.execute_query(
+                'SELECT fingerprint, calls, total_ms, max_ms FROM query_fingerprints'
+            )
+        except Exception:
+            stored = []
+        for row in stored + self.db_manager.get_query_stats():
+            fp = row['fingerprint']
+            bucket = merged.setdefault(fp, {'fingerprint': fp, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            bucket['calls'] += int(row['calls'] or 0)
+            bucket['total_ms'] += float(row['total_ms'] or 0)
+            bucket['max_ms'] = max(bucket['max_ms'], float(row['max_ms'] or 0))
+        return sorted(merged.values(), key=lambda r: r['total_ms'], reverse=True)
+
+    def propose(self, min_calls: int = 1) -> List[Dict[str, Any]]:
+        columns_by_table = self._schema_columns()
+        existing = self._existing_indexes()
+        proposals: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        for fp in self.fingerprints():
+            if fp['calls'] < min_calls:
+                continue
+            for table, path in extract_access_paths(fp['fingerprint'], columns_by_table).items():
+                candidate = _candidate_columns(path)
+                if not candidate or candidate == ['id']:
+                    continue
+                if _is_covered(candidate, existing.get(table, []), len(path['equality'])):
+                    continue
+                key = (table, tuple(candidate))
+                proposal = proposals.get(key)
+                if proposal is None:
+                    name = f"idx_{table}_{'_'.join(candidate)}"[:63]
+                    proposal = {
+                        'table': table,
+                        'columns': candidate,
+                        'statement': f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(candidate)})",
+                        'calls': 0,
+                        'total_ms': 0.0,
+                        'example': fp['fingerprint'],
+                    }
+                    proposals[key] = proposal
+                proposal['calls'] += fp['calls']
+                proposal['total_ms'] += fp['total_ms']
+        return sorted(proposals.values(), key=lambda p: p['total_ms'], reverse=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Propose indexes from captured query fingerprints.")
+    parser.add_argument("--min-calls", type=int, default=5, help="Ignore fingerprints seen fewer times than this")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of proposals to print")
+    args = parser.parse_args()
+
+    # Keep the review's own catalog queries out of the fingerprint table.
+    os.environ.setdefault("PG_QUERY_STATS", "0")
+    db = DatabaseManager()
+    try:
+        proposals = IndexReview(db).propose(min_calls=args.min_calls)
+        if not proposals:
+            print("No missing indexes found for the captured query mix.")
+            return 0
+        for p in proposals[:args.limit]:
+            print(f"-- {p['calls']} calls, {p['total_ms']:.1f} ms total")
+            print(f"-- e.g. {p['example'][:200]}")
+            print(f"{p['statement']};")
+            print()
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
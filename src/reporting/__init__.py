@@ -0,0 +1,18 @@
+# Headless reporting engine: report specs, results and file writers (no Qt required)
+from .analytics import ANALYTICS_REPORTS, PERIODS
+from .cache import ReportCache
+from .catalog import REPORTS, get_report
+from .export import EXPORTERS, export_report
+from .pack import MONTH_END_PACK, PACK_FORMATS, PACKS, PackEntry, run_pack, write_pack
+from .spec import Metric, ReportAccumulator, ReportColumn, ReportResult, ReportSpec, fetch_page, run_report
+from .writers import render_html, write_pdf
+
+__all__ = [
+    'ANALYTICS_REPORTS', 'PERIODS',
+    'ReportCache',
+    'REPORTS', 'get_report',
+    'EXPORTERS', 'export_report',
+    'MONTH_END_PACK', 'PACK_FORMATS', 'PACKS', 'PackEntry', 'run_pack', 'write_pack',
+    'Metric', 'ReportAccumulator', 'ReportColumn', 'ReportResult', 'ReportSpec', 'fetch_page', 'run_report',
+    'render_html', 'write_pdf',
+]
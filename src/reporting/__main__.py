@@ -0,0 +1,95 @@
+"""Run a report without the GUI.
+
+    python -m src.reporting "Sales Report" --from 2026-01-01 --to 2026-01-31 --format csv --out sales.csv
+
+CSV, NDJSON, JSON and XLSX are streamed from the database; PDF is laid out from the full result.
+    python -m src.reporting --list
+
+Gas Type Trend, Client Profitability and Supplier Fill Margin are computed with NumPy;
+--period week|month sets the trend's buckets:
+    python -m src.reporting "Gas Type Trend" --from 2023-01-01 --to 2026-12-31 --period week
+
+A pack runs several reports concurrently and bundles them into one PDF or XLSX file:
+    python -m src.reporting --pack month-end --from 2026-01-01 --to 2026-01-31 --format pdf --out month.pdf
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from src.database_module import DatabaseManager
+
+from .analytics import PERIODS
+from .catalog import REPORTS, get_report
+from .export import EXPORTERS, export_report
+from .pack import PACK_FORMATS, PACKS, run_pack, write_pack
+from .spec import run_report
+from .writers import write_pdf
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a report from the command line.")
+    parser.add_argument("report", nargs="?", help="Report name, e.g. \"Sales Report\"")
+    parser.add_argument("--list", action="store_true", help="List the available reports")
+    parser.add_argument("--pack", choices=sorted(PACKS), help="Run a pack of reports into one --out file")
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat,
+                        default=date.today() - timedelta(days=30), help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat, default=date.today(),
+                        help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--period", choices=PERIODS, default='month', help="Trend buckets (default month)")
+    parser.add_argument("--format", choices=sorted(list(EXPORTERS) + ['pdf']),
+                        help="Write the rows to --out in this format")
+    parser.add_argument("--out", help="Output file")
+    args = parser.parse_args()
+
+    if args.pack:
+        if args.format not in PACK_FORMATS or not args.out:
+            parser.error(f"--pack needs --out and --format {' or '.join(PACK_FORMATS)}")
+        return run_pack_command(args)
+    if args.list or not args.report:
+        for name in REPORTS:
+            print(name)
+        return 0
+    if bool(args.format) != bool(args.out):
+        parser.error("--format and --out go together")
+
+    spec = get_report(args.report)
+    params = {'from_date': args.from_date, 'to_date': args.to_date, 'period': args.period}
+    db = DatabaseManager()
+    try:
+        if args.format in EXPORTERS:
+            result = export_report(
+                db, spec, params, args.format, args.out,
+                progress=lambda n: print(f"  {n} rows...", end="\r", flush=True),
+            )
+            count = result.row_count
+        else:
+            result = run_report(db, spec, params)
+            count = write_pdf(result, args.out) if args.format == 'pdf' else len(result.rows)
+    finally:
+        db.close()
+    print(result.summary_text())
+    if args.format:
+        print(f"\n{count} rows written to {args.out}")
+    return 0
+
+
+def run_pack_command(args) -> int:
+    params = {'from_date': args.from_date, 'to_date': args.to_date}
+    names = PACKS[args.pack]
+    print(f"Running {len(names)} reports for {args.from_date} to {args.to_date}...")
+    started = time.perf_counter()
+    db = DatabaseManager()
+    try:
+        entries = run_pack(db, names, params, progress=lambda entry: print(f"  {entry.status}", flush=True))
+    finally:
+        db.close()
+    title = f"{args.pack.replace('-', ' ').title()} Pack: {args.from_date} to {args.to_date}"
+    count = write_pack(entries, args.format, args.out, title)
+    failed = [e for e in entries if e.error is not None]
+    print(f"\n{count} rows from {len(entries) - len(failed)} reports written to {args.out} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
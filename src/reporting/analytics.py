@@ -0,0 +1,232 @@
+"""Analytics reports over long date ranges, computed a column at a time with NumPy.
+
+DatabaseManager.fetch_columns() returns sale_item_facts_query() as one list per column
+instead of a dict per row. The lists become NumPy arrays, and the group-bys, pivots and
+rolling sums below work on whole columns at once. Only the aggregated rows are handed
+back as report rows, so the Reports page, exports and packs treat these reports like any
+other. NumPy is optional: without it these reports fail with a message saying so.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .spec import INT, MONEY, Metric, ReportColumn, ReportSpec
+
+PERIODS = ('week', 'month')
+# Periods covered by the trend report's rolling revenue.
+ROLLING_WINDOW = 3
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("Analytics reports require numpy. Install dependencies from requirements.txt.") from e
+    return numpy
+
+
+def to_arrays(columns: Dict[str, list]) -> Dict[str, Any]:
+    """NumPy arrays for fetch_columns() lists: dates as datetime64[D], numbers as int64 or float64.
+
+    Numeric columns must not contain NULLs; COALESCE them in the query.
+    """
+    np = _numpy()
+    arrays = {}
+    for name, values in columns.items():
+        sample = next((v for v in values if v is not None), None)
+        if isinstance(sample, date):
+            arrays[name] = np.array(values, dtype='datetime64[D]')
+        elif isinstance(sample, int) and not isinstance(sample, bool):
+            arrays[name] = np.array(values, dtype=np.int64)
+        elif isinstance(sample, (float, Decimal)):
+            arrays[name] = np.array(values, dtype=np.float64)
+        else:
+            arrays[name] = np.array(values, dtype=object)
+    return arrays
+
+
+def fetch_sale_items(db, params: Dict[str, Any]) -> Dict[str, Any]:
+    return to_arrays(db.fetch_columns(*db.sale_item_facts_query(params['from_date'], params['to_date'])))
+
+
+def group_sum(arrays: Dict[str, Any], by: Sequence[str], values: Sequence[str]) -> Dict[str, Any]:
+    """Sum values per distinct combination of the by columns, plus a row count per group.
+
+    Returns columns: each by key, 'count' and each value, one entry per group in key order.
+    """
+    np = _numpy()
+    if not len(arrays[by[0]]):
+        out = {key: arrays[key][:0] for key in by}
+        out['count'] = np.zeros(0, dtype=np.int64)
+        out.update({key: np.zeros(0) for key in values})
+        return out
+    uniques, inverses = [], []
+    for key in by:
+        unique, inverse = np.unique(arrays[key], return_inverse=True)
+        uniques.append(unique)
+        inverses.append(inverse.reshape(-1))
+    shape = tuple(len(u) for u in uniques)
+    groups, group_of_row = np.unique(np.ravel_multi_index(inverses, shape), return_inverse=True)
+    group_of_row = group_of_row.reshape(-1)
+    out = {key: unique[index] for key, unique, index in zip(by, uniques, np.unravel_index(groups, shape))}
+    out['count'] = np.bincount(group_of_row, minlength=len(groups))
+    for key in values:
+        out[key] = np.bincount(group_of_row, weights=arrays[key], minlength=len(groups))
+    return out
+
+
+def pivot(row_index, column_index, weights, shape: Tuple[int, int]):
+    """A shape matrix of weights summed at (row_index, column_index)."""
+    np = _numpy()
+    flat = row_index * shape[1] + column_index
+    return np.bincount(flat, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+
+
+def period_start(days, period: str):
+    """The first day of each day's week (Saturday, as billing weeks) or month."""
+    np = _numpy()
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'week':
+        number = days.astype(np.int64)
+        # Day 2 of the epoch, 1970-01-03, was a Saturday.
+        return (number - (number - 2) % 7).astype('datetime64[D]')
+    raise ValueError(f"Unknown period: {period}")
+
+
+def period_range(starts, period: str):
+    """Every period start from the first to the last of starts, gaps included."""
+    np = _numpy()
+    if period == 'month':
+        months = starts.astype('datetime64[M]')
+        return np.arange(months.min(), months.max() + 1).astype('datetime64[D]')
+    return np.arange(starts.min(), starts.max() + np.timedelta64(1, 'D'), np.timedelta64(7, 'D'))
+
+
+def rolling_sum(matrix, window: int):
+    """Sum over each row and the window - 1 rows before it, per column."""
+    np = _numpy()
+    running = np.cumsum(matrix, axis=0)
+    out = running.copy()
+    out[window:] -= running[:-window]
+    return out
+
+
+def _period_label(start, period: str) -> str:
+    return str(start.astype('datetime64[M]')) if period == 'month' else str(start)
+
+
+def _fetch_gas_type_trend(db, params) -> List[Dict]:
+    np = _numpy()
+    period = params.get('period') or 'month'
+    facts = fetch_sale_items(db, params)
+    if not len(facts['day']):
+        return []
+    starts = period_start(facts['day'], period)
+    periods = period_range(starts, period)
+    gas_types, gas_index = np.unique(facts['gas_type'], return_inverse=True)
+    period_index = np.searchsorted(periods, starts)
+    shape = (len(periods), len(gas_types))
+    quantity = pivot(period_index, gas_index.reshape(-1), facts['quantity'], shape)
+    revenue = pivot(period_index, gas_index.reshape(-1), facts['revenue'], shape)
+    rolling = rolling_sum(revenue, ROLLING_WINDOW)
+    rows = []
+    for p, g in zip(*np.nonzero((quantity != 0) | (rolling != 0))):
+        rows.append({
+            'period': _period_label(periods[p], period),
+            'gas_type': str(gas_types[g]),
+            'total_quantity': int(quantity[p, g]),
+            'revenue': float(revenue[p, g]),
+            'rolling_revenue': float(rolling[p, g]),
+        })
+    return rows
+
+
+def _margin_rows(groups: Dict[str, Any], names: Sequence[str]) -> List[Dict]:
+    np = _numpy()
+    margin = groups['revenue'] - groups['fill_cost']
+    rows = []
+    for i in np.argsort(-margin, kind='stable'):
+        row = {name: str(groups[name][i] or '') for name in names}
+        row.update({
+            'item_count': int(groups['count'][i]),
+            'total_quantity': int(groups['quantity'][i]),
+            'revenue': float(groups['revenue'][i]),
+            'fill_cost': float(groups['fill_cost'][i]),
+            'margin': float(margin[i]),
+            'margin_pct': f"{margin[i] / groups['revenue'][i] * 100:.1f}%" if groups['revenue'][i] else '',
+        })
+        rows.append(row)
+    return rows
+
+
+def _fetch_client_profitability(db, params) -> List[Dict]:
+    groups = group_sum(fetch_sale_items(db, params), ('client_id', 'client_name'), ('quantity', 'revenue', 'fill_cost'))
+    return _margin_rows(groups, ('client_name',))
+
+
+def _fetch_supplier_fill_margin(db, params) -> List[Dict]:
+    groups = group_sum(fetch_sale_items(db, params), ('supplier_name',), ('quantity', 'revenue', 'fill_cost'))
+    return _margin_rows(groups, ('supplier_name',))
+
+
+def _margin_tone(value) -> str:
+    return 'negative' if value < 0 else ''
+
+
+def _margin_columns() -> List[ReportColumn]:
+    return [
+        ReportColumn('item_count', "Items", INT, total=True),
+        ReportColumn('total_quantity', "Quantity", INT, total=True),
+        ReportColumn('revenue', "Revenue", MONEY, total=True),
+        ReportColumn('fill_cost', "Fill Cost", MONEY, total=True),
+        ReportColumn('margin', "Margin", MONEY, total=True, tone=_margin_tone),
+        ReportColumn('margin_pct', "Margin %"),
+    ]
+
+
+def _margin_metrics(count_label: str) -> List[Metric]:
+    return [
+        Metric(count_label),
+        Metric("Revenue", 'sum', 'revenue', MONEY),
+        Metric("Fill Cost", 'sum', 'fill_cost', MONEY),
+        Metric("Margin", 'sum', 'margin', MONEY),
+        Metric("Loss-Making", where=lambda r: r['margin'] < 0),
+    ]
+
+
+GAS_TYPE_TREND = ReportSpec(
+    name="Gas Type Trend",
+    heading="GAS TYPE TREND",
+    columns=[
+        ReportColumn('period', "Period"),
+        ReportColumn('gas_type', "Gas Type"),
+        ReportColumn('total_quantity', "Quantity", INT, total=True),
+        ReportColumn('revenue', "Revenue", MONEY, total=True),
+        ReportColumn('rolling_revenue', f"Revenue, Last {ROLLING_WINDOW} Periods", MONEY),
+    ],
+    fetch=_fetch_gas_type_trend,
+    metrics=[
+        Metric("Total Quantity", 'sum', 'total_quantity', suffix=" cylinders"),
+        Metric("Total Revenue", 'sum', 'revenue', MONEY),
+    ],
+)
+
+CLIENT_PROFITABILITY = ReportSpec(
+    name="Client Profitability",
+    heading="CLIENT PROFITABILITY",
+    columns=[ReportColumn('client_name', "Client")] + _margin_columns(),
+    fetch=_fetch_client_profitability,
+    metrics=_margin_metrics("Clients"),
+)
+
+SUPPLIER_FILL_MARGIN = ReportSpec(
+    name="Supplier Fill Margin",
+    heading="SUPPLIER FILL MARGIN",
+    columns=[ReportColumn('supplier_name', "Source")] + _margin_columns(),
+    fetch=_fetch_supplier_fill_margin,
+    metrics=_margin_metrics("Sources"),
+)
+
+ANALYTICS_REPORTS = (GAS_TYPE_TREND, CLIENT_PROFITABILITY, SUPPLIER_FILL_MARGIN)
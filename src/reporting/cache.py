@@ -0,0 +1,74 @@
+"""Cache of generated reports, so re-showing an unchanged report costs no queries.
+
+Entries are keyed by report name and parameters and remember DatabaseManager.data_version
+as it was before the report ran. Any local write or change notification from another
+terminal bumps that version, so a hit is only served while nothing can have changed.
+MAX_AGE_S bounds how long an entry is trusted when live updates are disabled and other
+terminals' writes would go unnoticed.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .spec import ReportResult, ReportSpec, jsonable, run_report
+
+
+def cache_key(spec: ReportSpec, params: Optional[Dict[str, Any]], *variant: Hashable) -> Tuple[Hashable, ...]:
+    params = dict(params or {})
+    if not spec.uses_dates:
+        # The page always sends a date range; reports that ignore it share one entry.
+        params.pop('from_date', None)
+        params.pop('to_date', None)
+    return (spec.name,) + tuple(sorted((k, jsonable(v)) for k, v in params.items())) + variant
+
+
+class ReportCache:
+    MAX_ENTRIES = 32
+    MAX_AGE_S = 300.0
+
+    def __init__(self, max_entries: Optional[int] = None, max_age_s: Optional[float] = None):
+        self.max_entries = int(max_entries or self.MAX_ENTRIES)
+        self.max_age_s = float(self.MAX_AGE_S if max_age_s is None else max_age_s)
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, ReportResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db, spec: ReportSpec, params: Optional[Dict[str, Any]], *variant: Hashable) -> Optional[ReportResult]:
+        """variant: anything else the result depends on, e.g. the page size and sort."""
+        key = cache_key(spec, params, *variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, stored_at, result = entry
+            if version != db.data_version or time.monotonic() - stored_at > self.max_age_s:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, spec: ReportSpec, params: Optional[Dict[str, Any]], version: int, result: ReportResult,
+            *variant: Hashable):
+        key = cache_key(spec, params, *variant)
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def run(self, db, spec: ReportSpec, params: Optional[Dict[str, Any]] = None,
+            page_size: Optional[int] = None, sort: Optional[Tuple[str, bool]] = None) -> ReportResult:
+        """The cached result for spec and params, or run_report() and cache it."""
+        result = self.get(db, spec, params, page_size, sort)
+        if result is not None:
+            return result
+        # Read the version first: a write that lands while the report runs leaves the entry stale.
+        version = db.data_version
+        result = run_report(db, spec, params, page_size, sort)
+        self.put(spec, params, version, result, page_size, sort)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,256 @@
+"""The reports offered on the Reports page, in menu order."""
+
+from typing import Dict
+
+from .analytics import ANALYTICS_REPORTS
+from .spec import DATETIME, INT, MONEY, Metric, ReportColumn, ReportSpec
+
+
+def _red_if_positive(value) -> str:
+    return 'negative' if value > 0 else ''
+
+
+SALES_REPORT = ReportSpec(
+    name="Sales Report",
+    heading="SALES REPORT",
+    columns=[
+        ReportColumn('created_at', "Date", DATETIME),
+        ReportColumn('client_name', "Client"),
+        ReportColumn('product_summary', "Products"),
+        ReportColumn('source_summary', "Sources", source=lambda r: r.get('source_summary') or 'Company Stock'),
+        ReportColumn('quantities_summary', "Quantities",
+                     source=lambda r: r.get('quantities_summary') or str(r.get('quantity') or '')),
+        ReportColumn('unit_price', "Unit Price", MONEY),
+        ReportColumn('subtotal', "Subtotal", MONEY, total=True),
+        ReportColumn('tax_amount', "Tax", MONEY, total=True),
+        ReportColumn('total_amount', "Total", MONEY, total=True),
+    ],
+    fetch=lambda db, p: db.get_sales_report(p['from_date'], p['to_date']),
+    query=lambda db, p: db.sales_report_query(p['from_date'], p['to_date']),
+    key='id',
+    default_sort=('created_at', True),
+    metrics=[
+        Metric("Total Sales", 'sum', 'total_amount', MONEY),
+        Metric("Total Tax", 'sum', 'tax_amount', MONEY),
+        Metric("Total Quantity", 'sum', 'quantity', suffix=" cylinders"),
+        Metric("Number of Transactions"),
+    ],
+)
+
+SUPPLIER_SALES_SUMMARY = ReportSpec(
+    name="Supplier Sales Summary",
+    heading="SUPPLIER SALES SUMMARY",
+    columns=[
+        ReportColumn('supplier_name', "Source"),
+        ReportColumn('client_count', "Clients", INT),
+        ReportColumn('transaction_count', "Transactions", INT, total=True),
+        ReportColumn('total_quantity', "Quantity", INT, total=True),
+        ReportColumn('subtotal', "Subtotal", MONEY, total=True),
+        ReportColumn('tax_amount', "Tax", MONEY, total=True),
+        ReportColumn('total_amount', "Total", MONEY, total=True),
+        ReportColumn('remaining_amount', "Remaining", MONEY, total=True),
+    ],
+    fetch=lambda db, p: db.get_supplier_sales_summary(p['from_date'], p['to_date'], p.get('supplier_id')),
+    query=lambda db, p: db.supplier_sales_summary_query(p['from_date'], p['to_date'], p.get('supplier_id')),
+    metrics=[
+        Metric("Suppliers / Sources"),
+        Metric("Total Sales", 'sum', 'total_amount', MONEY),
+        Metric("Allocated Paid", 'sum', 'allocated_paid', MONEY),
+        Metric("Remaining", 'sum', 'remaining_amount', MONEY),
+    ],
+)
+
+SUPPLIER_FILL_PAYMENT_SUMMARY = ReportSpec(
+    name="Supplier Fill Payment Summary",
+    heading="SUPPLIER FILL PAYMENT SUMMARY",
+    columns=[
+        ReportColumn('supplier_name', "Supplier"),
+        ReportColumn('total_cylinders', "Cylinders", INT, total=True),
+        ReportColumn('other_gas_total', "Other Gas Fill", MONEY, total=True),
+        ReportColumn('lpg_refill_total', "LPG Fill", MONEY, total=True),
+        ReportColumn('fill_total', "Fill Cost", MONEY, total=True),
+        ReportColumn('total_paid', "Paid", MONEY, total=True),
+        ReportColumn('remaining_amount', "Remaining", MONEY, total=True,
+                     tone=lambda v: 'negative' if v > 0 else 'positive'),
+        ReportColumn('last_payment_date', "Last Payment"),
+    ],
+    fetch=lambda db, p: db.get_supplier_fill_payment_summary(start_date=p['from_date'], end_date=p['to_date']),
+    metrics=[
+        Metric("Suppliers"),
+        Metric("Total Fill Cost", 'sum', 'fill_total', MONEY),
+        Metric("Total Paid", 'sum', 'total_paid', MONEY),
+        Metric("Remaining Supplier Balance", 'sum', 'remaining_amount', MONEY),
+    ],
+)
+
+OUTSTANDING_BALANCES = ReportSpec(
+    name="Outstanding Balances",
+    heading="OUTSTANDING BALANCES REPORT",
+    columns=[
+        ReportColumn('id', "Client ID", INT),
+        ReportColumn('name', "Name"),
+        ReportColumn('phone', "Phone"),
+        ReportColumn('company', "Company"),
+        ReportColumn('total_purchases', "Total Purchases", MONEY, total=True),
+        ReportColumn('balance', "Outstanding Balance", MONEY, total=True, tone=lambda v: 'negative'),
+    ],
+    fetch=lambda db, p: db.get_outstanding_balances(),
+    query=lambda db, p: db.outstanding_balances_query(),
+    key='id',
+    default_sort=('balance', True),
+    metrics=[
+        Metric("Total Outstanding", 'sum', 'balance', MONEY),
+        Metric("Number of Clients with Outstanding Balance"),
+    ],
+    uses_dates=False,
+)
+
+EMPLOYEE_REPORT = ReportSpec(
+    name="Employee Report",
+    heading="EMPLOYEE REPORT",
+    columns=[
+        ReportColumn('id', "ID", INT),
+        ReportColumn('name', "Name"),
+        ReportColumn('role', "Role"),
+        ReportColumn('salary', "Salary", MONEY, total=True),
+        ReportColumn('contact', "Contact"),
+    ],
+    fetch=lambda db, p: db.get_employees(),
+    query=lambda db, p: db.employees_query(),
+    metrics=[
+        Metric("Total Employees"),
+        Metric("Total Monthly Salary", 'sum', 'salary', MONEY),
+    ],
+    uses_dates=False,
+    breakdown=("Role Distribution", 'role'),
+)
+
+GAS_TYPE_SUMMARY = ReportSpec(
+    name="Gas Type Summary",
+    heading="GAS TYPE SUMMARY REPORT",
+    columns=[
+        ReportColumn('gas_type', "Gas Type"),
+        ReportColumn('sub_type', "Sub Type"),
+        ReportColumn('capacity', "Capacity"),
+        # A multi-product sale is a transaction of each of its products, so this column has no total.
+        ReportColumn('transaction_count', "Transactions", INT),
+        ReportColumn('line_count', "Lines", INT, total=True),
+        ReportColumn('total_quantity', "Quantity", INT, total=True),
+        ReportColumn('total_amount', "Total Sales", MONEY, total=True),
+    ],
+    fetch=lambda db, p: db.get_product_mix(p['from_date'], p['to_date']),
+    query=lambda db, p: db.product_mix_query(p['from_date'], p['to_date']),
+    metrics=[
+        Metric("Product Lines", 'sum', 'line_count'),
+        Metric("Total Quantity", 'sum', 'total_quantity', suffix=" cylinders"),
+        Metric("Total Sales", 'sum', 'total_amount', MONEY),
+    ],
+)
+
+CLIENT_SUMMARY = ReportSpec(
+    name="Client Summary",
+    heading="CLIENT SUMMARY REPORT",
+    columns=[
+        ReportColumn('id', "Client ID", INT),
+        ReportColumn('name', "Name"),
+        ReportColumn('phone', "Phone"),
+        ReportColumn('company', "Company"),
+        ReportColumn('total_purchases', "Total Purchases", MONEY, total=True),
+        ReportColumn('balance', "Outstanding Balance", MONEY, total=True, tone=_red_if_positive),
+    ],
+    fetch=lambda db, p: db.execute_query(*db.client_summary_query()),
+    query=lambda db, p: db.client_summary_query(),
+    key='id',
+    default_sort=('balance', True),
+    metrics=[
+        Metric("Total Clients"),
+        Metric("Total Purchases", 'sum', 'total_purchases', MONEY),
+        Metric("Total Outstanding", 'sum', 'balance', MONEY),
+        Metric("Clients with Outstanding Balance", where=lambda r: float(r.get('balance') or 0) > 0,
+               filter="balance > 0"),
+    ],
+    uses_dates=False,
+)
+
+PENDING_CYLINDER_SUMMARY = ReportSpec(
+    name="Pending Cylinder Summary by Client",
+    heading="PENDING CYLINDER SUMMARY BY CLIENT",
+    columns=[
+        ReportColumn('name', "Client"),
+        ReportColumn('phone', "Phone"),
+        ReportColumn('company', "Company"),
+        ReportColumn('pending_cylinders', "Pending Cylinders", INT, total=True, tone=_red_if_positive),
+    ],
+    fetch=lambda db, p: db.get_pending_cylinder_summary_by_client(),
+    metrics=[
+        Metric("Total Pending Cylinders", 'sum', 'pending_cylinders'),
+        Metric("Clients with Pending Cylinders", where=lambda r: int(r.get('pending_cylinders') or 0) > 0),
+    ],
+    uses_dates=False,
+)
+
+LPG_REFILL_REPORT = ReportSpec(
+    name="LPG Refill Report",
+    heading="LPG REFILL REPORT",
+    columns=[
+        ReportColumn('client_name', "Client"),
+        ReportColumn('client_phone', "Phone"),
+        ReportColumn('supplier_name', "Supplier"),
+        ReportColumn('capacity', "Capacity"),
+        ReportColumn('total_quantity', "Quantity", INT, total=True),
+        ReportColumn('total_amount', "Amount", MONEY, total=True),
+    ],
+    fetch=lambda db, p: db.get_lpg_refill_report(p['from_date'], p['to_date']),
+    metrics=[
+        Metric("Entries"),
+        Metric("Total Refilled Cylinders", 'sum', 'total_quantity'),
+        Metric("Total Refill Amount", 'sum', 'total_amount', MONEY),
+    ],
+)
+
+LPG_KHATA_SUMMARY = ReportSpec(
+    name="LPG Khata Summary",
+    heading="LPG KHATA SUMMARY",
+    columns=[
+        ReportColumn('client_name', "Client"),
+        ReportColumn('phone', "Phone"),
+        ReportColumn('company', "Company"),
+        ReportColumn('capacity', "Capacity"),
+        ReportColumn('delivered', "Delivered", INT, total=True),
+        ReportColumn('returned', "Returned", INT, total=True),
+        ReportColumn('refilled', "Refilled", INT, total=True),
+        ReportColumn('empty_balance', "Empty Balance", INT, total=True),
+    ],
+    fetch=lambda db, p: db.get_lpg_khata_summary(),
+    query=lambda db, p: db.lpg_khata_query(),
+    metrics=[
+        Metric("Clients / Rows"),
+        Metric("Pending With Client", 'sum', 'pending_client'),
+        Metric("Refilled", 'sum', 'refilled'),
+        Metric("Empty Balance", 'sum', 'empty_balance'),
+    ],
+    uses_dates=False,
+)
+
+REPORTS: Dict[str, ReportSpec] = {
+    spec.name: spec
+    for spec in (
+        SALES_REPORT,
+        SUPPLIER_SALES_SUMMARY,
+        SUPPLIER_FILL_PAYMENT_SUMMARY,
+        OUTSTANDING_BALANCES,
+        EMPLOYEE_REPORT,
+        GAS_TYPE_SUMMARY,
+        CLIENT_SUMMARY,
+        PENDING_CYLINDER_SUMMARY,
+        LPG_REFILL_REPORT,
+        LPG_KHATA_SUMMARY,
+    ) + ANALYTICS_REPORTS
+}
+
+
+def get_report(name: str) -> ReportSpec:
+    try:
+        return REPORTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown report: {name}") from None
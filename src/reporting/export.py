@@ -0,0 +1,161 @@
+"""Stream a report from the database straight into a CSV, NDJSON, JSON or XLSX file.
+
+Reports with a query are read through DatabaseManager.stream_query(), a server-side
+cursor, and each row is typed and written as it arrives. Totals and summary figures
+are added up from the same rows as they stream past, so they always match the file
+(a separate summary query could see writes the stream did not), memory stays flat
+however many rows the export has, and nothing is rendered on screen.
+"""
+
+import csv
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from .spec import MONEY, ReportAccumulator, ReportResult, ReportSpec, jsonable
+
+CHUNK_SIZE = 2000
+# Rows between progress callbacks.
+PROGRESS_EVERY = 1000
+
+
+def iter_source_rows(db, spec: ReportSpec, params: Dict[str, Any], chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    if spec.query is not None:
+        sql, sql_params = spec.query(db, params)
+        return db.stream_query(sql, sql_params, chunk_size)
+    return iter(spec.fetch(db, params))
+
+
+def _with_progress(rows: Iterable[Dict], progress: Optional[Callable[[int], None]]) -> Iterator[Dict]:
+    for count, row in enumerate(rows, 1):
+        yield row
+        if progress is not None and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+
+def _totals_row(acc: ReportAccumulator) -> list:
+    totals = acc.result().totals
+    return [totals.get(c.key, "Total" if i == 0 else '') for i, c in enumerate(acc.spec.columns)]
+
+
+def _write_csv(acc: ReportAccumulator, rows: Iterator[Dict], path: str):
+    columns = acc.spec.columns
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([c.title for c in columns])
+        for row in rows:
+            writer.writerow([row[c.key] for c in columns])
+        if any(c.total for c in columns):
+            writer.writerow(_totals_row(acc))
+
+
+def _write_ndjson(acc: ReportAccumulator, rows: Iterator[Dict], path: str):
+    columns = acc.spec.columns
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps({c.title: row[c.key] for c in columns}, ensure_ascii=False))
+            f.write("\n")
+
+
+def _write_json(acc: ReportAccumulator, rows: Iterator[Dict], path: str):
+    """The fields of ReportResult.as_dict(), written one row at a time."""
+    columns = acc.spec.columns
+    head = {
+        "report_type": acc.spec.name,
+        "parameters": {k: jsonable(v) for k, v in acc.params.items()},
+        "columns": [{"key": c.key, "title": c.title, "type": c.type} for c in columns],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(head, indent=2, ensure_ascii=False)[:-2])
+        f.write(',\n  "data": [')
+        for i, row in enumerate(rows):
+            f.write(",\n    " if i else "\n    ")
+            f.write(json.dumps({c.title: row[c.key] for c in columns}, ensure_ascii=False))
+        result = acc.result()
+        tail = {
+            "generated_date": result.generated_at.strftime("%Y-%m-%d"),
+            "summary": result.summary_text(),
+            "summary_values": {metric.label: value for metric, value in result.summary},
+            "totals": result.totals,
+        }
+        f.write("\n  ],\n")
+        f.write(json.dumps(tail, indent=2, ensure_ascii=False)[2:])
+        f.write("\n")
+
+
+def _open_workbook():
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError("Excel export requires openpyxl. Install dependencies from requirements.txt.") from e
+    # write_only streams rows to disk instead of building the sheet in memory.
+    return Workbook(write_only=True)
+
+
+def _xlsx_report_sheet(wb, spec: ReportSpec, rows: Iterable[Dict], totals: Callable[[], list]):
+    """Append a sheet of spec's rows; totals() is called after the last row for the totals line."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    columns = spec.columns
+    sheet = wb.create_sheet(spec.name[:31])
+    bold = Font(bold=True)
+
+    def cells(values, font=None):
+        out = []
+        for column, value in zip(columns, values):
+            cell = WriteOnlyCell(sheet, value=value)
+            if column.type == MONEY and not isinstance(value, str):
+                cell.number_format = '#,##0.00'
+            if font is not None:
+                cell.font = font
+            out.append(cell)
+        return out
+
+    sheet.append(cells([c.title for c in columns], bold))
+    for row in rows:
+        sheet.append(cells([row[c.key] for c in columns]))
+    if any(c.total for c in columns):
+        sheet.append(cells(totals(), bold))
+
+
+def _write_xlsx(acc: ReportAccumulator, rows: Iterator[Dict], path: str):
+    wb = _open_workbook()
+    _xlsx_report_sheet(wb, acc.spec, rows, lambda: _totals_row(acc))
+    summary = wb.create_sheet("Summary")
+    for line in acc.result().summary_lines():
+        summary.append([line])
+    wb.save(path)
+
+
+def write_xlsx_bundle(results: Sequence[ReportResult], path: str):
+    """One workbook with a sheet per report, then every report's summary on a Summary sheet."""
+    wb = _open_workbook()
+    for result in results:
+        _xlsx_report_sheet(wb, result.spec, result.rows, lambda r=result: [
+            r.totals.get(c.key, "Total" if i == 0 else '') for i, c in enumerate(r.columns)
+        ])
+    summary = wb.create_sheet("Summary")
+    for result in results:
+        for line in result.summary_lines():
+            summary.append([line])
+        summary.append([])
+    wb.save(path)
+
+
+EXPORTERS = {
+    'csv': _write_csv,
+    'ndjson': _write_ndjson,
+    'json': _write_json,
+    'xlsx': _write_xlsx,
+}
+
+
+def export_report(db, spec: ReportSpec, params: Optional[Dict[str, Any]], fmt: str, path: str,
+                  chunk_size: int = CHUNK_SIZE, progress: Optional[Callable[[int], None]] = None) -> ReportResult:
+    """Write the report to path as fmt; returns the summary and totals (without rows)."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    acc = ReportAccumulator(spec, params)
+    source = _with_progress(iter_source_rows(db, spec, acc.params, chunk_size), progress)
+    EXPORTERS[fmt](acc, (acc.add(r) for r in source), path)
+    return acc.result()
@@ -0,0 +1,96 @@
+"""Run a set of reports together and bundle them into one PDF or XLSX file.
+
+The reports run concurrently on a thread pool. DatabaseManager hands each query its own
+pooled connection, so a pack takes about as long as its slowest report instead of the
+sum of all of them. Results come back in pack order whatever order they finish in.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .catalog import get_report
+from .export import write_xlsx_bundle
+from .spec import ReportResult, ReportSpec, run_report
+from .writers import write_pdf_bundle
+
+MONTH_END_PACK = (
+    "Sales Report",
+    "Supplier Sales Summary",
+    "Supplier Fill Payment Summary",
+    "Outstanding Balances",
+    "Gas Type Summary",
+    "LPG Refill Report",
+    "LPG Khata Summary",
+)
+
+PACKS: Dict[str, Sequence[str]] = {
+    'month-end': MONTH_END_PACK,
+}
+PACK_FORMATS = ('pdf', 'xlsx')
+
+# Keeps a pack well inside the connection pool (PG_POOL_MAX, 10 by default).
+MAX_WORKERS = 4
+# Seconds between idle() calls while waiting for the next report to finish.
+POLL_INTERVAL_S = 0.1
+
+
+@dataclass
+class PackEntry:
+    spec: ReportSpec
+    result: Optional[ReportResult] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return f"{self.spec.name}: failed after {self.seconds:.2f}s ({self.error})"
+        return f"{self.spec.name}: {len(self.result.rows):,} rows in {self.seconds:.2f}s"
+
+
+def _timed_run(db, spec: ReportSpec, params: Dict[str, Any]) -> PackEntry:
+    started = time.perf_counter()
+    try:
+        result = run_report(db, spec, params)
+    except Exception as e:
+        return PackEntry(spec, seconds=time.perf_counter() - started, error=str(e))
+    return PackEntry(spec, result, time.perf_counter() - started)
+
+
+def run_pack(db, names: Sequence[str], params: Optional[Dict[str, Any]] = None,
+             max_workers: int = MAX_WORKERS, progress: Optional[Callable[[PackEntry], None]] = None,
+             idle: Optional[Callable[[], None]] = None) -> List[PackEntry]:
+    """Run the named reports concurrently; one entry per report, in the order given.
+
+    progress(entry) is called as each report finishes and idle() while waiting, both on
+    the calling thread, so a GUI can update itself from either. A failed report is
+    recorded in its entry and does not stop the others.
+    """
+    specs = [get_report(name) for name in names]
+    params = dict(params or {})
+    entries: Dict[str, PackEntry] = {}
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="report-pack") as pool:
+        pending = {pool.submit(_timed_run, db, spec, params) for spec in specs}
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL_S, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = future.result()
+                entries[entry.spec.name] = entry
+                if progress is not None:
+                    progress(entry)
+            if pending and idle is not None:
+                idle()
+    return [entries[spec.name] for spec in specs]
+
+
+def write_pack(entries: Sequence[PackEntry], fmt: str, path: str, title: str, generated_by: str = "") -> int:
+    """Bundle the reports that succeeded into one file; returns the number of rows written."""
+    results = [e.result for e in entries if e.result is not None]
+    if fmt == 'pdf':
+        return write_pdf_bundle(results, path, title, generated_by)
+    if fmt == 'xlsx':
+        write_xlsx_bundle(results, path)
+        return sum(len(r.rows) for r in results)
+    raise ValueError(f"Unknown pack format: {fmt}")
@@ -0,0 +1,351 @@
+"""Report specs and results.
+
+A ReportSpec says where a report's rows come from, which columns it shows and which
+summary figures it prints. run_report() executes a spec against a DatabaseManager and
+returns a ReportResult: typed rows, column totals and the summary, with no Qt involved,
+so the same result feeds the Reports page, the file writers and the command line.
+
+When a spec has a query, the totals, summary figures and breakdown are not added up in
+Python: summary_query() wraps the report's own SQL in one GROUPING SETS aggregate, so
+the database computes them and the detail rows can be paged or streamed separately.
+Specs with a key as well are paged: page_query() reads one page at a time by keyset on
+(sort column, key), sorted in the database on any column.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TEXT = 'text'
+INT = 'int'
+MONEY = 'money'
+DATETIME = 'datetime'
+
+NUMERIC_TYPES = (INT, MONEY)
+
+# How page_query() orders a column of each type and casts the previous page's key back.
+_SORT_EXPRESSIONS = {
+    MONEY: ("COALESCE({}, 0)", 'numeric'),
+    INT: ("COALESCE({}, 0)", 'bigint'),
+    DATETIME: ("{}", 'timestamptz'),
+    TEXT: ("COALESCE({}::text, '')", 'text'),
+}
+
+
+def coerce(value: Any, type_: str) -> Any:
+    if type_ == MONEY:
+        return round(float(value or 0), 2)
+    if type_ == INT:
+        return int(value or 0)
+    if value is None:
+        return ''
+    return str(value)
+
+
+def format_value(value: Any, type_: str) -> str:
+    if type_ == MONEY:
+        return f"Rs. {float(value or 0):,.2f}"
+    if type_ == INT:
+        return str(int(value or 0))
+    if type_ == DATETIME:
+        return str(value or '')[:16]
+    return '' if value is None else str(value)
+
+
+@dataclass
+class ReportColumn:
+    key: str
+    title: str
+    type: str = TEXT
+    # Reads the value from a source row; defaults to row[key].
+    source: Optional[Callable[[Dict], Any]] = None
+    # Sum this column into ReportResult.totals.
+    total: bool = False
+    # 'negative' / 'positive' / 'warning' for a value, so viewers can colour it their own way.
+    tone: Optional[Callable[[Any], Optional[str]]] = None
+
+    def read(self, row: Dict) -> Any:
+        return coerce(self.source(row) if self.source else row.get(self.key), self.type)
+
+    def format(self, value: Any) -> str:
+        return format_value(value, self.type)
+
+    @property
+    def numeric(self) -> bool:
+        return self.type in NUMERIC_TYPES
+
+
+@dataclass
+class Metric:
+    """One summary line: a count of rows or a sum of a column, optionally over matching rows only."""
+
+    label: str
+    agg: str = 'count'
+    key: Optional[str] = None
+    type: str = INT
+    where: Optional[Callable[[Dict], bool]] = None
+    suffix: str = ''
+    # The SQL form of where, over the report query's columns, for the server-side summary.
+    filter: Optional[str] = None
+
+    def __post_init__(self):
+        if self.agg not in ('count', 'sum'):
+            raise ValueError(f"Unknown metric aggregate: {self.agg}")
+
+    def sql(self) -> Optional[str]:
+        """The aggregate for summary_query(), or None when where has no SQL form."""
+        if self.where is not None and self.filter is None:
+            return None
+        expr = "COUNT(*)" if self.agg == 'count' else f'COALESCE(SUM("{self.key}"), 0)'
+        return f"{expr} FILTER (WHERE {self.filter})" if self.filter else expr
+
+    def step(self, row: Dict) -> float:
+        """This row's contribution to the metric."""
+        if self.where is not None and not self.where(row):
+            return 0
+        return 1 if self.agg == 'count' else float(row.get(self.key) or 0)
+
+
+@dataclass
+class ReportSpec:
+    name: str
+    heading: str
+    columns: List[ReportColumn]
+    # fetch(db, params) -> source rows; params holds from_date / to_date and any filters.
+    fetch: Callable[[Any, Dict[str, Any]], List[Dict]]
+    # query(db, params) -> (sql, sql_params) for the same rows, so large reports can be streamed.
+    query: Optional[Callable[[Any, Dict[str, Any]], Tuple[str, tuple]]] = None
+    metrics: List[Metric] = field(default_factory=list)
+    uses_dates: bool = True
+    # (title, key): a "title:" block listing the row count per distinct value of key.
+    breakdown: Optional[Tuple[str, str]] = None
+    # Unique row id in the query's rows; with a query, the report is paged by keyset.
+    key: Optional[str] = None
+    # (column key, descending) for the first page when the viewer has not picked a sort.
+    default_sort: Optional[Tuple[str, bool]] = None
+
+    @property
+    def pageable(self) -> bool:
+        return self.key is not None and self.query is not None
+
+    def type_row(self, source: Dict) -> Dict[str, Any]:
+        """The typed column values of a source row, plus its key and page_key for paging."""
+        row = {c.key: c.read(source) for c in self.columns}
+        if self.key is not None and self.key not in row:
+            row[self.key] = source.get(self.key)
+        if 'page_key' in source:
+            row['page_key'] = source['page_key']
+        return row
+
+
+@dataclass
+class ReportResult:
+    spec: ReportSpec
+    params: Dict[str, Any]
+    rows: List[Dict[str, Any]]
+    totals: Dict[str, Any]
+    summary: List[Tuple[Metric, Any]]
+    breakdown: List[Tuple[str, int]]
+    generated_at: datetime
+    # Rows the report produced; equals len(rows) unless the rows were streamed to a file
+    # or only the first page was read.
+    row_count: int = 0
+    # (column key, descending) the rows were read in, for paged results.
+    sort: Optional[Tuple[str, bool]] = None
+
+    @property
+    def complete(self) -> bool:
+        return len(self.rows) >= self.row_count
+
+    @property
+    def columns(self) -> List[ReportColumn]:
+        return self.spec.columns
+
+    def summary_lines(self) -> List[str]:
+        lines = [self.spec.heading]
+        if self.spec.uses_dates:
+            lines.append(f"Period: {self.params.get('from_date')} to {self.params.get('to_date')}")
+        for metric, value in self.summary:
+            lines.append(f"{metric.label}: {format_value(value, metric.type)}{metric.suffix}")
+        if self.spec.breakdown:
+            lines.append("")
+            lines.append(f"{self.spec.breakdown[0]}:")
+            lines.extend(f"{name}: {count}" for name, count in self.breakdown)
+        return lines
+
+    def summary_text(self) -> str:
+        return "\n".join(self.summary_lines())
+
+    def formatted_rows(self) -> List[List[str]]:
+        return [[c.format(row[c.key]) for c in self.columns] for row in self.rows]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "report_type": self.spec.name,
+            "generated_date": self.generated_at.strftime("%Y-%m-%d"),
+            "parameters": {k: jsonable(v) for k, v in self.params.items()},
+            "summary": self.summary_text(),
+            "summary_values": {metric.label: value for metric, value in self.summary},
+            "columns": [{"key": c.key, "title": c.title, "type": c.type} for c in self.columns],
+            "totals": self.totals,
+            "data": [{c.title: row[c.key] for c in self.columns} for row in self.rows],
+        }
+
+
+def summary_query(db, spec: ReportSpec, params: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+    """(sql, sql_params) for the report's totals, metrics and breakdown in a single query.
+
+    The report query becomes a subquery, aggregated over GROUPING SETS ((breakdown key), ()):
+    the row with rolled_up = 1 holds the grand totals, the others the breakdown counts.
+    Returns None if the spec has no query or a figure can only be computed in Python.
+    """
+    if spec.query is None or any(c.source is not None for c in spec.columns if c.total):
+        return None
+    metrics = [m.sql() for m in spec.metrics]
+    if None in metrics:
+        return None
+    select = ["COUNT(*) AS row_count"]
+    select += [f'COALESCE(SUM("{c.key}"), 0) AS "total_{i}"' for i, c in enumerate(spec.columns) if c.total]
+    select += [f'{expr} AS "metric_{i}"' for i, expr in enumerate(metrics)]
+    if spec.breakdown:
+        key = spec.breakdown[1]
+        select += [f'"{key}" AS breakdown_key', f'GROUPING("{key}") AS rolled_up']
+        grouping = f'GROUP BY GROUPING SETS (("{key}"), ()) ORDER BY rolled_up DESC, breakdown_key'
+    else:
+        select.append("1 AS rolled_up")
+        grouping = ""
+    sql, sql_params = spec.query(db, params)
+    return f"SELECT {', '.join(select)} FROM ({sql}) report {grouping}", tuple(sql_params)
+
+
+def page_query(db, spec: ReportSpec, params: Dict[str, Any], sort: Optional[Tuple[str, bool]] = None,
+               after: Optional[Dict[str, Any]] = None, limit: int = 200) -> Tuple[str, tuple]:
+    """(sql, sql_params) for the next limit rows of a pageable report after the row after.
+
+    Rows are ordered by (sort column, key) and a page starts strictly after the previous
+    page's last row instead of at an OFFSET, so every page costs the same however deep.
+    The sort value is returned as page_key text so no precision is lost between pages.
+    """
+    if not spec.pageable:
+        raise ValueError(f"{spec.name} cannot be paged")
+    sort_key, descending = sort or spec.default_sort or (spec.key, False)
+    if sort_key == spec.key:
+        template, cast = "{}", 'bigint'
+    else:
+        column = next((c for c in spec.columns if c.key == sort_key), None)
+        if column is None:
+            raise ValueError(f"Unknown sort column for {spec.name}: {sort_key}")
+        template, cast = _SORT_EXPRESSIONS.get(column.type, _SORT_EXPRESSIONS[TEXT])
+    expr = template.format(f'"{sort_key}"')
+    key = f'"{spec.key}"'
+    direction = "DESC" if descending else "ASC"
+    sql, sql_params = spec.query(db, params)
+    where = ""
+    args = tuple(sql_params)
+    if after is not None:
+        where = f"WHERE ({expr}, {key}) {'<' if descending else '>'} (?::{cast}, ?)"
+        args += (after['page_key'], after[spec.key])
+    return (
+        f"SELECT *, ({expr})::text AS page_key FROM ({sql}) report {where} "
+        f"ORDER BY {expr} {direction}, {key} {direction} LIMIT {int(limit)}",
+        args,
+    )
+
+
+def fetch_page(db, spec: ReportSpec, params: Optional[Dict[str, Any]], sort: Optional[Tuple[str, bool]] = None,
+               after: Optional[Dict[str, Any]] = None, limit: int = 200) -> List[Dict[str, Any]]:
+    """Typed rows of one page; see page_query()."""
+    return [spec.type_row(r) for r in db.execute_query(*page_query(db, spec, dict(params or {}), sort, after, limit))]
+
+
+def jsonable(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class ReportAccumulator:
+    """Types source rows one at a time while keeping the totals, metrics and breakdown.
+
+    run_report() keeps the typed rows; the streaming exporters write each one out and
+    only hold on to the running figures. After load_summary() the figures come from the
+    database and add() only types rows.
+    """
+
+    def __init__(self, spec: ReportSpec, params: Optional[Dict[str, Any]] = None):
+        self.spec = spec
+        self.params = dict(params or {})
+        self.count = 0
+        self._totals = {c.key: 0 for c in spec.columns if c.total}
+        self._metrics = [0.0 for _ in spec.metrics]
+        self._breakdown: Dict[str, int] = {}
+        # Rows the database summary covered; set by load_summary().
+        self.summary_count: Optional[int] = None
+
+    def load_summary(self, db) -> bool:
+        """Take the totals, metrics and breakdown from summary_query() instead of adding them up.
+
+        Returns False (and keeps accumulating) when the spec has no server-side summary.
+        """
+        query = summary_query(db, self.spec, self.params)
+        if query is None:
+            return False
+        for row in db.execute_query(*query):
+            if int(row['rolled_up']):
+                self.summary_count = int(row['row_count'] or 0)
+                self._totals = {c.key: row[f"total_{i}"] for i, c in enumerate(self.spec.columns) if c.total}
+                self._metrics = [float(row[f"metric_{i}"] or 0) for i in range(len(self.spec.metrics))]
+            else:
+                name = str(row['breakdown_key'] or '')
+                self._breakdown[name] = self._breakdown.get(name, 0) + int(row['row_count'] or 0)
+        return self.summary_count is not None
+
+    def add(self, source: Dict) -> Dict[str, Any]:
+        row = self.spec.type_row(source)
+        self.count += 1
+        if self.summary_count is not None:
+            return row
+        for key in self._totals:
+            self._totals[key] += row[key]
+        for i, metric in enumerate(self.spec.metrics):
+            self._metrics[i] += metric.step(source)
+        if self.spec.breakdown:
+            name = str(source.get(self.spec.breakdown[1]) or '')
+            self._breakdown[name] = self._breakdown.get(name, 0) + 1
+        return row
+
+    def result(self, rows: Optional[List[Dict[str, Any]]] = None) -> ReportResult:
+        types = {c.key: c.type for c in self.spec.columns}
+        return ReportResult(
+            spec=self.spec,
+            params=self.params,
+            rows=rows if rows is not None else [],
+            totals={key: coerce(value, types[key]) for key, value in self._totals.items()},
+            summary=[
+                (m, int(value) if m.agg == 'count' else coerce(value, m.type))
+                for m, value in zip(self.spec.metrics, self._metrics)
+            ],
+            breakdown=list(self._breakdown.items()),
+            generated_at=datetime.now(),
+            row_count=self.count,
+        )
+
+
+def run_report(db, spec: ReportSpec, params: Optional[Dict[str, Any]] = None,
+               page_size: Optional[int] = None, sort: Optional[Tuple[str, bool]] = None) -> ReportResult:
+    """Run a report; with page_size, a pageable report only reads its first page.
+
+    A paged result has the totals and summary of the whole report, row_count from the
+    summary query and the first page_size rows in sort order; fetch_page() reads on.
+    """
+    acc = ReportAccumulator(spec, params)
+    summarized = acc.load_summary(db)
+    if page_size and summarized and spec.pageable:
+        sort = sort or spec.default_sort or (spec.key, False)
+        rows = fetch_page(db, spec, acc.params, sort, None, page_size)
+        result = acc.result(rows)
+        result.row_count = max(acc.summary_count, len(rows))
+        result.sort = sort
+        return result
+    rows = [acc.add(r) for r in spec.fetch(db, acc.params)]
+    return acc.result(rows)
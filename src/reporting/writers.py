@@ -0,0 +1,122 @@
+"""Lay out a ReportResult as HTML (for printing) or PDF.
+
+Both use the same formatting as the Reports page. Data exports (CSV, JSON, XLSX) are
+streamed from the database by src.reporting.export instead.
+"""
+
+import html
+from typing import List, Sequence
+
+from .spec import ReportResult
+
+
+def _totals_cells(result: ReportResult) -> List[str]:
+    return [
+        c.format(result.totals[c.key]) if c.key in result.totals else ("Total" if i == 0 else '')
+        for i, c in enumerate(result.columns)
+    ]
+
+
+def render_html(result: ReportResult, generated_by: str = "") -> str:
+    parts = ["<table border='1' cellpadding='5' cellspacing='0' style='width: 100%; border-collapse: collapse;'>", "<tr>"]
+    for c in result.columns:
+        parts.append(f"<th style='background-color: #f2f2f2; font-weight: bold;'>{html.escape(c.title)}</th>")
+    parts.append("</tr>")
+    for cells in result.formatted_rows():
+        parts.append("<tr>" + "".join(f"<td>{html.escape(text)}</td>" for text in cells) + "</tr>")
+    if result.totals:
+        parts.append("<tr>" + "".join(f"<td><b>{html.escape(text)}</b></td>" for text in _totals_cells(result)) + "</tr>")
+    parts.append("</table>")
+    footer = f"Generated on: {result.generated_at:%Y-%m-%d}"
+    if generated_by:
+        footer += f" by {html.escape(generated_by)}"
+    return f"""
+<html>
+<head>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 20px; }}
+h1 {{ color: #2c3e50; }}
+.summary {{ background-color: #f8f9fa; padding: 15px; border: 1px solid #dee2e6; margin-bottom: 20px; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(result.spec.name)}</h1>
+<div class="summary">
+<pre>{html.escape(result.summary_text())}</pre>
+</div>
+{''.join(parts)}
+<p style="margin-top: 20px; font-size: 12px; color: #666;">
+{footer}
+</p>
+</body>
+</html>
+        """
+
+
+def _pdf_flowables(result: ReportResult, styles, generated_by: str = "") -> list:
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Preformatted, Spacer, Table, TableStyle
+
+    data = [[c.title for c in result.columns]] + result.formatted_rows()
+    if result.totals:
+        data.append(_totals_cells(result))
+    table = Table(data, repeatRows=1)
+    style = [
+        ('GRID', (0, 0), (-1, -1), 0.4, colors.HexColor('#94a3b8')),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    for i, c in enumerate(result.columns):
+        if c.numeric:
+            style.append(('ALIGN', (i, 1), (i, -1), 'RIGHT'))
+    if result.totals:
+        style.append(('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'))
+    table.setStyle(TableStyle(style))
+
+    footer = f"Generated on: {result.generated_at:%Y-%m-%d}"
+    if generated_by:
+        footer += f" by {generated_by}"
+    return [
+        Paragraph(html.escape(result.spec.name), styles['Title']),
+        Preformatted(result.summary_text(), styles['Code']),
+        Spacer(1, 6 * mm),
+        table,
+        Spacer(1, 6 * mm),
+        Paragraph(html.escape(footer), styles['Normal']),
+    ]
+
+
+def _pdf_document(path: str):
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate
+
+    return SimpleDocTemplate(path, pagesize=landscape(A4), leftMargin=12 * mm, rightMargin=12 * mm,
+                             topMargin=12 * mm, bottomMargin=12 * mm)
+
+
+def write_pdf(result: ReportResult, path: str, generated_by: str = "") -> int:
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    _pdf_document(path).build(_pdf_flowables(result, getSampleStyleSheet(), generated_by))
+    return len(result.rows)
+
+
+def write_pdf_bundle(results: Sequence[ReportResult], path: str, title: str, generated_by: str = "") -> int:
+    """Several reports in one PDF: a contents page, then each report from a new page."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, Table
+
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph(html.escape(title), styles['Title']),
+        Table([["Report", "Rows"]] + [[r.spec.name, f"{len(r.rows):,}"] for r in results], hAlign='LEFT'),
+    ]
+    for result in results:
+        story.append(PageBreak())
+        story.extend(_pdf_flowables(result, styles, generated_by))
+    _pdf_document(path).build(story)
+    return sum(len(r.rows) for r in results)
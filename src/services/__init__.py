@@ -0,0 +1 @@
+# Headless background services (no Qt required)
@@ -0,0 +1,132 @@
+"""Precompute the expensive daily and weekly views overnight.
+
+    python -m src.services.scheduler                 # run every night at 02:00
+    python -m src.services.scheduler --at 03:30
+    python -m src.services.scheduler --once          # run every job now and exit
+    python -m src.services.scheduler --once --jobs pending_cylinders lpg_khata
+
+Results are stored as report_snapshots rows and served by the normal DatabaseManager
+methods until the next write (for yesterday's views, the next write to yesterday), so the
+first user of the day does not wait for them. Weekly invoices are refreshed in place, and cylinder stock gets
+its daily checkpoints and snapshot fold even when no terminal restarts for weeks.
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Sequence, Tuple
+
+from src.database_module import DatabaseManager
+
+# Snapshots older than this are deleted on each run.
+SNAPSHOT_RETENTION_DAYS = 14
+# The stock fold is skipped while any write is in flight; it is retried this often, this far apart.
+FOLD_ATTEMPTS = 10
+FOLD_RETRY_S = 30.0
+
+
+def billing_week(day: date) -> Tuple[str, str]:
+    """Saturday-to-Friday week containing day, as on the Weekly Payments page."""
+    week_start = day - timedelta(days=(day.weekday() - 5) % 7)
+    return week_start.isoformat(), (week_start + timedelta(days=6)).isoformat()
+
+
+def refresh_stock_checkpoints(db: DatabaseManager, today: date) -> int:
+    """Checkpoint the days closed since the last run and fold new movements into the stock snapshot."""
+    count = db.refresh_cylinder_stock_checkpoints()
+    for attempt in range(FOLD_ATTEMPTS):
+        folded = db.snapshot_cylinder_inventory()
+        if folded is not None:
+            return count + folded
+        if attempt + 1 < FOLD_ATTEMPTS:
+            time.sleep(FOLD_RETRY_S)
+    print(f"stock_checkpoints: snapshot fold skipped {FOLD_ATTEMPTS} times, writes kept arriving", flush=True)
+    return count
+
+
+def precompute_weekly_invoices(db: DatabaseManager, today: date) -> int:
+    week_start, week_end = billing_week(today)
+    return db.refresh_weekly_invoices(week_start, week_end, force=True)
+
+
+def precompute_daily_summary(db: DatabaseManager, today: date) -> int:
+    """Yesterday's sales, LPG refills and totals, the day most often reviewed first thing."""
+    day = (today - timedelta(days=1)).isoformat()
+    count = db.precompute_snapshot('daily_sales', day, lambda: db.get_sales_for_date_with_summaries(day, False))
+    count += db.precompute_snapshot('daily_lpg_refills', day, lambda: db.get_lpg_refills_for_date(day, False))
+    count += db.precompute_snapshot('daily_totals', day, lambda: db.execute_query(*db.daily_totals_query(day)))
+    return count
+
+
+def precompute_pending_cylinders(db: DatabaseManager, today: date) -> int:
+    return db.precompute_snapshot('pending_cylinders', '', lambda: db.get_pending_cylinder_summary_by_client(False))
+
+
+def precompute_lpg_khata(db: DatabaseManager, today: date) -> int:
+    return db.precompute_snapshot('lpg_khata', '', lambda: db.get_lpg_khata_summary(False))
+
+
+# In run order.
+JOBS: Dict[str, Callable[[DatabaseManager, date], int]] = {
+    'stock_checkpoints': refresh_stock_checkpoints,
+    'weekly_invoices': precompute_weekly_invoices,
+    'daily_summary': precompute_daily_summary,
+    'pending_cylinders': precompute_pending_cylinders,
+    'lpg_khata': precompute_lpg_khata,
+}
+
+
+def run_jobs(db: DatabaseManager, names: Sequence[str], today: date) -> bool:
+    """Run the named jobs in JOBS order; returns False if any failed."""
+    ok = True
+    for name in (n for n in JOBS if n in names):
+        started = time.perf_counter()
+        try:
+            count = JOBS[name](db, today)
+            print(f"{name}: {count} rows in {time.perf_counter() - started:.2f}s", flush=True)
+        except Exception as e:
+            ok = False
+            print(f"{name}: failed after {time.perf_counter() - started:.2f}s: {str(e)}", flush=True)
+    try:
+        db.prune_report_snapshots(SNAPSHOT_RETENTION_DAYS)
+    except Exception as e:
+        print(f"Failed to prune old snapshots: {str(e)}", flush=True)
+    return ok
+
+
+def next_run(now: datetime, at: str) -> datetime:
+    hour, minute = (int(part) for part in at.split(":"))
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompute daily and weekly report data.")
+    parser.add_argument("--once", action="store_true", help="Run the jobs now and exit")
+    parser.add_argument("--at", default="02:00", help="Daily run time, HH:MM local time (default 02:00)")
+    parser.add_argument("--jobs", nargs="+", choices=list(JOBS), default=list(JOBS), help="Jobs to run")
+    args = parser.parse_args()
+    try:
+        next_run(datetime.now(), args.at)
+    except ValueError:
+        parser.error("--at must be HH:MM")
+
+    db = DatabaseManager()
+    try:
+        if args.once:
+            return 0 if run_jobs(db, args.jobs, date.today()) else 1
+        while True:
+            run_at = next_run(datetime.now(), args.at)
+            print(f"Next run at {run_at:%Y-%m-%d %H:%M}", flush=True)
+            # Sleep in short steps so a changed system clock or a suspend is noticed.
+            while datetime.now() < run_at:
+                time.sleep(min(60.0, max(1.0, (run_at - datetime.now()).total_seconds())))
+            run_jobs(db, args.jobs, date.today())
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
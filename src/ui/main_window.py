@@ -15,6 +15,7 @@ from src.components.employees import EmployeesWidget
 from src.components.reports import ReportsWidget
 from src.components.settings import SettingsWidget
 from src.components.cylinder_availability import CylinderAvailabilityWidget
+from src.core.events import PAGE_DEPENDENCIES, event_bus
 
 class MainWindow(QMainWindow):
     def __init__(self, db_manager: DatabaseManager, current_user: dict):
@@ -288,6 +289,11 @@ class MainWindow(QMainWindow):
         """Setup navigation and create widgets based on user role"""
         # Create widgets for content area
         self.widgets = {}
+        self.stale_pages = set()
+        # data_change_seq when each page last loaded (None while live updates run: events mark pages stale).
+        self.page_loaded_seq = {}
+        # Set by the app once the LISTEN/NOTIFY listener runs; until then any write reloads a page on open.
+        self.live_updates_active = False
         
         # Dashboard widget
         dashboard_widget = self.create_dashboard_widget()
@@ -361,6 +367,8 @@ class MainWindow(QMainWindow):
         
         # Set role-based permissions
         self.set_role_permissions()
+
+        event_bus().event_published.connect(self.on_domain_event)
         
         # Show dashboard by default
         self.switch_page("dashboard")
@@ -709,8 +717,16 @@ class MainWindow(QMainWindow):
             # Switch content
             self.content_area.setCurrentWidget(self.widgets[page_name])
             
-            # Refresh the current page data
-            self.refresh_current_page(page_name)
+            # Refresh the page if something it shows changed while hidden. Without live updates other
+            # terminals' writes raise no events, so any write since the page loaded counts.
+            if page_name in self.stale_pages:
+                self.refresh_stale_page(page_name)
+            elif page_name not in self.page_loaded_seq:
+                self.refresh_current_page(page_name)
+            elif not self.live_updates_active and (
+                self.page_loaded_seq[page_name] is None or self.page_loaded_seq[page_name] != self.current_change_seq()
+            ):
+                self.refresh_current_page(page_name)
             
             # Update status bar
             page_titles = {
@@ -731,8 +747,67 @@ class MainWindow(QMainWindow):
             }
             self.status_bar.showMessage(f"{page_titles.get(page_name, page_name)} - {self.current_user['full_name']}")
     
+    def current_page_name(self):
+        """Return the name of the visible page"""
+        current_widget = self.content_area.currentWidget() if hasattr(self, "content_area") else None
+        for name, widget in self.widgets.items():
+            if widget is current_widget:
+                return name
+        return None
+
+    def on_domain_event(self, event):
+        """Apply a domain event to the visible page and mark hidden dependants stale"""
+        current = self.current_page_name()
+        for page_name in PAGE_DEPENDENCIES.get(event.name, ()):
+            widget = self.widgets.get(page_name)
+            # The publishing page has already reloaded itself.
+            if widget is None or page_name == event.payload.get("source"):
+                continue
+            if page_name != current:
+                self.stale_pages.add(page_name)
+                continue
+            handler = getattr(widget, "handle_domain_event", None)
+            try:
+                if handler and handler(event):
+                    continue
+            except Exception as e:
+                print(f"Error applying {event.name} to {page_name}: {str(e)}")
+            self.refresh_stale_page(page_name)
+
+    def invalidate_pages(self, *page_names: str):
+        """Mark pages stale; the visible one is refreshed immediately"""
+        current = self.current_page_name()
+        for page_name in dict.fromkeys(page_names):
+            if page_name not in self.widgets:
+                continue
+            if page_name == current:
+                self.refresh_stale_page(page_name)
+            else:
+                self.stale_pages.add(page_name)
+
+    def refresh_stale_page(self, page_name: str):
+        """Reload a page whose data is known to be out of date"""
+        self.stale_pages.discard(page_name)
+        self.refresh_current_page(page_name)
+        # The reports page has no cheap reload; regenerate the report it is showing.
+        if page_name == "reports" and hasattr(self.widgets.get("reports"), "generate_report"):
+            try:
+                self.widgets["reports"].generate_report()
+            except Exception as e:
+                print(f"Error refreshing reports: {str(e)}")
+
+    def current_change_seq(self):
+        """data_change_seq, which moves on every data write from any terminal; None if unreadable"""
+        try:
+            return self.db_manager.data_change_seq()
+        except Exception as e:
+            print(f"Error reading data change sequence: {str(e)}")
+            return None
+
     def refresh_current_page(self, page_name: str):
         """Refresh the current page data"""
+        # Read before loading, so a write that lands during the load still triggers the next reload.
+        self.page_loaded_seq[page_name] = None if self.live_updates_active else self.current_change_seq()
         try:
             if page_name == "dashboard":
                 self.refresh_dashboard()
@@ -758,6 +833,8 @@ class MainWindow(QMainWindow):
                     self.widgets['sales'].load_gas_products()
                 if hasattr(self.widgets['sales'], 'load_recent_sales'):
                     self.widgets['sales'].load_recent_sales()
+                if hasattr(self.widgets['sales'], 'refresh_selected_client'):
+                    self.widgets['sales'].refresh_selected_client()
             elif page_name == "receipts":
                 if hasattr(self.widgets['receipts'], 'load_receipts'):
                     self.widgets['receipts'].load_receipts()
@@ -828,9 +905,6 @@ class MainWindow(QMainWindow):
                 widget.current_user = self.current_user
                 if hasattr(widget, "set_role_permissions"):
                     widget.set_role_permissions()
-        current_widget = self.content_area.currentWidget() if hasattr(self, "content_area") else None
-        if current_widget:
-            for name, widget in self.widgets.items():
-                if widget is current_widget:
-                    self.refresh_current_page(name)
-                    break
+        current_name = self.current_page_name()
+        if current_name:
+            self.refresh_current_page(current_name)